@@ -12,8 +12,12 @@ from flask import Flask, render_template, jsonify, request, abort
 from config import DEBUG, HOST, PORT
 
 # 复用你已定义的 SQLAlchemy 模型与会话（在 create_database.py 中）
-from create_database import (get_session, Item, Seller, Auction, AuctionItem, AuctionConfig,
-                             Buyer, OperationLog, MaterialOption, OutboundLog, Section)
+from create_database import (get_session, get_readonly_session, Item, Seller, Auction, AuctionItem, AuctionConfig,
+                             Buyer, OperationLog, MaterialOption, OutboundLog, Section, ImagePlaceholder)
+# 本地只读副本（config.REPLICA_ENABLED；未开启时只读查询直接走主库）
+from db_replica import replica
+# 请求级会话：request_session() + @readonly（后台线程仍用 get_session()）
+from db_session import db_session, request_session, readonly, init_app as init_db_session
 
 
 from decimal import Decimal, InvalidOperation
@@ -25,7 +29,10 @@ import json
 # —— 导出所需 & 下载 ——
 from pathlib import Path
 import tempfile
-import pythoncom
+try:
+    import pythoncom  # 仅 Excel COM 转 PDF 需要（Windows）
+except Exception:
+    pythoncom = None
 from datetime import datetime
 
 # 可选依赖：没装也能运行，但导出会报“缺依赖”的错误提示
@@ -45,86 +52,54 @@ try:
 except Exception:
     Image = None
 
-import uuid
-from time import time
-
 from io import BytesIO
 from flask import request, jsonify, send_file
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
 
-import subprocess
+# 标签纸排版：预览与打印共用
+from label_layout import (parse_label_request, place_labels, cached_labels_pdf, cached_label_page_png,
+                          COLS as LABEL_COLS, ROWS as LABEL_ROWS)
 
-LABEL_CONTEXT_STORE = {}  # token -> {"codes": [...], "created_at": ts}
-SUMATRA_PATH = r"D:\SumatraPDF\SumatraPDF.exe"
-PRINTER_NAME = "Kyocera 标签纸打印机"
+# 标签打印队列（打印命令见 config.PRINT_COMMAND）
+from print_spooler import print_spooler
+# 标签打印上下文：token -> codes（TTL + 条数上限；默认存数据库，多进程共享）
+from label_context import label_contexts
 
-def _new_token():
-    return uuid.uuid4().hex
 
 def _store_label_context(codes):
-    token = _new_token()
-    LABEL_CONTEXT_STORE[token] = {
-        "codes": codes,
-        "created_at": time()
-    }
-    return token
+    return label_contexts.put(codes)
 
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
-def _abs_path_from_web(rel: str) -> str:
-    """
-    将前端保存的“web 路径”转为真实磁盘路径。
-    支持两类：
-      1) /files/system/...   → 映射到 SYSTEM_IMAGE_ROOT（网络盘）
-      2) 其它（/static/...） → 仍按项目根目录拼接
-    """
-    from urllib.parse import urlsplit
-
-    r = (rel or "")
-    # 去掉 query/hash（例如 ?v=xxx 的防缓存参数）
-    parsed = urlsplit(r)
-    r = parsed.path or r
-
-    r = r.replace("\\", "/")
-
-    # 绝对 URL 或 data: 不处理为本地文件，原样返回，调用方自行跳过
-    if r.startswith("http://") or r.startswith("https://") or r.startswith("data:"):
-        return r
-
-    # /files/system/... → SYSTEM_IMAGE_ROOT 下的真实文件
-    if r.startswith("/files/system/") or r.startswith("files/system/"):
-        # 截出 /files/system/ 之后的相对部分
-        sub = r.split("/files/system/", 1)[-1] if "/files/system/" in r else r.split("files/system/", 1)[-1]
-        return _safe_join_system_root(sub)
-
-    # 默认：按项目根目录拼接（兼容 /static/uploads/... 等历史路径）
-    rel2 = r.lstrip("/").replace("/", os.sep)
-    return os.path.join(BASE_DIR, rel2)
-
-
 # === System 图片只读映射：将 /files/system/... 映射到 SYSTEM_IMAGE_ROOT 物理路径 ===
 from config import SYSTEM_IMAGE_ROOT
-
-
-def _safe_join_system_root(subpath: str) -> str:
-    """
-    将 web 子路径安全拼接到 SYSTEM_IMAGE_ROOT，防止路径穿越。
-    例如 subpath = "2024/2408/240824_A/250824_A_1.jpg"
-    """
-    subpath = (subpath or "").replace("\\", "/").lstrip("/")
-    parts = [p for p in subpath.split("/") if p not in ("", ".", "..")]
-    full = os.path.join(SYSTEM_IMAGE_ROOT, *parts)
-    # 安全校验：确保仍在 SYSTEM_IMAGE_ROOT 内
-    root_norm = os.path.abspath(SYSTEM_IMAGE_ROOT)
-    full_norm = os.path.abspath(full)
-    if not full_norm.startswith(root_norm):
-        raise ValueError("非法路径")
-    return full
+# web 路径 ↔ 磁盘路径（脚本也从这里导入，不必 import app）
+from paths import abs_path_from_web, safe_join_system_root
+# NAS 原图本地镜像（未开启时 mirror_path 原样返回）
+from image_cache import mirror_path, open_source, snap_size, make_lqip, prepare_export_images
+# 缩略图/预览图生成：有界线程池 + 同键合并 + 排队上限
+from thumb_service import thumb_service, ThumbBusy
+from config import THUMB_WARM_SIZE
+# 批次导出文件缓存（内容指纹为键）
+from export_cache import export_key, cached_export, store_export
+# 后台导出任务队列（/api/exports）
+from export_jobs import export_jobs
+# 批次清单 PDF：ReportLab 直出（PDF_RENDERER = "excel" 时走 Excel COM）
+from batch_pdf import render_batch_pdf, render_catalog_pdf
+try:
+    from config import PDF_RENDERER
+except Exception:
+    PDF_RENDERER = "reportlab"
+try:
+    from config import EXPORT_ZIP_WORKERS
+except Exception:
+    EXPORT_ZIP_WORKERS = 4
+try:
+    from config import INVENTORY_EXPORT_MAX_IMAGES
+except Exception:
+    INVENTORY_EXPORT_MAX_IMAGES = 5000
 
 
 # =============================== 常量与目录（上传路径） ===============================
@@ -204,6 +179,8 @@ def convert_excel_to_pdf(excel_path: Path, pdf_path: Path, *, open_visible: bool
     :param pdf_path: 输出的 PDF 完整路径（若父目录不存在会创建）
     :param open_visible: 是否显示 Excel 窗口（默认不显示）
     """
+    if pythoncom is None:
+        raise RuntimeError("缺少依赖：pywin32（Excel COM 转 PDF 仅支持 Windows）；可改用 PDF_RENDERER = \"reportlab\"")
     if not excel_path.exists():
         raise FileNotFoundError(f"找不到 Excel 文件：{excel_path}")
 
@@ -284,10 +261,44 @@ def convert_excel_to_pdf(excel_path: Path, pdf_path: Path, *, open_visible: bool
 
 
 
+class _ZipChunkBuffer:
+    """
+    zipfile 的只写输出目标：写入的数据暂存在内存，由调用方随时取走（流式下载用）。
+    不支持 seek，zipfile 会自动改用“数据描述符”格式，无需回填文件头。
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
 # =============================== Flask App Factory ===============================
 def create_app():
     app = Flask(__name__, static_folder="static", template_folder="templates")
     app.config.from_object("config")
+    init_db_session(app)
+    try:
+        # 模型里已有 items.row_version，旧库先补列（幂等）
+        from create_database import _migrate_add_items_row_version
+        _migrate_add_items_row_version()
+    except Exception as e:
+        print("补充 items.row_version 列失败:", e)
 
     # === API 错误统一 JSON：避免前端 .json() 解析到 HTML 报错 ===
     @app.errorhandler(404)
@@ -313,20 +324,29 @@ def create_app():
     # 一、页面视图（HTML 渲染）
     # ============================================================================
 
+    def _no_store(resp):
+        """回退响应（如用原图代替缩略图）不允许被浏览器缓存"""
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
     @app.route("/files/system/<path:subpath>")
     def serve_system_file(subpath):
         """
         只读文件服务：将 UNC 根目录下的文件通过 HTTP 提供给前端 <img src> 直接使用。
         """
         try:
-            full = _safe_join_system_root(subpath)
+            full = safe_join_system_root(subpath)
         except Exception:
             abort(400)
 
         if not os.path.isfile(full):
             abort(404)
-        # as_attachment=False 表示内联显示
-        return send_file(full, as_attachment=False)
+        # as_attachment=False 表示内联显示；开启本地镜像时从本地盘读取
+        try:
+            return send_file(mirror_path(full), as_attachment=False)
+        except FileNotFoundError:
+            # 镜像文件刚好被其它线程淘汰：改读 NAS 原图
+            return send_file(full, as_attachment=False)
 
     # === 新增：系统图片缩略图（列表小图用） ===
     @app.route("/thumb/system/<int:size>/<path:subpath>")
@@ -335,7 +355,7 @@ def create_app():
         缩略图接口：
         /thumb/system/120/2024/2408/240824_A/xxx.jpg
 
-        - size：最长边像素，限定在 40~400 之间
+        - size：最长边像素，向上取到 THUMB_SIZES 的档位（默认 80/120/200/400）
         - 仅对 /files/system/... 的图片有效
         - 若没安装 PIL，则回退到原图
         """
@@ -343,11 +363,11 @@ def create_app():
         if Image is None:
             return serve_system_file(subpath)
 
-        # 限制一下 size，避免太大
-        size = max(40, min(int(size or 120), 400))
+        # 尺寸取档：同一张图只缓存有限几种尺寸
+        size = snap_size("thumb", int(size or 120))
 
         try:
-            full = _safe_join_system_root(subpath)
+            full = safe_join_system_root(subpath)
         except Exception:
             abort(400)
 
@@ -355,9 +375,14 @@ def create_app():
             abort(404)
 
         try:
+            # 派生图磁盘缓存：同一张图同一尺寸只解码一次；生成走有界线程池
+            cached = thumb_service.get(full, "thumb", size, quality=80)
+            if cached:
+                return send_file(cached, mimetype="image/jpeg")
+
             from io import BytesIO
 
-            with Image.open(full) as im:
+            with open_source(full) as f, Image.open(f) as im:
                 # 转成 RGB，防止某些模式保存 JPEG 出问题
                 im = im.convert("RGB")
                 # 最长边 = size，等比缩放（contain）
@@ -367,10 +392,51 @@ def create_app():
                 im.save(buf, format="JPEG", quality=80)
                 buf.seek(0)
             return send_file(buf, mimetype="image/jpeg")
+        except ThumbBusy:
+            # 生成队列已满：本次直接给原图，且不让浏览器把原图缓存成缩略图
+            return _no_store(serve_system_file(subpath))
         except Exception:
             # 出错时兜底返回原图
             return serve_system_file(subpath)
 
+    # === 新增：悬停预览用中图（1000~1600px，EXIF 转正，磁盘缓存） ===
+    @app.route("/preview/system/<path:subpath>")
+    def serve_system_preview(subpath):
+        """
+        中图预览接口：
+        /preview/system/2024/2408/240824_A/xxx.jpg?size=1280
+
+        - size：最长边像素，向上取到 PREVIEW_SIZES 的档位（默认 1000/1280/1600，缺省 1280）
+        - 悬停浮窗用它代替原图，避免每次悬停都下载整张原图；原图仍由“打开图片”链接提供
+        - 若没安装 PIL 或生成失败，则回退到原图
+        """
+        if Image is None:
+            return serve_system_file(subpath)
+
+        try:
+            size = int(request.args.get("size") or 1280)
+        except ValueError:
+            size = 1280
+        size = snap_size("preview", size)
+
+        try:
+            full = safe_join_system_root(subpath)
+        except Exception:
+            abort(400)
+
+        if not os.path.isfile(full):
+            abort(404)
+
+        try:
+            cached = thumb_service.get(full, "preview", size, quality=85)
+            if cached:
+                return send_file(cached, mimetype="image/jpeg")
+        except ThumbBusy:
+            return _no_store(serve_system_file(subpath))
+        except Exception:
+            pass
+        return serve_system_file(subpath)
+
     # [HTML] 首页：templates/index.html
     @app.route("/")
     def index():
@@ -400,8 +466,9 @@ def create_app():
     @app.route("/api/label_context", methods=["GET"])
     def api_label_context():
         token = request.args.get("token", "").strip()
-        if token and token in LABEL_CONTEXT_STORE:
-            return jsonify({"codes": LABEL_CONTEXT_STORE[token]["codes"]})
+        codes = label_contexts.get(token) if token else None
+        if codes is not None:
+            return jsonify({"codes": codes})
 
         # 兜底 demo，防止页面打不开
         return jsonify({"codes": []}), 404
@@ -420,194 +487,95 @@ def create_app():
     @app.route("/api/preview", methods=["POST"])
     def api_preview():
         data = request.get_json(force=True, silent=True) or {}
-
-        codes = data.get("codes")
-        start_index = data.get("startIndex", 0)
-        skip_indices = data.get("skipIndices", [])
-
-        if not isinstance(codes, list) or not all(isinstance(x, str) for x in codes) or len(codes) == 0:
-            return jsonify({"error": "codes must be a non-empty list of strings"}), 400
-
         try:
-            start_index = int(start_index)
-        except Exception:
-            start_index = 0
-
-        if start_index < 0:
-            start_index = 0
-
-        # 你的标签纸布局：9列 x 28行
-        COLS = 9
-        ROWS = 28
-        PER_PAGE = COLS * ROWS
-
-        # 跳过集合
-        skip_set = set()
-        if isinstance(skip_indices, list):
-            for x in skip_indices:
-                try:
-                    ix = int(x)
-                    if ix >= 0:
-                        skip_set.add(ix)
-                except Exception:
-                    pass
+            codes, start_index, skip_set = parse_label_request(data)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
 
-        placed = []
-        code_i = 0
-        idx = start_index
+        # 你的标签纸布局：9列 x 28行（见 label_layout.py）
+        layout = place_labels(codes, start_index, skip_set)
+        # 标签打印页用预览图显示编号，只需要页数：withPlaced=false 时不返回逐格列表
+        if data.get("withPlaced", True) is False:
+            return jsonify({"pages": layout.pages})
+        return jsonify({
+            "pages": layout.pages,
+            "placed": [{"index": idx, "code": code} for idx, code in layout.placed]
+        })
 
-        # 依次放入 codes，遇到 skip 就跳过 index
-        while code_i < len(codes):
-            if idx in skip_set:
-                idx += 1
-                continue
-            placed.append({"index": idx, "code": codes[code_i]})
-            code_i += 1
-            idx += 1
+    def _label_args_request(token):
+        """GET 参数形式的标签请求：编号从标签打印上下文取，startIndex / skipIndices（逗号分隔）"""
+        return {
+            "codes": label_contexts.get(token) if token else None,
+            "startIndex": request.args.get("startIndex", 0),
+            "skipIndices": [x for x in (request.args.get("skipIndices") or "").split(",") if x.strip()],
+        }
 
-        max_idx = placed[-1]["index"] if placed else 0
-        pages = (max_idx // PER_PAGE) + 1
+    # [API] 标签预览图：单页 PNG，与打印同一套排版/字号（页码从 1 开始）
+    # GET /api/label_preview/<token>/page/<n>.png?startIndex=0&skipIndices=1,2,3
+    @app.route("/api/label_preview/<token>/page/<int:page_no>.png", methods=["GET"])
+    def api_label_preview_png(token, page_no):
+        try:
+            codes, start_index, skip_set = parse_label_request(_label_args_request(token.strip()))
+        except ValueError as ve:
+            return jsonify({"success": False, "msg": str(ve)}), 400
 
-        return jsonify({
-            "pages": pages,
-            "placed": placed
-        })
+        try:
+            hit = cached_label_page_png(codes, start_index, skip_set, page_no - 1) if page_no >= 1 else None
+        except RuntimeError as e:
+            return jsonify({"success": False, "msg": str(e)}), 500
+        if hit is None:
+            return jsonify({"success": False, "msg": "页码超出范围"}), 404
+        key, png_bytes = hit
+        return send_file(BytesIO(png_bytes), mimetype="image/png", as_attachment=False,
+                         download_name=f"labels_p{page_no}.png", etag=key, max_age=0)
+
+
+    # [下载] 标签 PDF（与打印同一份，按编号/起点/跳过格/版式缓存）
+    # POST body 同 /api/print_label_pdf；
+    # GET  ?token=...&startIndex=0&skipIndices=1,2,3（编号从标签打印上下文取）
+    @app.route("/api/label_pdf", methods=["GET", "POST"])
+    def api_label_pdf():
+        if request.method == "POST":
+            data = request.get_json(force=True, silent=True) or {}
+        else:
+            data = _label_args_request((request.args.get("token") or "").strip())
+        try:
+            codes, start_index, skip_set = parse_label_request(data)
+        except ValueError as ve:
+            return jsonify({"success": False, "msg": str(ve)}), 400
 
+        key, pdf_bytes = cached_labels_pdf(codes, start_index, skip_set)
+        return send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=False,
+                         download_name="labels.pdf", etag=key, max_age=0)
 
     @app.route("/api/print_label_pdf", methods=["POST"])
     def print_label_pdf():
         data = request.get_json(force=True, silent=True) or {}
-
-        codes = data.get("codes")
-        start_index = data.get("startIndex", 0)
-        skip_indices = data.get("skipIndices", [])
-
-        if not isinstance(codes, list) or not all(isinstance(x, str) for x in codes) or len(codes) == 0:
-            return jsonify({"success": False, "msg": "codes must be a non-empty list of strings"}), 400
-
         try:
-            start_index = int(start_index)
-        except Exception:
-            start_index = 0
-        if start_index < 0:
-            start_index = 0
-
-        # 1) 复用 /api/pdf 的生成逻辑：先生成 PDF 到内存（BytesIO）
-        COLS = 9
-        ROWS = 28
-        PER_PAGE = COLS * ROWS
-
-        page_w, page_h = A4  # points
-
-        marginL = 7 * mm
-        marginT = 7 * mm
-        labelW = 20 * mm
-        labelH = 10 * mm
-        gapX = 2 * mm
-        gapY = 0 * mm
-
-        skip_set = set()
-        if isinstance(skip_indices, list):
-            for x in skip_indices:
-                try:
-                    ix = int(x)
-                    if ix >= 0:
-                        skip_set.add(ix)
-                except Exception:
-                    pass
-
-        placed = []
-        code_i = 0
-        idx = start_index
-        while code_i < len(codes):
-            if idx in skip_set:
-                idx += 1
-                continue
-            placed.append((idx, codes[code_i]))
-            code_i += 1
-            idx += 1
-
-        max_idx = placed[-1][0] if placed else 0
-        pages = (max_idx // PER_PAGE) + 1
-
-        buf = BytesIO()
-        c = canvas.Canvas(buf, pagesize=A4)
-        c.setTitle("labels")
-        base_font = "Helvetica"
-
-        for p in range(pages):
-            page_start = p * PER_PAGE
-            page_end = (p + 1) * PER_PAGE
-
-            for (cell_index, code) in placed:
-                if not (page_start <= cell_index < page_end):
-                    continue
-
-                in_page = cell_index - page_start
-                r = in_page // COLS
-                col = in_page % COLS
-
-                x = marginL + col * (labelW + gapX)
-                y_top = page_h - marginT - r * (labelH + gapY)
-                y = y_top - labelH
-
-                num_part = str(code).split("_")[-1]
-                size = 8
-                if num_part.isdigit() and len(num_part) >= 4:
-                    size = 6
-                elif num_part.isdigit() and len(num_part) >= 3:
-                    size = 7
-
-                c.setFont(base_font, size)
-                tx = x + labelW / 2
-                ty = y + labelH / 2 - (size * 0.35)
-                c.drawCentredString(tx, ty, str(code))
-
-            c.showPage()
-
-        c.save()
-        buf.seek(0)
-        pdf_bytes = buf.getvalue()
-
-        # 2) 写入磁盘（关键：必须 close 文件句柄，否则 Sumatra 在 Windows 下可能读不到）
-        import os
-        import time
-        from pathlib import Path
-        import uuid
-
-        tmp_dir = Path(BASE_DIR) / "exports" / "_print_tmp"
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-
-        pdf_path = tmp_dir / f"labels_{uuid.uuid4().hex}.pdf"
-        with open(pdf_path, "wb") as f:
-            f.write(pdf_bytes)
-
-        # 3) 双保险：校验文件存在且非空
-        if (not pdf_path.exists()) or pdf_path.stat().st_size <= 0:
-            return jsonify({"success": False, "msg": f"pdf write failed: {str(pdf_path)}"}), 500
+            codes, start_index, skip_set = parse_label_request(data)
+        except ValueError as ve:
+            return jsonify({"success": False, "msg": str(ve)}), 400
 
-        # 极少数机器需要给文件系统一点点时间（可保留）
-        time.sleep(0.05)
+        # 1) 与 /api/preview 同一套排版；同样的编号/起点/跳过格直接取缓存的 PDF
+        _key, pdf_bytes = cached_labels_pdf(codes, start_index, skip_set)
 
-        # 4) 调用 Sumatra 静默打印（100% 不缩放）
-        cmd = [
-            SUMATRA_PATH,
-            "-print-to", PRINTER_NAME,
-            "-print-settings", "noscale",
-            str(pdf_path)
-        ]
+        # 2) 交给打印队列：写盘 + 登记任务后立即返回，由后台线程送打印机（失败自动重试）
+        try:
+            job_id = print_spooler.submit(pdf_bytes, title=f"labels x{len(codes)}")
+        except Exception as e:
+            return jsonify({"success": False, "msg": str(e)}), 500
+        return jsonify({"success": True, "job_id": job_id, "status_url": f"/api/print_jobs/{job_id}"})
 
+    # [API] 打印任务状态：queued / printing / done / failed
+    @app.route("/api/print_jobs/<job_id>", methods=["GET"])
+    def api_print_job_status(job_id):
         try:
-            subprocess.run(cmd, check=True)
-            return jsonify({"success": True})
+            info = print_spooler.get(job_id)
         except Exception as e:
             return jsonify({"success": False, "msg": str(e)}), 500
-        finally:
-            # 5) 打印后清理临时文件（如果被占用就留着，不影响下一次）
-            try:
-                os.remove(pdf_path)
-            except Exception:
-                pass
+        if not info:
+            return jsonify({"success": False, "msg": "打印任务不存在"}), 404
+        return jsonify({"success": True, **info})
 
     @app.route("/inventory/batch/<stockin_date>/<seller_code>/label_print")
     def inventory_label_print_page(stockin_date, seller_code):
@@ -615,8 +583,8 @@ def create_app():
         return render_template(
             "inventory/label_print.html",
             token=token,
-            cols=9,
-            rows=28
+            cols=LABEL_COLS,
+            rows=LABEL_ROWS
         )
 
 
@@ -671,8 +639,9 @@ def create_app():
 
     # [HTML] 拍卖会列表
     @app.route("/auctions", methods=["GET"])
+    @readonly
     def auctions_index():
-        session = get_session()
+        session = request_session()
         try:
             auctions = session.query(Auction).order_by(Auction.auction_order).all()
             return render_template("auctions/index.html", auctions=auctions)
@@ -682,7 +651,7 @@ def create_app():
     # [HTML] 单个拍卖会详情 + 专场列表
     @app.route("/auctions/<auction_id>", methods=["GET", "POST"])
     def auctions_detail(auction_id):
-        session = get_session()
+        session = request_session()
         try:
             auction = session.get(Auction, auction_id)
             if not auction:
@@ -891,8 +860,9 @@ def create_app():
 
     # [API] 设置 - 材质枚举（colors / materials / shapes），仅 GET
     @app.route("/api/settings/material_options", methods=["GET"])
+    @readonly
     def api_settings_material_options():
-        session = get_session()
+        session = request_session()
         try:
             rows = (session.query(MaterialOption)
                     .filter(MaterialOption.enabled == 1)
@@ -931,7 +901,7 @@ def create_app():
         return render_template("settings/accessory_types.html", title="附属品设置")
 
     # ==================== 拖拽排序 API（新增，不影响原有 CRUD） ====================
-    from sqlalchemy import text, func, or_
+    from sqlalchemy import text, func, or_, insert, bindparam
 
     # [HTML] 设置 - 材质选项管理页
     @app.route("/settings/material-options", methods=["GET"])
@@ -940,8 +910,9 @@ def create_app():
 
     # ---- Boxes ----
     @app.route("/api/settings/boxes/list", methods=["GET"])
+    @readonly
     def api_boxes_list():
-        session = get_session()
+        session = request_session()
         try:
             rows = session.execute(text(
                 "SELECT box_code AS name, COALESCE(sort,0) AS sort FROM boxes ORDER BY sort ASC, box_code ASC")).fetchall()
@@ -951,7 +922,7 @@ def create_app():
 
     @app.route("/api/settings/boxes/reorder", methods=["POST"])
     def api_boxes_reorder():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             names = data.get("names") or []
@@ -967,8 +938,9 @@ def create_app():
 
     # ---- Accessory Types ----
     @app.route("/api/settings/accessory_types/list", methods=["GET"])
+    @readonly
     def api_acc_list():
-        session = get_session()
+        session = request_session()
         try:
             rows = session.execute(text(
                 "SELECT accessory_name AS name, COALESCE(sort,0) AS sort FROM accessory_types ORDER BY sort ASC, accessory_name ASC")).fetchall()
@@ -978,7 +950,7 @@ def create_app():
 
     @app.route("/api/settings/accessory_types/reorder", methods=["POST"])
     def api_acc_reorder():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             names = data.get("names") or []
@@ -994,8 +966,9 @@ def create_app():
 
     # ---- Item Statuses ----
     @app.route("/api/settings/item_statuses/list", methods=["GET"])
+    @readonly
     def api_status_list():
-        session = get_session()
+        session = request_session()
         try:
             group = (request.args.get("group") or "").strip()
             if group:
@@ -1012,7 +985,7 @@ def create_app():
 
     @app.route("/api/settings/item_statuses/reorder", methods=["POST"])
     def api_status_reorder():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             names = data.get("names") or []
@@ -1034,7 +1007,7 @@ def create_app():
 
     @app.route("/api/settings/item_statuses_add", methods=["POST"])
     def api_status_add():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             name = (data.get("name") or "").strip()
@@ -1061,7 +1034,7 @@ def create_app():
 
     @app.route("/api/settings/item_statuses_delete", methods=["POST"])
     def api_status_delete():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             name = (data.get("name") or "").strip()
@@ -1078,8 +1051,9 @@ def create_app():
 
     # ---- Material Options ----
     @app.route("/api/settings/material_options/list", methods=["GET"])
+    @readonly
     def api_mat_list():
-        session = get_session()
+        session = request_session()
         try:
             group = (request.args.get("group") or "").strip()
             if not group:
@@ -1093,7 +1067,7 @@ def create_app():
 
     @app.route("/api/settings/material_options/reorder", methods=["POST"])
     def api_mat_reorder():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             group = (data.get("group") or "").strip()
@@ -1114,7 +1088,7 @@ def create_app():
     # 复用 GET /api/settings/material_options 给业务端；这里增加 POST/DELETE 供管理页使用
     @app.route("/api/settings/material_options", methods=["POST", "DELETE"])
     def api_mat_mutations():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             group = (data.get("group") or "").strip()
@@ -1148,7 +1122,7 @@ def create_app():
     # [API] 健康检查
     @app.route("/api/health")
     def api_health():
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "replica": replica.status()})
 
     # [API] 版本信息
     @app.route("/api/version")
@@ -1157,9 +1131,10 @@ def create_app():
 
     # [API] DB 连通性
     @app.route("/api/db-check")
+    @readonly
     def api_db_check():
         try:
-            session = get_session()
+            session = request_session()
             items = session.query(Item).count()
             sellers = session.query(Seller).count()
             auctions = session.query(Auction).count()
@@ -1199,7 +1174,7 @@ def create_app():
     # [API] 设置 - 箱号
     @app.route("/api/settings/boxes", methods=["GET", "POST", "PUT", "DELETE"])
     def api_settings_boxes():
-        session = get_session()
+        session = request_session()
         try:
             table, field = "boxes", "box_code"
             if request.method == "GET":
@@ -1245,7 +1220,7 @@ def create_app():
     # [API] 设置 - 附属品
     @app.route("/api/settings/accessory_types", methods=["GET", "POST", "PUT", "DELETE"])
     def api_settings_accessory_types():
-        session = get_session()
+        session = request_session()
         try:
             table, field = "accessory_types", "accessory_name"
 
@@ -1291,8 +1266,9 @@ def create_app():
 
     # ---- Item Categories（拖拽排序专用）----
     @app.route("/api/settings/item_categories/list", methods=["GET"])
+    @readonly
     def api_item_categories_list():
-        session = get_session()
+        session = request_session()
         try:
             rows = session.execute(text("""
                 SELECT item_category AS name, COALESCE(sort,0) AS sort
@@ -1305,7 +1281,7 @@ def create_app():
 
     @app.route("/api/settings/item_categories/reorder", methods=["POST"])
     def api_item_categories_reorder():
-        session = get_session()
+        session = request_session()
         try:
             data = request.get_json(silent=True) or {}
             names = data.get("names") or []
@@ -1324,7 +1300,7 @@ def create_app():
     # [API] 设置 - 物品种类
     @app.route("/api/settings/item_categories", methods=["GET", "POST", "PUT", "DELETE"])
     def api_settings_item_categories():
-        session = get_session()
+        session = request_session()
         try:
             table, field = "item_categories", "item_category"
             if request.method == "GET":
@@ -1369,7 +1345,7 @@ def create_app():
     # [API] 设置 - 物品状态
     @app.route("/api/settings/item_statuses", methods=["GET", "POST", "PUT", "DELETE"])
     def api_settings_item_statuses():
-        session = get_session()
+        session = request_session()
         try:
             table, field = "item_statuses", "item_status"
             if request.method == "GET":
@@ -1452,6 +1428,118 @@ def create_app():
         )
         session.add(op)
 
+    def log_ops_bulk(session, entity_type, action, entries, operator="admin"):
+        """批量写操作日志：entries 为 (entity_id, before, after) 序列，一条 INSERT（executemany）写入"""
+        now = datetime.utcnow()
+        rows = [{
+            "entity_type": entity_type, "entity_id": str(eid), "action": action,
+            "before_value": before, "after_value": after, "operator": operator, "created_at": now,
+        } for eid, before, after in entries]
+        if rows:
+            session.execute(insert(OperationLog), rows)
+
+    # ---- 物品编辑的乐观锁（items.row_version）----
+    # 写入只有一条 UPDATE items SET ..., row_version = row_version + 1 WHERE item_code = :c AND row_version = :v，
+    # 读取与校验在写事务之外完成；更新 0 行说明已被别人改过，返回 409 + 当前值供前端合并
+    def item_detail(session, it):
+        """单件详情（GET /api/items/<code> 与 409 冲突响应共用）"""
+        accessories, _csv = normalize_accessories(session, it.item_accessories or "")
+        return {
+            "item_code": it.item_code,
+            "item_name": it.item_name,
+            "item_author": it.item_author,
+            "item_status": it.item_status,
+            "starting_price": float(it.starting_price) if it.starting_price is not None else None,
+            "reserve_price": float(it.reserve_price) if it.reserve_price is not None else None,
+            "item_location": it.item_location,
+            "item_box_code": it.item_box_code,
+            "item_category": it.item_category,
+            "item_notes": it.item_notes,
+            "item_size": it.item_size,
+            "item_image": it.item_image,
+            "stockin_date": str(it.stockin_date) if it.stockin_date else None,
+            "seller_code": it.seller_code,
+            "item_material": it.item_material,
+            "accessories": accessories,
+            "row_version": it.row_version,
+        }
+
+    def parse_row_version(v):
+        """前端带来的 row_version：未带 -> None（不做版本检查）；其余必须是正整数"""
+        if v in (None, ""):
+            return None
+        try:
+            n = int(v)
+        except (TypeError, ValueError):
+            raise ValueError("row_version 需为整数")
+        if n < 1:
+            raise ValueError("row_version 需为正整数")
+        return n
+
+    def item_conflicts(expected):
+        """expected: {item_code: 预期 row_version}；从主库读出当前值，返回版本已变化的物品列表"""
+        session = get_readonly_session(primary=True)
+        try:
+            found = {}
+            codes = list(expected)
+            for i in range(0, len(codes), BULK_IN_CHUNK):
+                for it in session.query(Item).filter(Item.item_code.in_(codes[i:i + BULK_IN_CHUNK])).all():
+                    found[it.item_code] = it
+            conflicts = []
+            for code, v in expected.items():
+                it = found.get(code)
+                if it is not None and it.row_version == v:
+                    continue
+                conflicts.append({
+                    "item_code": code,
+                    "expected_row_version": v,
+                    "row_version": it.row_version if it is not None else None,
+                    "current": item_detail(session, it) if it is not None else None,  # None：已被删除
+                })
+            return conflicts
+        finally:
+            session.close()
+
+    def conflict_response(conflicts):
+        """409：{"ok": false, "conflict": true, "error": 提示, "conflicts": [{item_code, expected_row_version, row_version, current}]}"""
+        codes = "、".join(c["item_code"] for c in conflicts[:5]) + ("等" if len(conflicts) > 5 else "")
+        return jsonify({
+            "ok": False,
+            "conflict": True,
+            "error": f"物品 {codes} 已被其他人修改，请核对最新内容后重新保存",
+            "conflicts": conflicts,
+        }), 409
+
+    # ---- 批量新建物品：一次 IN 查已存在、默认状态只查一次、一次 executemany 插入 ----
+    BULK_IN_CHUNK = 500  # IN (...) 每批参数个数（SQLite 有参数个数上限）
+
+    def _existing_item_codes(session, codes):
+        """返回 codes 中已存在于 items 的编号集合"""
+        codes = list(dict.fromkeys(codes))
+        found = set()
+        for i in range(0, len(codes), BULK_IN_CHUNK):
+            chunk = codes[i:i + BULK_IN_CHUNK]
+            found.update(c for (c,) in session.query(Item.item_code).filter(Item.item_code.in_(chunk)).all())
+        return found
+
+    def _default_item_status(session):
+        """新建物品的默认状态：「待上拍」存在则用它，否则留空"""
+        from create_database import ItemStatus
+        try:
+            return "待上拍" if session.get(ItemStatus, "待上拍") else None
+        except Exception:
+            return None
+
+    def _bulk_insert_blank_items(session, codes, stockin_date_obj, seller_code, status):
+        """按编号批量插入空白物品（调用方已排除已存在的编号），返回插入件数"""
+        rows = [{
+            "item_code": code, "stockin_date": stockin_date_obj, "seller_code": seller_code,
+            "is_in_box": False, "item_status": status,
+        } for code in codes]
+        if rows:
+            session.execute(insert(Item), rows)
+        return len(rows)
+
     def normalize_pct(value):
         """
         百分比输入归一化：
@@ -1529,22 +1617,29 @@ def create_app():
     # 五、Items（物品）相关接口
     # ============================================================================
 
-    def normalize_accessories(session, acc_input):
+    def accessory_sort_map(session):
+        """附属品排序映射 {name: sort}（批量处理时取一次，传给 normalize_accessories 复用）"""
+        sort_rows = session.execute(text("SELECT accessory_name, sort FROM accessory_types")).fetchall()
+        sort_map = {}
+        for name, s in sort_rows:
+            try:
+                sort_map[str(name)] = int(s) if s is not None else 999999
+            except Exception:
+                sort_map[str(name)] = 999999
+        return sort_map
+
+    def normalize_accessories(session, acc_input, sort_map=None):
         """
         acc_input 支持：
           - ["共箱","底座"] 这种 list
           - "共箱,底座" / "共箱、底座" 这种 str
+        sort_map：可传入 accessory_sort_map() 的结果，省去每次重查 accessory_types
         返回：
           (acc_list_sorted, csv_text) 其中 csv_text 用英文逗号保存到 items.item_accessories
         """
         # 取 sort 映射：{name: sort}
-        sort_rows = session.execute(text("SELECT accessory_name, sort FROM accessory_types")).fetchall()
-        sort_map = {}
-        for name, s in sort_rows:
-            try:
-                sort_map[str(name)] = int(s) if s is not None else 999999
-            except Exception:
-                sort_map[str(name)] = 999999
+        if sort_map is None:
+            sort_map = accessory_sort_map(session)
 
         # 解析输入 -> list
         if acc_input is None:
@@ -1569,10 +1664,60 @@ def create_app():
         csv_text = ",".join(uniq)  # 保存用英文逗号
         return uniq, csv_text
 
+    # ---- 图片占位图（LQIP） ----
+    def _image_key(rel):
+        """item_image → image_placeholders.file_path（去掉 ?v= 等 query）"""
+        from urllib.parse import urlsplit
+        r = (rel or "").strip()
+        if not r:
+            return ""
+        return urlsplit(r).path or r
+
+    def _fetch_lqip_map(session, image_paths):
+        """批量读取占位图：{file_path: lqip}；表不存在（未跑迁移）时返回空映射"""
+        keys = sorted({_image_key(p) for p in image_paths if _image_key(p)})
+        if not keys:
+            return {}
+        try:
+            rows = (session.query(ImagePlaceholder.file_path, ImagePlaceholder.lqip)
+                    .filter(ImagePlaceholder.file_path.in_(keys))
+                    .all())
+            return {fp: lqip for fp, lqip in rows}
+        except Exception:
+            session.rollback()
+            return {}
+
+    def _warm_thumbs(image_paths):
+        """把一批 /files/system/... 图片排进后台缩略图预热（低优先级，不阻塞请求）"""
+        fulls = []
+        for rel in image_paths:
+            key = _image_key(rel)
+            if not key.startswith("/files/system/"):
+                continue
+            try:
+                fulls.append(abs_path_from_web(key))
+            except ValueError:
+                continue
+        if fulls:
+            thumb_service.warm(fulls, "thumb", THUMB_WARM_SIZE, quality=80)
+
+    def _save_placeholder(session, rel_path, fs_path):
+        """生成并登记一张图的占位图（覆盖旧值），返回 data URI；调用方负责 commit"""
+        res = make_lqip(fs_path)
+        if not res:
+            return None
+        lqip, w, h, mtime = res
+        session.merge(ImagePlaceholder(
+            file_path=_image_key(rel_path), src_mtime=mtime,
+            width=w, height=h, lqip=lqip, updated_at=datetime.utcnow()
+        ))
+        return lqip
+
     # [API] 生成下一个出品人编码（Excel 序）
     @app.route("/api/sellers/next-code")
+    @readonly
     def api_sellers_next_code():
-        session = get_session()
+        session = request_session()
         try:
             codes = [s.seller_code for s in session.query(Seller.seller_code).all() if s.seller_code]
             max_num = 0
@@ -1583,6 +1728,12 @@ def create_app():
         finally:
             session.close()
 
+    # 批量更新可改的普通字段；BEFORE 为写进操作日志 before 的字段
+    BULK_UPDATE_FIELDS = ["item_name", "item_size", "item_location", "item_category", "item_image", "item_box_code",
+                          "item_material"]
+    BULK_UPDATE_BEFORE_FIELDS = ["item_name", "item_size", "item_location", "item_category", "item_image",
+                                 "item_material"]
+
     # [API] 批量更新物品
     @app.route("/api/items/bulk-update", methods=["POST"])
     def api_items_bulk_update():
@@ -1590,90 +1741,132 @@ def create_app():
         批量更新：
           - 普通字段：item_name / item_size / item_location / item_category / item_image
           - 附属品：通过映射表 item_accessories 覆盖保存（支持 accessories: [] 或 item_accessories: "盒、签"）
+          - 同一 item_code 出现多行时按顺序逐字段合并，等同于依次保存
+          - 每行可带 row_version：任一行与库中不一致时整批不保存，返回 409 + 这些行的当前值；
+            成功返回 {"ok": true, "row_versions": {item_code: 新版本}}
         """
         payload = request.get_json(silent=True) or {}
         items = payload.get("items") or []
         if not isinstance(items, list) or not items:
             return jsonify({"error": "items 不能为空"}), 400
 
-        session = get_session()
+        # 1)~2) 读取旧值与校验走只读会话（主库），写事务里只剩 UPDATE 与日志
+        ro = get_readonly_session(primary=True)
         try:
-            acc_updates = {}  # { item_code: ["盒","签"] }
-
+            # 1) 一次 IN 查询取出所有目标物品的旧值
+            rows_by_code = {}
             for row in items:
-                code = (row.get("item_code") or "").strip()
+                code = (row.get("item_code") or "").strip() if isinstance(row, dict) else ""
                 if not code:
                     continue
-
-                it = session.get(Item, code)
-                if not it:
+                # 同一编号出现多次：按顺序逐字段合并（后面的行覆盖同名字段，其余字段保留），
+                # 与逐行依次保存的结果一致
+                merged = rows_by_code.get(code)
+                if merged is None:
+                    rows_by_code[code] = dict(row)
                     continue
+                if "accessories" in row or "item_accessories" in row:
+                    # 附属品两种键名互为别名：后出现的一行整体替换
+                    merged.pop("accessories", None)
+                    merged.pop("item_accessories", None)
+                merged.update(row)
+            cols = [Item.item_code] + [getattr(Item, k) for k in BULK_UPDATE_BEFORE_FIELDS] + \
+                   [Item.starting_price, Item.reserve_price, Item.row_version]
+            current = {}
+            codes = list(rows_by_code)
+            for i in range(0, len(codes), BULK_IN_CHUNK):
+                chunk = codes[i:i + BULK_IN_CHUNK]
+                for r in ro.query(*cols).filter(Item.item_code.in_(chunk)).all():
+                    current[r.item_code] = r._mapping
+
+            # 2) 逐行算出要改的字段（只在内存里，校验全部通过后才写库）
+            sort_map = None  # 附属品排序映射，用到时取一次
+            updates = []     # [(item_code, 预期 row_version, {列: 新值})]
+            log_entries = []
+            for code, row in rows_by_code.items():
+                old = current.get(code)
+                if old is None:
+                    continue
+                before = {k: old[k] for k in BULK_UPDATE_BEFORE_FIELDS}
+                # 未带 row_version 的行按读取时的版本条件更新（校验用的旧值不会被别人改掉）
+                client_version = parse_row_version(row.get("row_version"))
+                expected = client_version if client_version is not None else old["row_version"]
 
-                # 记录更新前（仅普通字段）
-                before = {
-                    "item_name": it.item_name,
-                    "item_size": it.item_size,
-                    "item_location": it.item_location,
-                    "item_category": it.item_category,
-                    "item_image": it.item_image,
-                    "item_material": it.item_material,
-                }
-
-                # 更新普通字段（空串 -> None；允许清空）
+                # 普通字段（空串 -> None；允许清空）
                 changed = {}
-                for k in ["item_name", "item_size", "item_location", "item_category", "item_image", "item_box_code",
-                          "item_material"]:
+                values = {}
+                for k in BULK_UPDATE_FIELDS:
                     if k in row:
                         v = row.get(k)
-                        setattr(it, k, (v if v not in ("", None) else None))
+                        values[k] = v if v not in ("", None) else None
                         changed[k] = v
 
-                # —— 新增：起拍价 / 底价（万日元整数）——
-                # 先读旧值
-                sp = it.starting_price
-                rp = it.reserve_price
+                # 起拍价 / 底价（万日元整数）：未传的沿用旧值参与校验
+                sp = old["starting_price"]
+                rp = old["reserve_price"]
                 if "starting_price" in row:
                     sp = to_int_or_none(row.get("starting_price"))  # None 允许清空
+                    values["starting_price"] = sp
                 if "reserve_price" in row:
                     rp = to_int_or_none(row.get("reserve_price"))  # None 允许清空
+                    values["reserve_price"] = rp
                 if sp is not None and rp is not None and sp > rp:
                     raise ValueError("起拍价不能高于底价")
-                it.starting_price = sp
-                it.reserve_price = rp
 
-                # 解析附属品
+                # 附属品：写入 items.item_accessories（英文逗号保存，按 accessory_types.sort 排序）
                 acc_input = row.get("accessories", None)
                 if acc_input is None and "item_accessories" in row:
                     acc_input = row.get("item_accessories")
-
+                acc_list = None
                 if acc_input is not None:
                     if isinstance(acc_input, str):
                         acc_list = [s.strip() for s in acc_input.replace("、", ",").split(",") if s.strip()]
                     else:
                         acc_list = [str(s).strip() for s in (acc_input or []) if str(s).strip()]
-                    acc_updates[code] = acc_list
+                    if sort_map is None:
+                        sort_map = accessory_sort_map(ro)
+                    _sorted, values["item_accessories"] = normalize_accessories(ro, acc_list, sort_map)
 
-                # 日志
-                try:
-                    log_op(session, "item", code, "bulk_update",
-                           before=str(before),
-                           after=str(
-                               {**changed, **({"accessories": acc_updates.get(code)} if code in acc_updates else {})}))
-                except Exception:
-                    pass
+                if values:
+                    updates.append((code, expected, values))
+                log_entries.append((code, str(before), str(
+                    {**changed, **({"accessories": acc_list} if acc_list is not None else {})})))
 
-            session.flush()
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            ro.close()
 
-            # 应用附属品：写入 items.item_accessories（英文逗号保存）
-            for code, acc_list in acc_updates.items():
-                it = session.get(Item, code)
-                if not it:
-                    continue
-                acc_sorted, csv_text = normalize_accessories(session, acc_list)
-                it.item_accessories = csv_text
+        session = request_session()
+        try:
+            # 3) 按“改动的字段组合”分组，每组一条条件 UPDATE executemany（版本一致才改，并 +1）
+            groups = {}
+            for code, expected, values in updates:
+                groups.setdefault(tuple(sorted(values)), []).append(
+                    {"b_item_code": code, "b_row_version": expected, **values})
+            items_table = Item.__table__
+            updated = 0
+            for fields, params in groups.items():
+                stmt = (items_table.update()
+                        .where(items_table.c.item_code == bindparam("b_item_code"),
+                               items_table.c.row_version == bindparam("b_row_version"))
+                        .values({**{f: bindparam(f) for f in fields},
+                                 "row_version": items_table.c.row_version + 1}))
+                updated += session.execute(stmt, params).rowcount
+            if updated != len(updates):
+                # 有行已被别人改过：整批回滚，返回冲突行的当前值
+                session.rollback()
+                conflicts = item_conflicts({code: expected for code, expected, _v in updates})
+                return conflict_response(conflicts) if conflicts else (
+                    jsonify({"error": "保存失败：部分物品未更新，请刷新后重试"}), 500)
+
+            # 4) 操作日志一条 INSERT 写入
+            log_ops_bulk(session, "item", "bulk_update", log_entries)
 
             session.commit()
-            return jsonify({"ok": True})
+            return jsonify({"ok": True, "row_versions": {code: expected + 1 for code, expected, _v in updates}})
         except Exception as e:
             session.rollback()
             return jsonify({"error": str(e)}), 500
@@ -1682,8 +1875,9 @@ def create_app():
 
     # [API] 批次内物品
     @app.route("/api/items/by-batch", methods=["GET"])
+    @readonly
     def api_items_by_batch():
-        session = get_session()
+        session = request_session()
         try:
             stockin_date = request.args.get("stockin_date")
             seller_code = request.args.get("seller_code")
@@ -1722,7 +1916,8 @@ def create_app():
                        i.item_image,
                        i.stockin_date,
                        i.seller_code,
-                       i.item_accessories
+                       i.item_accessories,
+                       i.row_version
                 FROM items i
                 WHERE i.stockin_date = :d AND i.seller_code = :s
                 ORDER BY i.item_code
@@ -1746,10 +1941,17 @@ def create_app():
                     "stockin_date": m["stockin_date"],
                     "seller_code": m["seller_code"],
                     "accessories": accessories,
-                    "accessories_text": "、".join(accessories)
+                    "accessories_text": "、".join(accessories),
+                    "row_version": m["row_version"],
                 }
 
+            lqip_map = _fetch_lqip_map(session, [m.get("item_image") for m in items])
+            # 打开批次（batch_edit 首次加载即调用本接口）→ 后台预热整批缩略图
+            _warm_thumbs([m.get("item_image") for m in items])
+
             rows = [to_row(m) for m in items]
+            for r in rows:
+                r["item_image_lqip"] = lqip_map.get(_image_key(r.get("item_image")))
             rows = sort_items_by_code(rows)  # ← 新增统一排序
             return jsonify({"total": len(rows), "items": rows})
 
@@ -1840,7 +2042,7 @@ def create_app():
         except (InvalidOperation, ValueError):
             return jsonify({"error": "基础图录费格式不正确"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
             # 拍卖回数不可重复
             exists = session.query(Auction).filter(Auction.auction_order == order).first()
@@ -1906,7 +2108,7 @@ def create_app():
         if not item_codes:
             return jsonify({"error": "缺少 item_codes"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
             auction = session.get(Auction, auction_id)
             if not auction:
@@ -2008,8 +2210,9 @@ def create_app():
     # [API] 供在库列表批量加入拍卖会使用：返回未结束的拍卖会
     # [API] 供在库列表批量加入拍卖会使用：返回拍卖会列表
     @app.route("/api/auctions/options_for_items", methods=["GET"])
+    @readonly
     def api_auction_options_for_items():
-        session = get_session()
+        session = request_session()
         try:
             # 不再按结束日期过滤，全部拍卖会都返回
             auctions = (
@@ -2104,7 +2307,7 @@ def create_app():
         # 操作人（暂时写死，后面接入登录后可改）
         operator = "admin"
 
-        session = get_session()
+        session = request_session()
 
         try:
             from create_database import Item
@@ -2213,44 +2416,51 @@ def create_app():
         filename = secure_filename(f"{item_code}{ext}")
 
         # === 新逻辑：保存到 SYSTEM 路径：年（YYYY）/ 月（YYMM）/ 批次号（YYMMDD_S）/ 文件 ===
-        # 1) 通过 item_code 反查该条目的 stockin_date、seller_code
-        session = get_session()
-        try:
-            from create_database import Item
-            it = session.get(Item, item_code)
-            if not it:
-                return jsonify({"error": "item 不存在"}), 404
+        # 1) 通过 item_code 反查该条目的 stockin_date、seller_code（只读查询，保存文件期间不占着数据库）
+        from create_database import Item
+        session = db_session()
+        it = session.get(Item, item_code)
+        if not it:
+            return jsonify({"error": "item 不存在"}), 404
+        stockin_date = str(it.stockin_date)  # YYYY-MM-DD
+        seller_code = it.seller_code
+        session.close()  # 保存文件期间归还连接；下面写占位图时同一会话重新取连接
+
+        # 2) 年、月（YYMM）、批次号（YYMMDD_S）
+        from datetime import datetime
+        dt = datetime.strptime(stockin_date, "%Y-%m-%d")
+        year_folder = str(dt.year)  # e.g. "2024"
+        yymm = dt.strftime("%y%m")  # e.g. "2408"
+        batch_code = _format_batch_code(stockin_date, seller_code)  # e.g. "240824_A"
 
-            stockin_date = str(it.stockin_date)  # YYYY-MM-DD
-            seller_code = it.seller_code
+        # 3) 目录：\\...\\system\\{year}\\{yymm}\\{batch_code}
+        dest_dir = os.path.join(SYSTEM_IMAGE_ROOT, year_folder, yymm, batch_code)
+        os.makedirs(dest_dir, exist_ok=True)
 
-            # 2) 年、月（YYMM）、批次号（YYMMDD_S）
-            from datetime import datetime
-            dt = datetime.strptime(stockin_date, "%Y-%m-%d")
-            year_folder = str(dt.year)  # e.g. "2024"
-            yymm = dt.strftime("%y%m")  # e.g. "2408"
-            batch_code = _format_batch_code(stockin_date, seller_code)  # e.g. "240824_A"
+        # 4) 文件名：内部编号（item_code）+ 原扩展名
+        save_path = os.path.join(dest_dir, filename)
 
-            # 3) 目录：\\...\\system\\{year}\\{yymm}\\{batch_code}
-            dest_dir = os.path.join(SYSTEM_IMAGE_ROOT, year_folder, yymm, batch_code)
-            os.makedirs(dest_dir, exist_ok=True)
+        # 5) 保存（同名覆盖）
+        file.save(save_path)
 
-            # 4) 文件名：内部编号（item_code）+ 原扩展名
-            save_path = os.path.join(dest_dir, filename)
+        # 6) 返回给前端可直接 <img src> 的 Web 路径（由 serve_system_file 路由提供）
+        rel_path = f"/files/system/{year_folder}/{yymm}/{batch_code}/{filename}"
 
-            # 5) 保存（同名覆盖）
-            file.save(save_path)
+        # 7) 顺带生成占位图（失败不影响上传结果）
+        lqip = None
+        try:
+            lqip = _save_placeholder(session, rel_path, save_path)
+            session.commit()
+        except Exception:
+            session.rollback()
+            lqip = None
 
-            # 6) 返回给前端可直接 <img src> 的 Web 路径（由 serve_system_file 路由提供）
-            rel_path = f"/files/system/{year_folder}/{yymm}/{batch_code}/{filename}"
-            return jsonify({"ok": True, "path": rel_path})
-        finally:
-            session.close()
+        return jsonify({"ok": True, "path": rel_path, "lqip": lqip})
 
     # [API] 入库：按日期/出品人生成空白物品（批次）
     @app.route("/api/stock-batches/generate-items", methods=["POST"])
     def api_generate_items():
-        from create_database import StockBatch, Item, Seller, ItemStatus
+        from create_database import StockBatch, Seller
         payload = request.json or {}
         stockin_date = payload.get("stockin_date")  # "YYYY-MM-DD"
         seller_code = (payload.get("seller_code") or "").strip()
@@ -2263,7 +2473,7 @@ def create_app():
         if not receiver:
             return jsonify({"error": "签收人必填"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
             # 将字符串日期转为 date（SQLAlchemy Date 需要）
             from datetime import datetime
@@ -2295,38 +2505,16 @@ def create_app():
                 if staff:
                     sb.stockin_staff = staff
 
-            # 3) 生成 item_code 并新建空白 item（若存在则跳过）
+            # 3) 生成 item_code 并新建空白 item（若存在则跳过）：一次查已存在、一次批量插入
             dt = datetime.strptime(stockin_date, "%Y-%m-%d")
             prefix = dt.strftime("%y%m%d") + f"_{seller_code}_"
-            created = 0
-            created_codes = []
-            for i in range(1, count + 1):
-                code = f"{prefix}{i}"
-                if not session.get(Item, code):
-                    default_status = None
-                    try:
-                        from create_database import ItemStatus
-                        # 优先使用「待上拍」作为默认状态
-                        default_status = session.get(ItemStatus, "待上拍")
-                    except Exception:
-                        pass
-                    it = Item(
-                        item_code=code,
-                        item_name=None, item_size=None, item_image=None,
-                        is_in_box=False, item_box_code=None, item_location=None,
-                        item_category=None, reserve_price=None, seller_name=None,
-                        seller_code=seller_code, starting_price=None,
-                        stockin_date=stockin_date_obj, item_order=None, item_barcode=None,
-                        photo_date_shot=None, photo_date_detail=None, photo_date_ps=None,
-                        item_material=None, item_seal=None, item_inscription=None,
-                        item_description=None, item_author=None,
-                        item_status=("待上拍" if default_status else None),
-                        item_notes=None
-                    )
-
-                    session.add(it)
-                    created += 1
-                created_codes.append(code)
+            created_codes = [f"{prefix}{i}" for i in range(1, count + 1)]
+            existing = _existing_item_codes(session, created_codes)
+            new_codes = [c for c in created_codes if c not in existing]
+            session.flush()  # 批次先落库，再插入引用它的物品
+            created = _bulk_insert_blank_items(session, new_codes, stockin_date_obj, seller_code,
+                                               _default_item_status(session))
+            log_ops_bulk(session, "item", "create", ((c, None, None) for c in new_codes))
             # 统一：把“实际新增件数”累加到批次
             sb.stockin_count = (sb.stockin_count or 0) + created
 
@@ -2340,34 +2528,16 @@ def create_app():
 
     # [API] 获取单件详情（含附属品）
     @app.route("/api/items/<item_code>", methods=["GET"])
+    @readonly
     def api_items_get(item_code):
-        session = get_session()
+        session = request_session()
         try:
             it = session.get(Item, item_code)
             if not it:
                 return jsonify({"error": "item 不存在"}), 404
 
-            # 附属品列表
-            accessories, _csv = normalize_accessories(session, it.item_accessories or "")
-
-            return jsonify({
-                "item_code": it.item_code,
-                "item_name": it.item_name,
-                "item_author": it.item_author,
-                "item_status": it.item_status,
-                "starting_price": float(it.starting_price) if it.starting_price is not None else None,
-                "reserve_price": float(it.reserve_price) if it.reserve_price is not None else None,
-                "item_location": it.item_location,
-                "item_box_code": it.item_box_code,
-                "item_category": it.item_category,
-                "item_notes": it.item_notes,
-                "item_size": it.item_size,
-                "item_image": it.item_image,
-                "stockin_date": str(it.stockin_date) if it.stockin_date else None,
-                "seller_code": it.seller_code,
-                "item_material": it.item_material,
-                "accessories": accessories
-            })
+            # 含附属品列表与 row_version（保存时带回）
+            return jsonify(item_detail(session, it))
         except Exception as e:
             session.rollback()
             return jsonify({"error": str(e)}), 500
@@ -2375,14 +2545,19 @@ def create_app():
             session.close()
 
     # [API] 在库编辑：PUT /api/items/<item_code>
+    # body 可带 row_version（GET 时拿到的版本）：与库中不一致时不保存，返回 409 + 当前值；
+    # 成功返回新的 row_version。未带时按读取时的版本条件更新（旧页面照常可用）
     @app.route("/api/items/<item_code>", methods=["PUT"])
     def api_items_update(item_code):
         payload = request.json or {}
-        session = get_session()
+        # 1) 读取与校验：只读会话查主库，不占写锁
+        ro = get_readonly_session(primary=True)
         try:
-            it = session.get(Item, item_code)
+            it = ro.get(Item, item_code)
             if not it:
                 return jsonify({"error": "item 不存在"}), 404
+            client_version = parse_row_version(payload.get("row_version"))
+            expected = client_version if client_version is not None else it.row_version
 
             before = {
                 "item_status": it.item_status,
@@ -2412,47 +2587,81 @@ def create_app():
             if sp is not None and rp is not None and sp > rp:
                 raise ValueError("起拍价不能高于底价")
 
-            it.starting_price = sp
-            it.reserve_price = rp
+            values = {"starting_price": sp, "reserve_price": rp}
 
             if "item_status" in payload:
-                it.item_status = ensure_status(session, payload.get("item_status"))
+                values["item_status"] = ensure_status(ro, payload.get("item_status"))
 
             # 其他字段直写（不包含附属品）
             for k in ["item_location", "item_box_code", "item_category", "item_notes",
                       "item_name", "item_author", "item_size", "item_image", "item_material"]:
                 if k in payload:
-                    setattr(it, k, (payload.get(k) if payload.get(k) not in ("", None) else None))
+                    values[k] = payload.get(k) if payload.get(k) not in ("", None) else None
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            ro.close()
+
+        # 2) 写入：一条条件 UPDATE + 操作日志
+        session = request_session()
+        try:
+            items_table = Item.__table__
+            res = session.execute(
+                items_table.update()
+                .where(items_table.c.item_code == item_code, items_table.c.row_version == expected)
+                .values(**values, row_version=items_table.c.row_version + 1)
+            )
+            if res.rowcount != 1:
+                session.rollback()
+                return conflict_response(item_conflicts({item_code: expected}))
 
             log_op(session, "item", item_code, "update", before=str(before), after=str(payload))
             session.commit()
-            return jsonify({"ok": True})
-        except ValueError as ve:
-            session.rollback()
-            return jsonify({"error": str(ve)}), 400
+            return jsonify({"ok": True, "row_version": expected + 1})
         except Exception as e:
             session.rollback()
             return jsonify({"error": str(e)}), 500
         finally:
             session.close()
 
-    # [API] 覆盖保存某件商品的附属品
+    # [API] 覆盖保存某件商品的附属品（body 可带 row_version，规则同 PUT /api/items/<item_code>）
     @app.route("/api/items/<item_code>/accessories", methods=["PUT"])
     def api_items_update_accessories(item_code):
-        session = get_session()
+        data = request.get_json(silent=True) or {}
+        ro = get_readonly_session(primary=True)
         try:
-            it = session.get(Item, item_code)
+            it = ro.get(Item, item_code)
             if not it:
                 return jsonify({"error": f"item 不存在: {item_code}"}), 404
+            client_version = parse_row_version(data.get("row_version"))
+            expected = client_version if client_version is not None else it.row_version
 
-            data = request.get_json(silent=True) or {}
             accessories = data.get("accessories", [])
             if isinstance(accessories, str):
                 accessories = [s.strip() for s in accessories.replace("、", ",").split(",") if s.strip()]
 
             # 使用映射表覆盖保存
-            acc_sorted, csv_text = normalize_accessories(session, accessories)
-            it.item_accessories = csv_text
+            acc_sorted, csv_text = normalize_accessories(ro, accessories)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            ro.close()
+
+        session = request_session()
+        try:
+            items_table = Item.__table__
+            res = session.execute(
+                items_table.update()
+                .where(items_table.c.item_code == item_code, items_table.c.row_version == expected)
+                .values(item_accessories=csv_text, row_version=items_table.c.row_version + 1)
+            )
+            if res.rowcount != 1:
+                session.rollback()
+                return conflict_response(item_conflicts({item_code: expected}))
 
             try:
                 log_op(session, "item", item_code, "update_accessories", before=None, after=str(accessories))
@@ -2460,189 +2669,199 @@ def create_app():
                 pass
 
             session.commit()
-            return jsonify({"ok": True})
+            return jsonify({"ok": True, "row_version": expected + 1})
         except Exception as e:
             session.rollback()
             return jsonify({"error": str(e)}), 500
         finally:
             session.close()
 
-    # [API] 在库查询（分页+筛选+模糊）
-    @app.route("/api/items", methods=["GET"], endpoint="api_items_index")
-    def api_items_index():
-        session = get_session()
-        try:
-            # 参数
-            page = max(int(request.args.get("page", 1)), 1)
-            page_size = min(max(int(request.args.get("page_size", 20)), 1), 100)
-            # 兼容 keyword -> q
-            q = (request.args.get("q") or request.args.get("keyword") or "").strip()
-            seller_code = request.args.get("seller_code") or None
-            status = request.args.get("status") or None
-            status_group = request.args.get("status_group") or None  # 一级状态（在库 / 出库）
-            category = request.args.get("category") or None
-            # 新增筛选参数（列表页顶栏/表头筛选会用到）
-            seller = request.args.get("seller") or None  # 出品人（姓名/代号模糊）
-            seller_codes = request.args.get("seller_codes") or None  # 多选：逗号分隔
-            stockin_date_from = request.args.get("stockin_date_from") or None
-            stockin_date_to = request.args.get("stockin_date_to") or None
-            box_code = request.args.get("box_code") or None
-            loc = request.args.get("loc") or None
-            item_name = request.args.get("item_name") or None
-            # 兼容 size -> item_size
-            item_size = request.args.get("item_size") or request.args.get("size") or None
-            item_author = request.args.get("item_author") or None
-            item_material = request.args.get("item_material") or None
-            item_seal = request.args.get("item_seal") or None
-            item_inscription = request.args.get("item_inscription") or None
-            item_description = request.args.get("item_description") or None
-            sp_min = request.args.get("sp_min") or None
-            sp_max = request.args.get("sp_max") or None
-            rp_min = request.args.get("rp_min") or None
-            rp_max = request.args.get("rp_max") or None
-            EMPTY = "__EMPTY__"
-
-            query = session.query(Item)
-            if seller_code:
-                query = query.filter(Item.seller_code == seller_code)
-
-            # 多个出品人（多选）：seller_codes=CODE1,CODE2,...
-            if seller_codes:
-                arr = [s.strip().upper() for s in (seller_codes or '').split(',') if s.strip()]
-                if arr:
-                    query = query.filter(Item.seller_code.in_(arr))
-
-            # 先按「一级状态」（在库 / 出库）筛选
-            if status_group:
-                from create_database import ItemStatus
-                # 根据二级状态名，关联到 ItemStatus 拿到 group_name
-                query = query.outerjoin(ItemStatus, Item.item_status == ItemStatus.item_status)
-                query = query.filter(ItemStatus.group_name == status_group)
-
-            # 再按「二级状态字符串」筛选
-            if status:
-                s = status.strip()
-                if s == "EMPTY":
-                    # item_status 为空或空字符串
-                    query = query.filter((Item.item_status.is_(None)) | (Item.item_status == ""))
-                elif s == "NON_EMPTY":
-                    # item_status 非空
-                    query = query.filter((Item.item_status.isnot(None)) & (Item.item_status != ""))
-                else:
-                    query = query.filter(Item.item_status == s)
+    def _build_items_query(session, args):
+        """
+        按 /api/items 的筛选参数构造 Item 查询（不含排序/分页）；
+        在库列表与在库导出共用。args：request.args 或普通 dict
+        """
+        # 兼容 keyword -> q
+        q = (args.get("q") or args.get("keyword") or "").strip()
+        seller_code = args.get("seller_code") or None
+        status = args.get("status") or None
+        status_group = args.get("status_group") or None  # 一级状态（在库 / 出库）
+        category = args.get("category") or None
+        # 新增筛选参数（列表页顶栏/表头筛选会用到）
+        seller = args.get("seller") or None  # 出品人（姓名/代号模糊）
+        seller_codes = args.get("seller_codes") or None  # 多选：逗号分隔
+        stockin_date_from = args.get("stockin_date_from") or None
+        stockin_date_to = args.get("stockin_date_to") or None
+        box_code = args.get("box_code") or None
+        loc = args.get("loc") or None
+        item_name = args.get("item_name") or None
+        # 兼容 size -> item_size
+        item_size = args.get("item_size") or args.get("size") or None
+        item_author = args.get("item_author") or None
+        item_material = args.get("item_material") or None
+        item_seal = args.get("item_seal") or None
+        item_inscription = args.get("item_inscription") or None
+        item_description = args.get("item_description") or None
+        sp_min = args.get("sp_min") or None
+        sp_max = args.get("sp_max") or None
+        rp_min = args.get("rp_min") or None
+        rp_max = args.get("rp_max") or None
+        EMPTY = "__EMPTY__"
+
+        query = session.query(Item)
+        if seller_code:
+            query = query.filter(Item.seller_code == seller_code)
+
+        # 多个出品人（多选）：seller_codes=CODE1,CODE2,...
+        if seller_codes:
+            arr = [s.strip().upper() for s in (seller_codes or '').split(',') if s.strip()]
+            if arr:
+                query = query.filter(Item.seller_code.in_(arr))
+
+        # 先按「一级状态」（在库 / 出库）筛选
+        if status_group:
+            from create_database import ItemStatus
+            # 根据二级状态名，关联到 ItemStatus 拿到 group_name
+            query = query.outerjoin(ItemStatus, Item.item_status == ItemStatus.item_status)
+            query = query.filter(ItemStatus.group_name == status_group)
+
+        # 再按「二级状态字符串」筛选
+        if status:
+            s = status.strip()
+            if s == "EMPTY":
+                # item_status 为空或空字符串
+                query = query.filter((Item.item_status.is_(None)) | (Item.item_status == ""))
+            elif s == "NON_EMPTY":
+                # item_status 非空
+                query = query.filter((Item.item_status.isnot(None)) & (Item.item_status != ""))
+            else:
+                query = query.filter(Item.item_status == s)
 
-            if category == EMPTY:
-                query = query.filter((Item.item_category.is_(None)) | (Item.item_category == ""))
-            elif category:
-                query = query.filter(Item.item_category == category)
+        if category == EMPTY:
+            query = query.filter((Item.item_category.is_(None)) | (Item.item_category == ""))
+        elif category:
+            query = query.filter(Item.item_category == category)
 
 
-            from sqlalchemy import or_, and_
-            from datetime import datetime
+        from sqlalchemy import or_, and_
+        from datetime import datetime
 
-            if seller:  # 姓名/代号模糊匹配
-                like = f"%{seller}%"
-                query = query.filter(or_(Item.seller_name.ilike(like), Item.seller_code.ilike(like)))
+        if seller:  # 姓名/代号模糊匹配
+            like = f"%{seller}%"
+            query = query.filter(or_(Item.seller_name.ilike(like), Item.seller_code.ilike(like)))
 
-            if stockin_date_from:
-                try:
-                    d = datetime.strptime(stockin_date_from, "%Y-%m-%d").date()
-                    query = query.filter(Item.stockin_date >= d)
-                except Exception:
-                    pass
+        if stockin_date_from:
+            try:
+                d = datetime.strptime(stockin_date_from, "%Y-%m-%d").date()
+                query = query.filter(Item.stockin_date >= d)
+            except Exception:
+                pass
 
-            if stockin_date_to:
-                try:
-                    d = datetime.strptime(stockin_date_to, "%Y-%m-%d").date()
-                    query = query.filter(Item.stockin_date <= d)
-                except Exception:
-                    pass
+        if stockin_date_to:
+            try:
+                d = datetime.strptime(stockin_date_to, "%Y-%m-%d").date()
+                query = query.filter(Item.stockin_date <= d)
+            except Exception:
+                pass
 
-            if box_code:
-                like = f"%{box_code}%"
-                query = query.filter((Item.item_box_code.ilike(like)))
-
-            if loc == EMPTY:
-                query = query.filter((Item.item_location.is_(None)) | (Item.item_location == ""))
-            elif loc:
-                like = f"%{loc}%"
-                query = query.filter(Item.item_location.ilike(like))
-
-            if item_name== EMPTY:
-                query = query.filter((Item.item_name.is_(None)) | (Item.item_name == ""))
-            elif item_name:
-                like = f"%{item_name}%"
-                query = query.filter(Item.item_name.ilike(like))
-
-
-            if item_size== EMPTY:
-                query = query.filter((Item.item_size.is_(None)) | (Item.item_size == ""))
-            elif item_size:
-                like = f"%{item_size}%"
-                query = query.filter(Item.item_size.ilike(like))
-
-            if item_author== EMPTY:
-                query = query.filter((Item.item_author.is_(None)) | (Item.item_author == ""))
-            elif item_author:
-                like = f"%{item_author}%"
-                query = query.filter(Item.item_author.ilike(like))
-
-            if item_material== EMPTY:
-                query = query.filter((Item.item_material.is_(None)) | (Item.item_material == ""))
-            elif item_material:
-                like = f"%{item_material}%"
-                query = query.filter(Item.item_material.ilike(like))
-
-            if item_seal== EMPTY:
-                query = query.filter((Item.item_seal.is_(None)) | (Item.item_seal == ""))
-            elif item_seal:
-                like = f"%{item_seal}%"
-                query = query.filter(Item.item_seal.ilike(like))
-
-            if item_inscription== EMPTY:
-                query = query.filter((Item.item_inscription.is_(None)) | (Item.item_inscription == ""))
-            elif item_inscription:
-                like = f"%{item_inscription}%"
-                query = query.filter(Item.item_inscription.ilike(like))
-
-            if item_description== EMPTY:
-                query = query.filter((Item.item_description.is_(None)) | (Item.item_description == ""))
-            elif item_description:
-                like = f"%{item_description}%"
-                query = query.filter(Item.item_description.ilike(like))
-            # 价格范围（万日元，整数字符串）
-            def _to_int(v):
-                try:
-                    return int(str(v))
-                except Exception:
-                    return None
-
-            if request.args.get("sp_empty") == "1":
-                query = query.filter(Item.starting_price.is_(None))
-            if request.args.get("rp_empty") == "1":
-                query = query.filter(Item.reserve_price.is_(None))
-
-            _sp_min = _to_int(sp_min);
-            _sp_max = _to_int(sp_max)
-            _rp_min = _to_int(rp_min);
-            _rp_max = _to_int(rp_max)
-            if _sp_min is not None:
-                query = query.filter(Item.starting_price >= _sp_min)
-            if _sp_max is not None:
-                query = query.filter(Item.starting_price <= _sp_max)
-            if _rp_min is not None:
-                query = query.filter(Item.reserve_price >= _rp_min)
-            if _rp_max is not None:
-                query = query.filter(Item.reserve_price <= _rp_max)
-
-            if q:
-                like = f"%{q}%"
-                query = query.filter(
-                    (Item.item_code.ilike(like)) |
-                    (Item.item_name.ilike(like)) |
-                    (Item.item_author.ilike(like)) |
-                    (Item.item_description.ilike(like))
-                )
+        if box_code:
+            like = f"%{box_code}%"
+            query = query.filter((Item.item_box_code.ilike(like)))
+
+        if loc == EMPTY:
+            query = query.filter((Item.item_location.is_(None)) | (Item.item_location == ""))
+        elif loc:
+            like = f"%{loc}%"
+            query = query.filter(Item.item_location.ilike(like))
+
+        if item_name== EMPTY:
+            query = query.filter((Item.item_name.is_(None)) | (Item.item_name == ""))
+        elif item_name:
+            like = f"%{item_name}%"
+            query = query.filter(Item.item_name.ilike(like))
+
+
+        if item_size== EMPTY:
+            query = query.filter((Item.item_size.is_(None)) | (Item.item_size == ""))
+        elif item_size:
+            like = f"%{item_size}%"
+            query = query.filter(Item.item_size.ilike(like))
+
+        if item_author== EMPTY:
+            query = query.filter((Item.item_author.is_(None)) | (Item.item_author == ""))
+        elif item_author:
+            like = f"%{item_author}%"
+            query = query.filter(Item.item_author.ilike(like))
+
+        if item_material== EMPTY:
+            query = query.filter((Item.item_material.is_(None)) | (Item.item_material == ""))
+        elif item_material:
+            like = f"%{item_material}%"
+            query = query.filter(Item.item_material.ilike(like))
+
+        if item_seal== EMPTY:
+            query = query.filter((Item.item_seal.is_(None)) | (Item.item_seal == ""))
+        elif item_seal:
+            like = f"%{item_seal}%"
+            query = query.filter(Item.item_seal.ilike(like))
+
+        if item_inscription== EMPTY:
+            query = query.filter((Item.item_inscription.is_(None)) | (Item.item_inscription == ""))
+        elif item_inscription:
+            like = f"%{item_inscription}%"
+            query = query.filter(Item.item_inscription.ilike(like))
+
+        if item_description== EMPTY:
+            query = query.filter((Item.item_description.is_(None)) | (Item.item_description == ""))
+        elif item_description:
+            like = f"%{item_description}%"
+            query = query.filter(Item.item_description.ilike(like))
+        # 价格范围（万日元，整数字符串）
+        def _to_int(v):
+            try:
+                return int(str(v))
+            except Exception:
+                return None
+
+        if args.get("sp_empty") == "1":
+            query = query.filter(Item.starting_price.is_(None))
+        if args.get("rp_empty") == "1":
+            query = query.filter(Item.reserve_price.is_(None))
+
+        _sp_min = _to_int(sp_min);
+        _sp_max = _to_int(sp_max)
+        _rp_min = _to_int(rp_min);
+        _rp_max = _to_int(rp_max)
+        if _sp_min is not None:
+            query = query.filter(Item.starting_price >= _sp_min)
+        if _sp_max is not None:
+            query = query.filter(Item.starting_price <= _sp_max)
+        if _rp_min is not None:
+            query = query.filter(Item.reserve_price >= _rp_min)
+        if _rp_max is not None:
+            query = query.filter(Item.reserve_price <= _rp_max)
+
+        if q:
+            like = f"%{q}%"
+            query = query.filter(
+                (Item.item_code.ilike(like)) |
+                (Item.item_name.ilike(like)) |
+                (Item.item_author.ilike(like)) |
+                (Item.item_description.ilike(like))
+            )
+
+        return query
+
+    # [API] 在库查询（分页+筛选+模糊）
+    @app.route("/api/items", methods=["GET"], endpoint="api_items_index")
+    @readonly
+    def api_items_index():
+        session = request_session()
+        try:
+            # 参数
+            page = max(int(request.args.get("page", 1)), 1)
+            page_size = min(max(int(request.args.get("page_size", 20)), 1), 100)
+            query = _build_items_query(session, request.args)
 
             # 取出全部，做自然排序
             all_rows = query.all()
@@ -2694,6 +2913,9 @@ def create_app():
                 except Exception:
                     auction_map = {}
 
+            # ===== 本页图片的占位图（LQIP）=====
+            lqip_map = _fetch_lqip_map(session, [r.item_image for r in rows])
+
             def to_row(x):
                 # 把拍卖会 order 转成 “xx回、yy回” 这样的字符串
                 orders = auction_map.get(x.item_code, []) or []
@@ -2715,6 +2937,7 @@ def create_app():
                     "item_box_code": x.item_box_code,
                     "item_category": x.item_category,
                     "item_image": x.item_image,
+                    "item_image_lqip": lqip_map.get(_image_key(x.item_image)),
                     "stockin_date": str(x.stockin_date) if x.stockin_date else None,
                     "item_size": x.item_size,
                     "item_material": x.item_material,
@@ -2723,6 +2946,7 @@ def create_app():
                     "item_description": x.item_description,
                     "accessories_text": "、".join(acc_list),
                     "auction_label": auction_label,
+                    "row_version": x.row_version,
                 }
 
             return jsonify({
@@ -2742,7 +2966,7 @@ def create_app():
             if not payload.get(r):
                 return jsonify({"error": f"缺少必填字段: {r}"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
             if session.get(Item, payload["item_code"]):
                 return jsonify({"error": "item_code 已存在"}), 400
@@ -2831,44 +3055,25 @@ def create_app():
         except Exception:
             return jsonify({"error": "stockin_date 必须为 YYYY-MM-DD"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
-            created = 0
-            # 计算默认状态（批量复用）
-            default_status = None
-            try:
-                from create_database import ItemStatus
-                if session.get(ItemStatus, "待上拍"):
-                    default_status = "待上拍"
-            except Exception:
-                default_status = None
-            for row in items:
-                code = (row.get("item_code") or "").strip()
-                if not code:
-                    continue
-                if session.get(Item, code):
-                    continue
-                it = Item(
-                    item_code=code,
-                    stockin_date=stockin_date_obj,
-                    seller_code=seller_code,
-                    item_name=None, item_size=None, item_location=None,
-                    item_category=None, item_image=None, item_notes=None,
-                    starting_price=None, reserve_price=None, item_status=default_status,
-                    item_box_code=None, item_author=None
-                )
-                session.add(it)
-                created += 1
-                try:
-                    log_op(session, "item", code, "create", before=None, after=None)
-                except Exception:
-                    pass
+            codes = list(dict.fromkeys(
+                (row.get("item_code") or "").strip() for row in items if isinstance(row, dict)
+            ))
+            codes = [c for c in codes if c]
+            existing = _existing_item_codes(session, codes)
+            new_codes = [c for c in codes if c not in existing]
 
             from create_database import StockBatch
             sb = session.get(StockBatch, {"stockin_date": stockin_date_obj, "seller_code": seller_code})
             if not sb:
                 sb = StockBatch(stockin_date=stockin_date_obj, seller_code=seller_code, stockin_count=0)
                 session.add(sb)
+                session.flush()  # 批次先落库，再插入引用它的物品
+
+            created = _bulk_insert_blank_items(session, new_codes, stockin_date_obj, seller_code,
+                                               _default_item_status(session))
+            log_ops_bulk(session, "item", "create", ((c, None, None) for c in new_codes))
             sb.stockin_count = (sb.stockin_count or 0) + created
 
             session.commit()
@@ -2882,7 +3087,7 @@ def create_app():
     # === 新增：删除单件（前端行内“删除”按钮用） ===
     @app.route("/api/items/<item_code>", methods=["DELETE"])
     def api_items_delete(item_code):
-        session = get_session()
+        session = request_session()
         try:
             it = session.get(Item, item_code)
             if not it:
@@ -2931,7 +3136,7 @@ def create_app():
         if not stockin_date or not seller_code:
             return jsonify({"error": "缺少 stockin_date 或 seller_code"}), 400
 
-        session = get_session()
+        session = request_session()
         try:
             # 读取该批次的必要字段
             rows = session.execute(text("""
@@ -3074,11 +3279,42 @@ def create_app():
             if not rel:
                 missing.append(it["item_code"]);
                 continue
-            fs = _abs_path_from_web(rel)
+            try:
+                fs = abs_path_from_web(rel)
+            except ValueError:
+                missing.append(it["item_code"])  # 路径非法，按缺图处理
+                continue
             if not os.path.exists(fs):
                 missing.append(it["item_code"])
         return missing
 
+    # 批次清单导出（Excel / PDF）图片单元格边长（像素）与嵌入图实际像素（2 倍用于打印）；
+    # 两种导出用同一尺寸，共用派生图缓存
+    EXPORT_IMG_CELL_PX = 100  # ← 想要正方形 110px/120px，只改这里
+    EXPORT_IMG_PX = EXPORT_IMG_CELL_PX * 2
+
+    def _export_logo_path():
+        """config.LOGO_PATH 的磁盘路径（相对路径按项目根目录解析）；未配置返回 None"""
+        try:
+            from config import LOGO_PATH as _CFG_LOGO
+        except Exception:
+            _CFG_LOGO = None
+        if not _CFG_LOGO:
+            return None
+        return _CFG_LOGO if os.path.isabs(_CFG_LOGO) else os.path.join(BASE_DIR, _CFG_LOGO)
+
+    def _export_image_paths(items):
+        """导出用：逐行把 item_image 转成磁盘路径；无图或路径非法（越出 SYSTEM_IMAGE_ROOT 等）的行为 None，只丢该行图片"""
+        paths = []
+        for it in items:
+            rel = it.get("item_image")
+            try:
+                paths.append(abs_path_from_web(rel) if rel else None)
+            except Exception as e:
+                print("导出图片路径无效:", it.get("item_code"), rel, e)
+                paths.append(None)
+        return paths
+
     def _export_excel(stockin_date: str, seller_code: str, seller_name: str, items):
         # 依赖检查
         if Workbook is None:
@@ -3090,14 +3326,8 @@ def create_app():
         from openpyxl.styles import Alignment, Border, Side, Font, PatternFill
         from openpyxl.worksheet.page import PageMargins
 
-        # 从 config 读取 LOGO 路径（可相对 / 绝对）
-        try:
-            from config import LOGO_PATH as _CFG_LOGO
-        except Exception:
-            _CFG_LOGO = None
-
-        # ===== 这里一个参数控制“图片单元格”的边长（像素）=====
-        IMG_CELL_PX = 100  # ← 想要正方形 110px/120px，只改这里
+        # “图片单元格”的边长（像素）见 EXPORT_IMG_CELL_PX
+        IMG_CELL_PX = EXPORT_IMG_CELL_PX
 
         # px ↔ pt / 列宽换算
         def px_to_pt(px):  # 96 dpi → 72 pt/inch
@@ -3150,12 +3380,9 @@ def create_app():
         # LOGO：页眉中间（如路径存在）
         center_header_code = "&G"
         logo_added = False
-        logo_fs = None
-        if _CFG_LOGO:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            logo_fs = _CFG_LOGO if os.path.isabs(_CFG_LOGO) else os.path.join(base_dir, _CFG_LOGO)
-            if not os.path.exists(logo_fs):
-                logo_fs = None
+        logo_fs = _export_logo_path()
+        if logo_fs and not os.path.exists(logo_fs):
+            logo_fs = None
 
         try:
             ws.header_footer.left_header = hdr_left
@@ -3274,7 +3501,13 @@ def create_app():
         row_idx = header_row + 2
         MIN_PAD = 2  # 最小边距（px）
 
-        for it in items_sorted:
+        # ------------ 图片预处理（进程池并行）------------
+        # 嵌入图：EXIF 转正 + 缩到单元格 2 倍像素（打印清晰度够用）的 JPEG，
+        # 与列表缩略图共用派生图缓存；整批图片先并行准备好，下面的循环只负责锚定
+        img_fulls = _export_image_paths(items_sorted) if XLImage is not None else [None] * len(items_sorted)
+        prepared_imgs = prepare_export_images(img_fulls, EXPORT_IMG_PX, quality=80)
+
+        for it, prepared in zip(items_sorted, prepared_imgs):
             ws.cell(row=row_idx, column=1, value=it.get("item_code") or "")
             ws.cell(row=row_idx, column=2, value=None)
             ws.cell(row=row_idx, column=3, value=it.get("item_name") or "")
@@ -3296,65 +3529,48 @@ def create_app():
             avail_h = max(1, cell_h_px - 2 * MIN_PAD)
 
             # ===== 图片：等比缩放 contain + 单元格内居中，不改变源文件像素 =====
-            rel = it.get("item_image")
             placed = False
 
             try:
-                if rel and XLImage is not None:
-                    fs = _abs_path_from_web(rel) if callable(globals().get("_abs_path_from_web")) else rel
-                    if os.path.exists(fs):
-                        # 读原始字节
-                        with open(fs, "rb") as _f:
-                            raw = _f.read()
-                        # EXIF 自动转正（不改变像素分辨率）
-                        try:
-                            from PIL import Image as PILImage, ImageOps
-                            bio = io.BytesIO(raw)
-                            with PILImage.open(bio) as im:
-                                im = ImageOps.exif_transpose(im)
-                                out = io.BytesIO()
-                                fmt = im.format or "PNG"
-                                im.save(out, format=fmt, quality=95)
-                                raw = out.getvalue()
-                        except Exception:
-                            pass
-                        # 构造图片对象，拿到原始像素尺寸
-                        buf = io.BytesIO(raw)
-                        ximg = XLImage(buf)
-                        img_w_px = int(ximg.width)
-                        img_h_px = int(ximg.height)
-                        # 目标：本项目图片列固定是 B 列
-                        target_col_letter = 'B'
-
-                        # 取得 B列、当前行 的单元格像素盒子大小（列宽×行高，单位：px）
-                        cell_w_px, cell_h_px = get_cell_box_px(ws, target_col_letter, row_idx)
-                        # —— 等比例缩放（contain）——
-                        scale_w = cell_w_px / max(1, img_w_px)
-                        scale_h = cell_h_px / max(1, img_h_px)
-                        scale = min(scale_w, scale_h)
-                        if not ALLOW_UPSCALE:
-                            scale = min(scale, 1.0)  # 只缩小不放大，保证清晰
-                        disp_w_px = int(round(img_w_px * scale))
-                        disp_h_px = int(round(img_h_px * scale))
-
-                        # —— 居中偏移（以单元格左上角为原点）——
-                        off_x_px = max(0, (cell_w_px - disp_w_px) // 2)
-                        off_y_px = max(0, (cell_h_px - disp_h_px) // 2)
-                        # —— OneCellAnchor 锚在 B列 的该行 ——（0-based：B=1, 行=row_idx-1）
-                        col0 = 1
-                        row0 = row_idx - 1
-
-                        marker = AnchorMarker(
-                            col=col0,
-                            colOff=off_x_px * EMU_PER_PX,
-                            row=row0,
-                            rowOff=off_y_px * EMU_PER_PX
-                        )
-                        # 关键：ext 必须是 XDRPositiveSize2D（不是 geometry.PositiveSize2D）
-                        ext = XDRPositiveSize2D(disp_w_px * EMU_PER_PX, disp_h_px * EMU_PER_PX)
-                        ximg.anchor = OneCellAnchor(_from=marker, ext=ext)
-                        ws.add_image(ximg)
-                        placed = True
+                if prepared:
+                    raw, img_w_px, img_h_px = prepared
+                    buf = io.BytesIO(raw)
+                    ximg = XLImage(buf)
+                    # 没装 PIL 时子进程拿不到尺寸，以 XLImage 读到的为准
+                    img_w_px = int(img_w_px or ximg.width)
+                    img_h_px = int(img_h_px or ximg.height)
+                    # 目标：本项目图片列固定是 B 列
+                    target_col_letter = 'B'
+
+                    # 取得 B列、当前行 的单元格像素盒子大小（列宽×行高，单位：px）
+                    cell_w_px, cell_h_px = get_cell_box_px(ws, target_col_letter, row_idx)
+                    # —— 等比例缩放（contain）——
+                    scale_w = cell_w_px / max(1, img_w_px)
+                    scale_h = cell_h_px / max(1, img_h_px)
+                    scale = min(scale_w, scale_h)
+                    if not ALLOW_UPSCALE:
+                        scale = min(scale, 1.0)  # 只缩小不放大，保证清晰
+                    disp_w_px = int(round(img_w_px * scale))
+                    disp_h_px = int(round(img_h_px * scale))
+
+                    # —— 居中偏移（以单元格左上角为原点）——
+                    off_x_px = max(0, (cell_w_px - disp_w_px) // 2)
+                    off_y_px = max(0, (cell_h_px - disp_h_px) // 2)
+                    # —— OneCellAnchor 锚在 B列 的该行 ——（0-based：B=1, 行=row_idx-1）
+                    col0 = 1
+                    row0 = row_idx - 1
+
+                    marker = AnchorMarker(
+                        col=col0,
+                        colOff=off_x_px * EMU_PER_PX,
+                        row=row0,
+                        rowOff=off_y_px * EMU_PER_PX
+                    )
+                    # 关键：ext 必须是 XDRPositiveSize2D（不是 geometry.PositiveSize2D）
+                    ext = XDRPositiveSize2D(disp_w_px * EMU_PER_PX, disp_h_px * EMU_PER_PX)
+                    ximg.anchor = OneCellAnchor(_from=marker, ext=ext)
+                    ws.add_image(ximg)
+                    placed = True
             except Exception as e:
                 print("图片放置失败:", e)
 
@@ -3385,6 +3601,19 @@ def create_app():
         fname = f"{_format_batch_code(stockin_date, seller_code)}.xlsx"
         return bio, fname
 
+    def _batch_export_key(fmt: str, batch_code: str, seller_name: str, items) -> str:
+        """导出缓存键：明细行 + 出品人名 + LOGO/图片文件的 mtime 与大小"""
+        files = [_export_logo_path()]
+        for it in items:
+            rel = (it.get("item_image") or "").strip()
+            if not rel:
+                continue
+            try:
+                files.append(abs_path_from_web(rel))
+            except ValueError:
+                continue  # 路径非法：导出时该行不带图，也不参与缓存键
+        return export_key(fmt, batch_code, seller_name, items, files)
+
     def _export_pdf_via_excel_to_pdf(stockin_date: str, seller_code: str, seller_name: str, items):
         """
         新版 PDF 导出流程：
@@ -3438,15 +3667,73 @@ def create_app():
         download_name = out_pdf.name
         return bio_pdf, download_name
 
+    def _export_pdf_native(stockin_date: str, seller_code: str, seller_name: str, items):
+        """
+        ReportLab 直出批次清单 PDF（版式同 _export_excel 的打印效果），
+        同样保存一份到 {BASE_DIR}/exports/pdf/ 再返回给浏览器
+        """
+        items_sorted = sort_items_by_code(items)
+        # 与 _export_excel 同一尺寸（EXPORT_IMG_PX），共用派生图缓存；路径非法的行只丢图片
+        images = prepare_export_images(_export_image_paths(items_sorted), EXPORT_IMG_PX, quality=80)
+
+        logo_fs = _export_logo_path()
+
+        batch_code = _format_batch_code(stockin_date, seller_code)
+        display_name = (seller_name or seller_code).strip()
+        data = render_batch_pdf(batch_code, display_name, items_sorted, images, logo_fs,
+                                img_cell_px=EXPORT_IMG_CELL_PX)
+
+        export_dir = Path(BASE_DIR) / "exports" / "pdf"
+        try:
+            export_dir.mkdir(parents=True, exist_ok=True)
+            (export_dir / f"{batch_code}.pdf").write_bytes(data)
+        except OSError:
+            pass
+        return BytesIO(data), f"{batch_code}.pdf"
+
+    def _export_pdf(stockin_date: str, seller_code: str, seller_name: str, items):
+        """按 config.PDF_RENDERER 选择 PDF 渲染方式"""
+        if (PDF_RENDERER or "").lower() == "excel":
+            return _export_pdf_via_excel_to_pdf(stockin_date, seller_code, seller_name, items)
+        return _export_pdf_native(stockin_date, seller_code, seller_name, items)
+
+    EXPORT_MIMETYPES = {
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "pdf": "application/pdf",
+    }
+
+    def _render_batch_export(stockin_date: str, seller_code: str, fmt: str, seller_name: str, items):
+        """
+        生成批次导出文件（xlsx / pdf），返回 (可读文件对象, 下载文件名)，调用方负责关闭
+        - 批次内容未变化：返回已打开的缓存文件（打开后不怕被并发写入的新版本删掉）
+        - 否则返回 BytesIO
+        """
+        batch_code = _format_batch_code(stockin_date, seller_code)
+        # 图片单元格边长也进缓存键：改 EXPORT_IMG_CELL_PX 后旧缓存自动失效
+        variant = fmt if fmt != "pdf" else f"pdf:{PDF_RENDERER}"
+        key = _batch_export_key(f"{variant}:{EXPORT_IMG_CELL_PX}", batch_code, seller_name, items)
+        hit = cached_export(batch_code, key, fmt)
+        if hit:
+            return hit, f"{batch_code}.{fmt}"
+
+        if fmt == "xlsx":
+            bio, fname = _export_excel(stockin_date, seller_code, seller_name, items)
+        else:
+            bio, fname = _export_pdf(stockin_date, seller_code, seller_name, items)
+        store_export(batch_code, key, fmt, bio.getvalue())
+        bio.seek(0)
+        return bio, fname
+
     # ============================================================================
     # 六、Stock Batches（批次）相关接口
     # ============================================================================
 
     # [API] 批次列表
     @app.route("/api/stock-batches", methods=["GET"])
+    @readonly
     def api_stock_batches():
         from create_database import StockBatch, Item, Seller, ItemStatus
-        session = get_session()
+        session = request_session()
         try:
             batches = session.query(StockBatch).all()
 
@@ -3490,8 +3777,9 @@ def create_app():
 
     # [API] 批次导出前的“缺图”预检
     @app.route("/api/batches/<stockin_date>/<seller_code>/precheck", methods=["GET"])
+    @readonly
     def api_batch_precheck(stockin_date, seller_code):
-        session = get_session()
+        session = request_session()
         try:
             items = _fetch_batch_items(session, stockin_date, seller_code)
             missing = _check_missing_images(items)
@@ -3503,8 +3791,9 @@ def create_app():
 
     # [API] 批次编号列表（给标签打印/预览用）
     @app.route("/api/batches/<stockin_date>/<seller_code>/codes", methods=["GET"])
+    @readonly
     def api_batch_codes(stockin_date, seller_code):
-        session = get_session()
+        session = request_session()
         try:
             seller_code = (seller_code or "").strip().upper()
 
@@ -3533,8 +3822,9 @@ def create_app():
 
     # [下载] 导出 Excel / PDF
     @app.route("/download/batches/<stockin_date>/<seller_code>.<ext>", methods=["GET"])
+    @readonly
     def download_batch(stockin_date, seller_code, ext):
-        session = get_session()
+        session = request_session()
         try:
             items = _fetch_batch_items(session, stockin_date, seller_code)
             sname = _fetch_seller_name(session, seller_code)
@@ -3543,15 +3833,12 @@ def create_app():
                 # 直接返回 400，前端在点击前会先预检，这里是双保险
                 return jsonify({"ok": False, "error": "图片缺失", "missing": missing}), 400
 
-            if ext.lower() == "xlsx":
-                bio, fname = _export_excel(stockin_date, seller_code, sname, items)
-                return send_file(bio, as_attachment=True, download_name=fname,
-                                 mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            elif ext.lower() == "pdf":
-                bio, fname = _export_pdf_via_excel_to_pdf(stockin_date, seller_code, sname, items)
-                return send_file(bio, as_attachment=True, download_name=fname, mimetype="application/pdf")
-            else:
+            fmt = ext.lower()
+            if fmt not in EXPORT_MIMETYPES:
                 return jsonify({"error": "不支持的格式"}), 400
+
+            src, fname = _render_batch_export(stockin_date, seller_code, fmt, sname, items)
+            return send_file(src, as_attachment=True, download_name=fname, mimetype=EXPORT_MIMETYPES[fmt])
         except RuntimeError as re:
             # 缺依赖的友好提示
             return jsonify({"ok": False, "error": str(re)}), 500
@@ -3560,6 +3847,554 @@ def create_app():
         finally:
             session.close()
 
+    # [下载] 多批次打包（zip，流式返回）
+    # GET  /download/batches.zip?batches=2025-08-24:A,2025-08-24:B&format=xlsx
+    # GET  /download/batches.zip?date_from=2025-08-01&date_to=2025-08-31&format=pdf
+    # POST /download/batches.zip  body: {"batches": [["2025-08-24", "A"], ...], "format": "xlsx"}
+    @app.route("/download/batches.zip", methods=["GET", "POST"])
+    def download_batches_zip():
+        from flask import Response
+        data = request.get_json(silent=True) if request.method == "POST" else None
+        data = data or request.args.to_dict()
+        fmt = (data.get("format") or "xlsx").lower()
+        if fmt not in EXPORT_MIMETYPES:
+            return jsonify({"ok": False, "error": "不支持的格式"}), 400
+
+        session = request_session()
+        try:
+            batches = _resolve_export_batches(session, data)
+        except ValueError as ve:
+            return jsonify({"ok": False, "error": str(ve)}), 400
+        finally:
+            session.close()
+        if not batches:
+            return jsonify({"ok": False, "error": "没有符合条件的批次"}), 404
+
+        fname = f"batches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return Response(
+            _iter_batches_zip(batches, fmt),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={fname}"},
+        )
+
+    # ---------------- 后台导出任务（/api/exports） ----------------
+    def _job_batch(params, job_dir):
+        """任务：单批次 xlsx / pdf"""
+        stockin_date = params["stockin_date"]
+        seller_code = params["seller_code"]
+        fmt = (params.get("format") or "xlsx").lower()
+        session = get_session()
+        try:
+            items = _fetch_batch_items(session, stockin_date, seller_code)
+            sname = _fetch_seller_name(session, seller_code)
+        finally:
+            session.close()
+        missing = _check_missing_images(items)
+        if missing:
+            raise ValueError("图片缺失：" + "、".join(missing))
+        src, fname = _render_batch_export(stockin_date, seller_code, fmt, sname, items)
+        out = os.path.join(job_dir, fname)
+        # 复制一份：缓存文件随批次更新会被替换
+        with src, open(out, "wb") as f:
+            shutil.copyfileobj(src, f)
+        return out, fname, EXPORT_MIMETYPES[fmt]
+
+    def _build_one_batch(stockin_date, seller_code, fmt):
+        """单个批次的导出文件（独立会话，可在线程中并发调用），返回 (可读文件对象, 文件名)"""
+        session = get_session()
+        try:
+            items = _fetch_batch_items(session, stockin_date, seller_code)
+            sname = _fetch_seller_name(session, seller_code)
+        finally:
+            session.close()
+        if not items:
+            raise ValueError("批次无物品")
+        missing = _check_missing_images(items)
+        if missing:
+            raise ValueError("图片缺失：" + "、".join(missing))
+        return _render_batch_export(stockin_date, seller_code, fmt, sname, items)
+
+    def _iter_batches_zip(batches, fmt):
+        """
+        多批次并发生成并逐个写入 zip，边生成边产出字节块（流式下载 / 写文件共用）
+        - 最多 EXPORT_ZIP_WORKERS 个批次同时生成；先完成的先写入
+        - 命中导出缓存的批次直接从磁盘读取
+        - 缺图/失败的批次记入“导出失败.txt”，不影响其余批次
+        """
+        import zipfile
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        buf = _ZipChunkBuffer()
+        failures = []
+        with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+            with ThreadPoolExecutor(max_workers=max(1, EXPORT_ZIP_WORKERS)) as ex:
+                futs = {ex.submit(_build_one_batch, d, sc, fmt): (d, sc) for d, sc in batches}
+                for fut in as_completed(futs):
+                    d, sc = futs[fut]
+                    try:
+                        src, name = fut.result()
+                        with src:
+                            zf.writestr(name, src.read())
+                    except Exception as e:
+                        failures.append(f"{d} {sc}: {e}")
+                    chunk = buf.pop()
+                    if chunk:
+                        yield chunk
+            if failures:
+                zf.writestr("导出失败.txt", "\n".join(sorted(failures)))
+        yield buf.pop()
+
+    def _resolve_export_batches(session, data):
+        """
+        解析要打包的批次：
+          batches=[["2025-08-24", "A"], ...]（或 "2025-08-24:A,2025-08-24:B"）
+          或 date_from / date_to（含两端，按 stock_batches 取该区间内的全部批次）
+        """
+        from create_database import StockBatch
+        batches = data.get("batches")
+        if isinstance(batches, str):
+            batches = [b.split(":", 1) for b in batches.split(",") if ":" in b]
+        if batches:
+            if not all(isinstance(b, (list, tuple)) and len(b) == 2 for b in batches):
+                raise ValueError("batches 应为 [[stockin_date, seller_code], ...]")
+            return [[str(d).strip(), str(sc).strip().upper()] for d, sc in batches]
+
+        date_from, date_to = data.get("date_from"), data.get("date_to")
+        if not date_from and not date_to:
+            raise ValueError("请指定 batches 或 date_from / date_to")
+        q = session.query(StockBatch.stockin_date, StockBatch.seller_code)
+        if date_from:
+            q = q.filter(StockBatch.stockin_date >= datetime.strptime(date_from, "%Y-%m-%d").date())
+        if date_to:
+            q = q.filter(StockBatch.stockin_date <= datetime.strptime(date_to, "%Y-%m-%d").date())
+        rows = q.all()
+        rows.sort(key=lambda r: (str(r[0]), code_to_number(r[1] or "")))
+        return [[str(d), sc] for d, sc in rows]
+
+    def _job_batches_zip(params, job_dir):
+        """任务：多批次打包 zip"""
+        fmt = (params.get("format") or "xlsx").lower()
+        fname = f"batches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        out = os.path.join(job_dir, fname)
+        with open(out, "wb") as f:
+            for chunk in _iter_batches_zip(params.get("batches") or [], fmt):
+                f.write(chunk)
+        return out, fname, "application/zip"
+
+    # 在库导出列：(表头, 取值函数)
+    INVENTORY_EXPORT_COLUMNS = [
+        ("内部编号", lambda x: x.item_code),
+        ("名称", lambda x: x.item_name),
+        ("作者", lambda x: x.item_author),
+        ("出品人序号", lambda x: x.seller_code),
+        ("出品人", lambda x: x.seller_name),
+        ("状态", lambda x: x.item_status),
+        ("起拍价", lambda x: float(x.starting_price) if x.starting_price is not None else None),
+        ("底价", lambda x: float(x.reserve_price) if x.reserve_price is not None else None),
+        ("位置", lambda x: x.item_location),
+        ("箱号", lambda x: x.item_box_code),
+        ("种类", lambda x: x.item_category),
+        ("出品日期", lambda x: str(x.stockin_date) if x.stockin_date else None),
+        ("尺寸", lambda x: x.item_size),
+        ("材质", lambda x: x.item_material),
+        ("鈐印", lambda x: x.item_seal),
+        ("款識", lambda x: x.item_inscription),
+        ("介紹", lambda x: x.item_description),
+        ("附属品", lambda x: (x.item_accessories or "").replace(",", "、")),
+        ("备注", lambda x: x.item_notes),
+        ("图片", lambda x: x.item_image),
+    ]
+
+    def _iter_inventory_rows(session, filters):
+        """按 /api/items 筛选条件逐批读取 Item（yield_per，内存不随行数增长）"""
+        query = _build_items_query(session, filters)
+        query = query.order_by(Item.stockin_date, Item.seller_code, Item.item_code)
+        return query.yield_per(1000)
+
+    def _job_items_csv(params, job_dir):
+        """任务：在库 CSV（筛选同 /api/items；UTF-8 BOM，Excel 直接打开不乱码）"""
+        import csv
+        fname = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        out = os.path.join(job_dir, fname)
+        session = get_session()
+        try:
+            with open(out, "w", newline="", encoding="utf-8-sig") as f:
+                w = csv.writer(f)
+                w.writerow([h for h, _ in INVENTORY_EXPORT_COLUMNS])
+                for x in _iter_inventory_rows(session, params.get("filters") or {}):
+                    w.writerow(["" if v is None else v for v in (get(x) for _, get in INVENTORY_EXPORT_COLUMNS)])
+        finally:
+            session.close()
+        return out, fname, "text/csv"
+
+    INVENTORY_IMG_ROW_PX = 60  # 带图导出时的行高（px）；图片按 2 倍像素准备
+
+    def _write_inventory_xlsx(filters, dest, with_images=False):
+        """
+        在库 Excel（筛选同 /api/items），openpyxl write_only 模式：
+        - 行逐条写出、不保留单元格对象，10 万行内存基本不变
+        - with_images=True 时在 B 列嵌入缩略图（每 500 行并行准备一次图片）；
+          图片字节需保留到保存为止，故行数超过 INVENTORY_EXPORT_MAX_IMAGES 时拒绝
+        dest：文件路径或可写的二进制文件对象
+        """
+        if Workbook is None:
+            raise RuntimeError("缺少依赖：openpyxl；请安装：pip install openpyxl pillow")
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        session = get_session()
+        try:
+            if with_images:
+                total = _build_items_query(session, filters).count()
+                if total > INVENTORY_EXPORT_MAX_IMAGES:
+                    raise ValueError(f"带图导出最多 {INVENTORY_EXPORT_MAX_IMAGES} 行（当前 {total} 行），"
+                                     f"请缩小筛选范围或不带图导出")
+
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("在库")
+            headers = [h for h, _ in INVENTORY_EXPORT_COLUMNS]
+            if with_images:
+                headers.insert(1, "缩略图")
+                ws.sheet_format.defaultRowHeight = INVENTORY_IMG_ROW_PX * 72 / 96.0
+                ws.sheet_format.customHeight = True
+            for j, h in enumerate(headers, start=1):
+                ws.column_dimensions[get_column_letter(j)].width = 12
+            ws.column_dimensions["A"].width = 16
+            if with_images:
+                ws.column_dimensions["B"].width = round((INVENTORY_IMG_ROW_PX - 5) / 7.0, 2)
+            ws.freeze_panes = "A2"
+
+            bold = Font(bold=True)
+            header_cells = []
+            for h in headers:
+                cell = WriteOnlyCell(ws, value=h)
+                cell.font = bold
+                header_cells.append(cell)
+            ws.append(header_cells)
+
+            row_idx = 2
+            chunk = []
+
+            def flush():
+                nonlocal row_idx
+                images = [None] * len(chunk)
+                if with_images:
+                    fulls = _export_image_paths({"item_code": x.item_code, "item_image": x.item_image} for x in chunk)
+                    images = prepare_export_images(fulls, INVENTORY_IMG_ROW_PX * 2, quality=75)
+                for x, prepared in zip(chunk, images):
+                    values = [get(x) for _, get in INVENTORY_EXPORT_COLUMNS]
+                    if with_images:
+                        values.insert(1, None)
+                        if prepared and XLImage is not None:
+                            ximg = XLImage(BytesIO(prepared[0]))
+                            box = INVENTORY_IMG_ROW_PX - 4
+                            scale = min(box / max(1, ximg.width), box / max(1, ximg.height))
+                            ximg.width = int(ximg.width * scale)
+                            ximg.height = int(ximg.height * scale)
+                            ws.add_image(ximg, f"B{row_idx}")
+                    ws.append(values)
+                    row_idx += 1
+                chunk.clear()
+
+            for x in _iter_inventory_rows(session, filters):
+                chunk.append(x)
+                if len(chunk) >= 500:
+                    flush()
+            flush()
+        finally:
+            session.close()
+        wb.save(dest)
+
+    def _job_items_xlsx(params, job_dir):
+        """任务：在库 Excel（write_only，可选缩略图列）"""
+        fname = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        out = os.path.join(job_dir, fname)
+        _write_inventory_xlsx(params.get("filters") or {}, out, with_images=bool(params.get("images")))
+        return out, fname, EXPORT_MIMETYPES["xlsx"]
+
+    # [下载] 在库 Excel（筛选参数同 /api/items；images=1 带缩略图列）
+    # 数据量大时建议走 POST /api/exports {"kind": "items_xlsx", ...}
+    @app.route("/download/items.xlsx", methods=["GET"])
+    def download_items_xlsx():
+        filters = {k: v for k, v in request.args.items() if k not in ("images", "page", "page_size") and v}
+        tmp = tempfile.TemporaryFile()
+        try:
+            _write_inventory_xlsx(filters, tmp, with_images=request.args.get("images") == "1")
+        except ValueError as ve:
+            tmp.close()
+            return jsonify({"ok": False, "error": str(ve)}), 400
+        except Exception as e:
+            tmp.close()
+            return jsonify({"ok": False, "error": str(e)}), 500
+        tmp.seek(0)
+        fname = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        return send_file(tmp, as_attachment=True, download_name=fname, mimetype=EXPORT_MIMETYPES["xlsx"])
+
+    # ---------------- 拍卖会图录清单（LOT 顺序，含缩略图） ----------------
+    AUCTION_EXPORT_HEADERS = ["LOT", "专场", "内部编号", "名称", "作者", "起拍价", "底价"]
+
+    def _fetch_auction_catalog(session, auction_id: str):
+        """
+        一次联表查询取出拍卖会全部 LOT（auction_items ⟕ items ⟕ sections），按 LOT 排序。
+        专场按 LOT 落在 [section_lot_start, section_lot_end] 区间匹配；区间重叠时取第一个。
+        返回 (auction 或 None, rows)
+        """
+        from sqlalchemy import and_
+        auction = session.get(Auction, auction_id)
+        if auction is None:
+            return None, []
+        q = (
+            session.query(
+                AuctionItem.lot_number, Section.section_name, Item.item_code, Item.item_name,
+                Item.item_author, Item.starting_price, Item.reserve_price, Item.item_image,
+            )
+            .select_from(AuctionItem)
+            .outerjoin(Item, Item.item_code == AuctionItem.item_code)
+            .outerjoin(Section, and_(
+                Section.auction_id == AuctionItem.auction_id,
+                AuctionItem.lot_number >= Section.section_lot_start,
+                AuctionItem.lot_number <= Section.section_lot_end,
+            ))
+            .filter(AuctionItem.auction_id == auction_id)
+            .order_by(AuctionItem.lot_number, Section.section_order)
+        )
+        rows, seen = [], set()
+        for r in q.all():
+            if r.lot_number in seen:
+                continue
+            seen.add(r.lot_number)
+            rows.append({
+                "lot_number": r.lot_number,
+                "section_name": r.section_name or "",
+                "item_code": r.item_code or "",
+                "item_name": r.item_name or "",
+                "item_author": r.item_author or "",
+                "starting_price": float(r.starting_price) if r.starting_price is not None else None,
+                "reserve_price": float(r.reserve_price) if r.reserve_price is not None else None,
+                "item_image": r.item_image,
+            })
+        return auction, rows
+
+    def _auction_catalog_images(rows):
+        """图录缩略图：与在库带图导出同尺寸，共用派生图缓存；进程池并行准备"""
+        return prepare_export_images(_export_image_paths(rows), INVENTORY_IMG_ROW_PX * 2, quality=75)
+
+    def _auction_title(auction) -> str:
+        if auction.auction_order:
+            return f"第{auction.auction_order}回 {auction.auction_name or ''}".strip()
+        return auction.auction_name or auction.auction_id
+
+    def _write_auction_xlsx(title, rows, dest):
+        """图录清单 Excel（write_only；D 列缩略图）"""
+        if Workbook is None:
+            raise RuntimeError("缺少依赖：openpyxl；请安装：pip install openpyxl pillow")
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        images = _auction_catalog_images(rows)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("图录")
+        ws.sheet_format.defaultRowHeight = INVENTORY_IMG_ROW_PX * 72 / 96.0
+        ws.sheet_format.customHeight = True
+        for col, width in zip("ABCDEFGH", (6, 14, 14, round((INVENTORY_IMG_ROW_PX - 5) / 7.0, 2), 30, 14, 10, 10)):
+            ws.column_dimensions[col].width = width
+        ws.freeze_panes = "A3"
+
+        title_cell = WriteOnlyCell(ws, value=title)
+        title_cell.font = Font(bold=True, size=14)
+        ws.append([title_cell])
+        bold = Font(bold=True)
+        headers = AUCTION_EXPORT_HEADERS[:3] + ["图片"] + AUCTION_EXPORT_HEADERS[3:]
+        header_cells = []
+        for h in headers:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = bold
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row_idx, (r, prepared) in enumerate(zip(rows, images), start=3):
+            if prepared and XLImage is not None:
+                ximg = XLImage(BytesIO(prepared[0]))
+                box = INVENTORY_IMG_ROW_PX - 4
+                scale = min(box / max(1, ximg.width), box / max(1, ximg.height))
+                ximg.width = int(ximg.width * scale)
+                ximg.height = int(ximg.height * scale)
+                ws.add_image(ximg, f"D{row_idx}")
+            ws.append([r["lot_number"], r["section_name"], r["item_code"], None, r["item_name"],
+                       r["item_author"], r["starting_price"], r["reserve_price"]])
+        wb.save(dest)
+
+    def _write_auction_csv(rows, dest_path):
+        import csv
+        with open(dest_path, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(AUCTION_EXPORT_HEADERS + ["图片"])
+            for r in rows:
+                w.writerow([r["lot_number"], r["section_name"], r["item_code"], r["item_name"], r["item_author"],
+                            "" if r["starting_price"] is None else r["starting_price"],
+                            "" if r["reserve_price"] is None else r["reserve_price"],
+                            r["item_image"] or ""])
+
+    def _render_auction_export(auction_id: str, fmt: str, dest_dir: str):
+        """生成拍卖会图录清单文件到 dest_dir，返回 (路径, 下载文件名, mimetype)"""
+        session = get_session()
+        try:
+            auction, rows = _fetch_auction_catalog(session, auction_id)
+        finally:
+            session.close()
+        if auction is None:
+            raise LookupError(f"拍卖会不存在: {auction_id}")
+
+        title = _auction_title(auction)
+        fname = f"auction_{secure_filename(auction_id) or 'export'}.{fmt}"
+        out = os.path.join(dest_dir, fname)
+        if fmt == "xlsx":
+            _write_auction_xlsx(title, rows, out)
+            mimetype = EXPORT_MIMETYPES["xlsx"]
+        elif fmt == "pdf":
+            data = render_catalog_pdf(title, rows, _auction_catalog_images(rows), _export_logo_path())
+            with open(out, "wb") as f:
+                f.write(data)
+            mimetype = "application/pdf"
+        else:
+            _write_auction_csv(rows, out)
+            mimetype = "text/csv"
+        return out, fname, mimetype
+
+    def _job_auction(params, job_dir):
+        """任务：拍卖会图录清单 xlsx / pdf / csv"""
+        return _render_auction_export(params["auction_id"], (params.get("format") or "xlsx").lower(), job_dir)
+
+    # [下载] 拍卖会图录清单：LOT / 专场 / 编号 / 缩略图 / 名称 / 作者 / 起拍价 / 底价
+    @app.route("/download/auctions/<auction_id>.<ext>", methods=["GET"])
+    def download_auction(auction_id, ext):
+        fmt = ext.lower()
+        if fmt not in ("xlsx", "pdf", "csv"):
+            return jsonify({"error": "不支持的格式"}), 400
+        job_dir = tempfile.mkdtemp(prefix="auction_export_")
+        try:
+            path, fname, mimetype = _render_auction_export(auction_id, fmt, job_dir)
+            bio = BytesIO(Path(path).read_bytes())
+        except LookupError as le:
+            return jsonify({"ok": False, "error": str(le)}), 404
+        except RuntimeError as re:
+            return jsonify({"ok": False, "error": str(re)}), 500
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return send_file(bio, as_attachment=True, download_name=fname, mimetype=mimetype)
+
+    export_jobs.register("batch", _job_batch)
+    export_jobs.register("batches_zip", _job_batches_zip)
+    export_jobs.register("items_csv", _job_items_csv)
+    export_jobs.register("items_xlsx", _job_items_xlsx)
+    export_jobs.register("auction", _job_auction)
+    try:
+        export_jobs.start()
+    except Exception as e:
+        print("导出任务队列启动失败（首次提交时重试）:", e)
+    try:
+        print_spooler.start()
+    except Exception as e:
+        print("打印队列启动失败（首次提交时重试）:", e)
+    try:
+        replica.start()
+    except Exception as e:
+        print("只读副本启动失败（只读查询改走主库）:", e)
+
+    # [API] 提交导出任务
+    # body: {"kind": "batch", "stockin_date": "2025-08-24", "seller_code": "A", "format": "xlsx|pdf"}
+    #       {"kind": "batches_zip", "batches": [["2025-08-24", "A"], ...] 或 "date_from"/"date_to", "format": "xlsx|pdf"}
+    #       {"kind": "items_csv", "filters": {...与 /api/items 相同的筛选参数...}}
+    #       {"kind": "items_xlsx", "filters": {...}, "images": true|false}
+    #       {"kind": "auction", "auction_id": "...", "format": "xlsx|pdf|csv"}
+    # 返回 202 + job_id；用 GET /api/exports/<job_id> 轮询状态
+    @app.route("/api/exports", methods=["POST"])
+    def api_exports_submit():
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"ok": False, "error": "请求体应为 JSON 对象"}), 400
+        # 字段类型校验：非字符串的 JSON 值直接 400（否则 .strip() / .lower() / strptime 报 500）
+        bad = [k for k in ("kind", "format", "stockin_date", "seller_code", "date_from", "date_to")
+               if data.get(k) is not None and not isinstance(data.get(k), str)]
+        if data.get("auction_id") is not None and (isinstance(data["auction_id"], bool)
+                                                   or not isinstance(data["auction_id"], (str, int))):
+            bad.append("auction_id")
+        if data.get("batches") is not None and not isinstance(data["batches"], (str, list)):
+            bad.append("batches")
+        if bad:
+            return jsonify({"ok": False, "error": f"参数类型不正确: {', '.join(bad)}"}), 400
+
+        kind = data.get("kind")
+        if kind not in export_jobs.kinds():
+            return jsonify({"ok": False, "error": f"不支持的导出类型: {kind}"}), 400
+
+        fmt = (data.get("format") or "xlsx").lower()
+        formats = {"batch": ("xlsx", "pdf"), "batches_zip": ("xlsx", "pdf"), "auction": ("xlsx", "pdf", "csv")}
+        if kind in formats and fmt not in formats[kind]:
+            return jsonify({"ok": False, "error": "不支持的格式"}), 400
+
+        if kind == "auction":
+            if not data.get("auction_id"):
+                return jsonify({"ok": False, "error": "缺少 auction_id"}), 400
+            params = {"auction_id": str(data["auction_id"]), "format": fmt}
+        elif kind == "batch":
+            if not data.get("stockin_date") or not data.get("seller_code"):
+                return jsonify({"ok": False, "error": "缺少 stockin_date / seller_code"}), 400
+            params = {"stockin_date": data["stockin_date"],
+                      "seller_code": data["seller_code"].strip().upper(), "format": fmt}
+        elif kind == "batches_zip":
+            session = request_session()
+            try:
+                batches = _resolve_export_batches(session, data)
+            except ValueError as ve:
+                return jsonify({"ok": False, "error": str(ve)}), 400
+            finally:
+                session.close()
+            if not batches:
+                return jsonify({"ok": False, "error": "没有符合条件的批次"}), 404
+            params = {"batches": batches, "format": fmt}
+        else:
+            filters = data.get("filters") or {}
+            if not isinstance(filters, dict):
+                return jsonify({"ok": False, "error": "filters 应为对象"}), 400
+            params = {"filters": {k: str(v) for k, v in filters.items() if v not in (None, "")}}
+            if kind == "items_xlsx":
+                params["images"] = bool(data.get("images"))
+
+        try:
+            job_id = export_jobs.submit(kind, params)
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 500
+        return jsonify({"ok": True, "job_id": job_id, "status_url": f"/api/exports/{job_id}"}), 202
+
+    # [API] 查询导出任务状态（done 时附带 download_url）
+    @app.route("/api/exports/<job_id>", methods=["GET"])
+    def api_exports_status(job_id):
+        info = export_jobs.get(job_id)
+        if not info:
+            return jsonify({"ok": False, "error": "任务不存在或已过期"}), 404
+        info.pop("result_path", None)
+        info.pop("mimetype", None)
+        if info["status"] == "done":
+            info["download_url"] = f"/api/exports/{job_id}/download"
+        return jsonify({"ok": True, **info})
+
+    # [下载] 导出任务结果
+    @app.route("/api/exports/<job_id>/download", methods=["GET"])
+    def api_exports_download(job_id):
+        info = export_jobs.get(job_id)
+        if not info:
+            return jsonify({"ok": False, "error": "任务不存在或已过期"}), 404
+        if info["status"] != "done":
+            return jsonify({"ok": False, "error": "任务尚未完成", "status": info["status"]}), 409
+        if not info["result_path"] or not os.path.exists(info["result_path"]):
+            return jsonify({"ok": False, "error": "结果文件已被清理"}), 410
+        return send_file(info["result_path"], as_attachment=True,
+                         download_name=info["download_name"], mimetype=info["mimetype"])
+
     # [API] 新建批次
     @app.route("/api/stock-batches", methods=["POST"])
     def api_stock_batches_create():
@@ -3569,7 +4404,7 @@ def create_app():
         for r in required:
             if not payload.get(r):
                 return jsonify({"error": f"缺少必填字段: {r}"}), 400
-        session = get_session()
+        session = request_session()
         try:
             exist = session.get(StockBatch,
                                 {"stockin_date": payload["stockin_date"], "seller_code": payload["seller_code"]})
@@ -3601,8 +4436,9 @@ def create_app():
 
     # [API] 迷你出品人下拉（增强：返回 keys 用于简繁体与拼音首字母匹配）
     @app.route("/api/sellers/mini")
+    @readonly
     def api_sellers_mini():
-        session = get_session()
+        session = request_session()
         try:
             rows = session.query(Seller).all()
             rows.sort(key=lambda s: code_to_number(s.seller_code or ""))
@@ -3636,8 +4472,9 @@ def create_app():
 
     # [API] 出品人统计：每个出品人对应的在库物品数量
     @app.route("/api/sellers/stats", methods=["GET"])
+    @readonly
     def api_sellers_stats():
-        session = get_session()
+        session = request_session()
         try:
             from sqlalchemy import text
             # 只统计「在库」分组的物品数量
@@ -3694,8 +4531,9 @@ def create_app():
 
     # [API] 出品人列表
     @app.route("/api/sellers", methods=["GET"])
+    @readonly
     def api_sellers():
-        session = get_session()
+        session = request_session()
         try:
             sellers = session.query(Seller).all()
             sellers.sort(key=lambda s: code_to_number(s.seller_code or ""))
@@ -3721,8 +4559,9 @@ def create_app():
 
     # [API] 获取单个出品人
     @app.route("/api/sellers/<seller_code>", methods=["GET"])
+    @readonly
     def api_sellers_get_one(seller_code):
-        session = get_session()
+        session = request_session()
         try:
             s = session.get(Seller, seller_code)
             if not s:
@@ -3752,7 +4591,7 @@ def create_app():
         for r in required:
             if not payload.get(r):
                 return jsonify({"error": f"缺少必填字段: {r}"}), 400
-        session = get_session()
+        session = request_session()
         try:
             # 重号/重名校验
             if session.get(Seller, payload["seller_code"]):
@@ -3800,7 +4639,7 @@ def create_app():
     @app.route("/api/sellers/<seller_code>", methods=["PUT"])
     def api_sellers_update(seller_code):
         payload = request.json or {}
-        session = get_session()
+        session = request_session()
         try:
             s = session.get(Seller, seller_code)
             if not s:
@@ -3852,7 +4691,7 @@ def create_app():
     # [API] 删除出品人
     @app.route("/api/sellers/<seller_code>", methods=["DELETE"])
     def api_sellers_delete(seller_code):
-        session = get_session()
+        session = request_session()
         try:
             s = session.get(Seller, seller_code)
             if not s:
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+补齐图片占位图（LQIP）
+- 新上传的图片在 /api/upload-image 时已生成占位图；本脚本用于历史数据与被替换过的图片
+- 遍历 items.item_image，缺少占位图或源文件 mtime 已变化的才重新生成（可重复运行）
+- 每 COMMIT_EVERY 张提交一次，避免长事务锁住网络盘上的数据库
+
+用法：
+    python backfill_placeholders.py            # 仅补缺 / 更新过期
+    python backfill_placeholders.py --force    # 全部重算
+"""
+import os
+import sys
+from datetime import datetime
+
+from create_database import get_session, create_database, Item, ImagePlaceholder
+from image_cache import make_lqip
+from paths import abs_path_from_web
+
+COMMIT_EVERY = 50
+
+
+def backfill(force=False):
+    create_database()  # 确保 image_placeholders 表存在（仅补建缺失表）
+    session = get_session()
+    try:
+        paths = sorted({
+            (p or "").split("?", 1)[0]
+            for (p,) in session.query(Item.item_image).filter(Item.item_image.isnot(None)).all()
+            if (p or "").strip()
+        })
+        existing = {
+            fp: mtime for fp, mtime in
+            session.query(ImagePlaceholder.file_path, ImagePlaceholder.src_mtime).all()
+        }
+        print(f"共 {len(paths)} 张图片，已有占位图 {len(existing)} 条")
+
+        done = skipped = failed = 0
+        for rel in paths:
+            fs = abs_path_from_web(rel)
+            try:
+                mtime = int(os.stat(fs).st_mtime)
+            except OSError:
+                failed += 1
+                continue
+            if not force and existing.get(rel) == mtime:
+                skipped += 1
+                continue
+            try:
+                res = make_lqip(fs)
+            except Exception as e:
+                print(f"生成失败: {rel} ({e})")
+                failed += 1
+                continue
+            if not res:
+                print("缺少依赖：Pillow；请安装：pip install pillow")
+                return
+            lqip, w, h, src_mtime = res
+            session.merge(ImagePlaceholder(
+                file_path=rel, src_mtime=src_mtime, width=w, height=h,
+                lqip=lqip, updated_at=datetime.utcnow()
+            ))
+            done += 1
+            if done % COMMIT_EVERY == 0:
+                session.commit()
+                print(f"  已生成 {done} 张…")
+        session.commit()
+        print(f"完成：生成 {done}，跳过（未变化）{skipped}，失败/缺图 {failed}")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    backfill(force="--force" in sys.argv[1:])
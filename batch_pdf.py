@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+批次清单 PDF · ReportLab 直出（不经过 Excel COM）
+- 版式与 _export_excel 的打印效果一致：
+    页眉：左“生成时间”、中 LOGO、右“批次”；页脚：第 N 页 / 共 M 页
+    第 1 页顶部标题“吉祥オークション”
+    出品人行 + 表头（内部编号 / 图片 / 名称 / 起拍价 / 底价 / 备注，单位行“（万日元）”）每页重复
+    数据行：行高 = 图片单元格边长，图片等比缩放居中
+- 纯 Python，几百毫秒内完成，可在 Linux 服务器运行；Excel COM 路径保留为可选回退（config.PDF_RENDERER）
+
+另含拍卖会图录清单（render_catalog_pdf）：LOT / 专场 / 编号 / 缩略图 / 名称 / 作者 / 起拍价 / 底价，
+按 LOT 顺序，表头每页重复；数千 LOT 时按 CATALOG_TABLE_ROWS 分段建表，避免单个大表反复拆分
+
+字体：优先使用 config.PDF_FONT_PATH（默认微软雅黑），找不到时回退 ReportLab 内置的 STSong-Light
+
+用法：
+    from batch_pdf import render_batch_pdf
+    data = render_batch_pdf(batch_code, seller_name, items, images, logo_path)
+    data = render_catalog_pdf(title, rows, images, logo_path)
+"""
+import io
+import os
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas as rl_canvas
+from reportlab.platypus import Image as RLImage, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+try:
+    from config import PDF_FONT_PATH
+except Exception:
+    PDF_FONT_PATH = None
+
+# ===== 版式参数（与 _export_excel 保持一致，单位 px，96dpi）=====
+# 图片单元格边长由调用方传入（app.EXPORT_IMG_CELL_PX，与 Excel 导出共用一处），这里只是缺省值
+IMG_CELL_PX = 100
+COL_WIDTHS_CHARS = [14.0, None, 24.0, 12.0, 12.0, 15.0]  # 图片列按 img_cell_px
+MIN_PAD_PX = 2
+LOGO_HEIGHT_PX = 36
+
+MARGIN_LR = 0.3937 * inch
+MARGIN_TB = 0.6 * inch
+HEADER_OFFSET = 0.3 * inch  # 页眉/页脚距纸边
+
+CATALOG_IMG_PX = 60
+CATALOG_TABLE_ROWS = 200
+
+
+def px_to_pt(px):
+    return px * 72 / 96.0
+
+
+def _colwidth_to_px(w):
+    return int(round(7 * float(w) + 5))
+
+
+_font_name = None
+
+
+def _register_font():
+    """注册中文字体，返回字体名（只注册一次）"""
+    global _font_name
+    if _font_name:
+        return _font_name
+    if PDF_FONT_PATH and os.path.exists(PDF_FONT_PATH):
+        try:
+            pdfmetrics.registerFont(TTFont("BatchFont", PDF_FONT_PATH, subfontIndex=0))
+            _font_name = "BatchFont"
+            return _font_name
+        except Exception:
+            pass
+    pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+    _font_name = "STSong-Light"
+    return _font_name
+
+
+def _fmt_price(v):
+    if v in (None, ""):
+        return ""
+    try:
+        return f"{float(v):,.0f}"
+    except (TypeError, ValueError):
+        return str(v)
+
+
+def _numbered_canvas(header_left, header_right, footer_fmt, font, logo):
+    """
+    生成带“第 N 页 / 共 M 页”的 Canvas 类：先缓存每页状态，保存时统一补页眉页脚
+    logo: (ImageReader, 宽pt, 高pt) 或 None
+    """
+
+    class NumberedCanvas(rl_canvas.Canvas):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._saved_pages = []
+
+        def showPage(self):
+            self._saved_pages.append(dict(self.__dict__))
+            self._startPage()
+
+        def save(self):
+            total = len(self._saved_pages)
+            for state in self._saved_pages:
+                self.__dict__.update(state)
+                self._draw_header_footer(total)
+                super().showPage()
+            super().save()
+
+        def _draw_header_footer(self, total):
+            page_w, page_h = self._pagesize
+            y_head = page_h - HEADER_OFFSET - 10
+            self.setFont(font, 10)
+            self.drawString(MARGIN_LR, y_head, header_left)
+            self.drawRightString(page_w - MARGIN_LR, y_head, header_right)
+            if logo:
+                img, lw, lh = logo
+                self.drawImage(img, (page_w - lw) / 2, page_h - HEADER_OFFSET - lh,
+                               width=lw, height=lh, mask="auto")
+            self.drawCentredString(page_w / 2, HEADER_OFFSET,
+                                   footer_fmt.format(page=self._pageNumber, total=total))
+
+    return NumberedCanvas
+
+
+def _logo_reader(logo_path):
+    if not logo_path or not os.path.exists(logo_path):
+        return None
+    try:
+        img = ImageReader(logo_path)
+        ow, oh = img.getSize()
+        target_h = px_to_pt(LOGO_HEIGHT_PX)
+        scale = min(1.0, target_h / max(1, oh))
+        return img, ow * scale, oh * scale
+    except Exception:
+        return None
+
+
+def render_batch_pdf(batch_code: str, seller_name: str, items, images, logo_path=None,
+                     generated_at: datetime = None, img_cell_px: int = IMG_CELL_PX) -> bytes:
+    """
+    渲染批次清单 PDF，返回 PDF 字节。
+    items: 已排序的明细行（dict：item_code / item_name / starting_price / reserve_price / item_notes）
+    images: 与 items 一一对应，元素为 (jpeg_bytes, width, height) 或 None（见 image_cache.prepare_export_images）
+    img_cell_px: 正方形图片单元格边长（px），即数据行行高与图片列宽
+    """
+    font = _register_font()
+    generated_at = generated_at or datetime.now()
+
+    td_style = ParagraphStyle("td", fontName=font, fontSize=10, leading=12)
+    info_style = ParagraphStyle("info", fontName=font, fontSize=11, leading=14)
+    title_style = ParagraphStyle("title", fontName=font, fontSize=16, leading=20, alignment=1)
+
+    img_cell_pt = px_to_pt(img_cell_px)
+    col_widths = [px_to_pt(img_cell_px if w is None else _colwidth_to_px(w)) for w in COL_WIDTHS_CHARS]
+
+    # ---- 表头区（每页重复）：出品人行 / 间隔 / 表头 / 单位行 ----
+    rows = [
+        [Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{_escape(seller_name)} 様", info_style), "", "", "",
+         f"总件数：{len(items)}", ""],
+        [""] * 6,
+        ["内部编号", "图片", "名称", "起拍价", "底价", "备注"],
+        ["", "", "", "（万日元）", "（万日元）", ""],
+    ]
+    row_heights = [px_to_pt(26), px_to_pt(8), px_to_pt(28), px_to_pt(18)]
+    HEAD_ROWS = len(rows)
+
+    # ---- 数据行 ----
+    avail = img_cell_pt - 2 * px_to_pt(MIN_PAD_PX)
+    for it, prepared in zip(items, images):
+        img_cell = "(无图片或加载失败)"
+        if prepared:
+            raw, w, h = prepared
+            try:
+                if not (w and h):
+                    w, h = ImageReader(io.BytesIO(raw)).getSize()
+                scale = min(avail / max(1, w), avail / max(1, h))
+                img_cell = RLImage(io.BytesIO(raw), width=w * scale, height=h * scale)
+            except Exception:
+                pass
+        rows.append([
+            it.get("item_code") or "",
+            img_cell,
+            Paragraph(_escape(it.get("item_name")), td_style),
+            _fmt_price(it.get("starting_price")),
+            _fmt_price(it.get("reserve_price")),
+            Paragraph(_escape(it.get("item_notes")), td_style),
+        ])
+        row_heights.append(img_cell_pt)
+
+    grey = colors.HexColor("#F5F5F5")
+    style = TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        # 出品人行
+        ("SPAN", (0, 0), (2, 0)),
+        ("SPAN", (4, 0), (5, 0)),
+        ("FONTSIZE", (4, 0), (4, 0), 11),
+        ("ALIGN", (4, 0), (4, 0), "CENTER"),
+        # 表头 + 单位行：A/B/C/F 纵向合并，D/E 单位小一号
+        ("SPAN", (0, 2), (0, 3)),
+        ("SPAN", (1, 2), (1, 3)),
+        ("SPAN", (2, 2), (2, 3)),
+        ("SPAN", (5, 2), (5, 3)),
+        ("FONTSIZE", (0, 2), (-1, 2), 11),
+        ("FONTSIZE", (3, 3), (4, 3), 9),
+        ("ALIGN", (0, 2), (-1, 3), "CENTER"),
+        ("BACKGROUND", (0, 2), (-1, 3), grey),
+        ("BOX", (0, 2), (-1, 3), 0.5, colors.black),
+        ("LINEAFTER", (0, 2), (-1, 3), 0.5, colors.black),  # 只画竖线：D/E 表头与单位行之间无分隔线
+        # 数据
+        ("GRID", (0, HEAD_ROWS), (-1, -1), 0.5, colors.black),
+        ("ALIGN", (0, HEAD_ROWS), (1, -1), "CENTER"),
+        ("ALIGN", (3, HEAD_ROWS), (4, -1), "CENTER"),
+        ("LEFTPADDING", (1, HEAD_ROWS), (1, -1), 0),
+        ("RIGHTPADDING", (1, HEAD_ROWS), (1, -1), 0),
+        ("TOPPADDING", (1, HEAD_ROWS), (1, -1), 0),
+        ("BOTTOMPADDING", (1, HEAD_ROWS), (1, -1), 0),
+    ])
+    table = Table(rows, colWidths=col_widths, rowHeights=row_heights, repeatRows=HEAD_ROWS, style=style)
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4, title=batch_code,
+        leftMargin=MARGIN_LR, rightMargin=MARGIN_LR, topMargin=MARGIN_TB, bottomMargin=MARGIN_TB,
+    )
+    canvas_cls = _numbered_canvas(
+        f"生成时间：{generated_at.strftime('%Y-%m-%d %H:%M')}",
+        f"批次：{batch_code}",
+        "第{page}页 / 共{total}页",
+        font,
+        _logo_reader(logo_path),
+    )
+    doc.build([Paragraph("吉祥オークション", title_style), table], canvasmaker=canvas_cls)
+    return buf.getvalue()
+
+
+def render_catalog_pdf(title: str, rows, images, logo_path=None, generated_at: datetime = None) -> bytes:
+    """
+    渲染拍卖会图录清单 PDF，返回 PDF 字节。
+    rows: 按 LOT 排序的 dict（lot_number / section_name / item_code / item_name / item_author /
+          starting_price / reserve_price）
+    images: 与 rows 一一对应，元素为 (jpeg_bytes, width, height) 或 None
+    """
+    font = _register_font()
+    generated_at = generated_at or datetime.now()
+    td_style = ParagraphStyle("td", fontName=font, fontSize=9, leading=11)
+    title_style = ParagraphStyle("title", fontName=font, fontSize=16, leading=20, alignment=1)
+
+    img_pt = px_to_pt(CATALOG_IMG_PX)
+    avail = img_pt - 2 * px_to_pt(MIN_PAD_PX)
+    col_widths = [34, 62, 72, img_pt, 150, 70, 50, 50]
+    header = ["LOT", "专场", "内部编号", "图片", "名称", "作者", "起拍价", "底价"]
+
+    style = TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#F5F5F5")),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("ALIGN", (0, 1), (0, -1), "CENTER"),
+        ("ALIGN", (3, 1), (3, -1), "CENTER"),
+        ("ALIGN", (6, 1), (7, -1), "RIGHT"),
+        ("LEFTPADDING", (3, 1), (3, -1), 0),
+        ("RIGHTPADDING", (3, 1), (3, -1), 0),
+        ("TOPPADDING", (3, 1), (3, -1), 0),
+        ("BOTTOMPADDING", (3, 1), (3, -1), 0),
+    ])
+
+    story = [Paragraph(_escape(title), title_style)]
+    data = []
+    for r, prepared in zip(rows, images):
+        img_cell = ""
+        if prepared:
+            raw, w, h = prepared
+            try:
+                if not (w and h):
+                    w, h = ImageReader(io.BytesIO(raw)).getSize()
+                scale = min(avail / max(1, w), avail / max(1, h))
+                img_cell = RLImage(io.BytesIO(raw), width=w * scale, height=h * scale)
+            except Exception:
+                pass
+        data.append([
+            r.get("lot_number"),
+            Paragraph(_escape(r.get("section_name")), td_style),
+            r.get("item_code") or "",
+            img_cell,
+            Paragraph(_escape(r.get("item_name")), td_style),
+            Paragraph(_escape(r.get("item_author")), td_style),
+            _fmt_price(r.get("starting_price")),
+            _fmt_price(r.get("reserve_price")),
+        ])
+    for i in range(0, max(1, len(data)), CATALOG_TABLE_ROWS):
+        part = data[i:i + CATALOG_TABLE_ROWS]
+        story.append(Table([header] + part, colWidths=col_widths,
+                           rowHeights=[px_to_pt(24)] + [img_pt] * len(part),
+                           repeatRows=1, style=style))
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4, title=title,
+        leftMargin=MARGIN_LR, rightMargin=MARGIN_LR, topMargin=MARGIN_TB, bottomMargin=MARGIN_TB,
+    )
+    canvas_cls = _numbered_canvas(
+        f"生成时间：{generated_at.strftime('%Y-%m-%d %H:%M')}",
+        f"共 {len(rows)} LOT",
+        "第{page}页 / 共{total}页",
+        font,
+        _logo_reader(logo_path),
+    )
+    doc.build(story, canvasmaker=canvas_cls)
+    return buf.getvalue()
+
+
+def _escape(s):
+    """Paragraph 使用类 HTML 标记：转义特殊字符并保留换行"""
+    s = str(s or "")
+    s = s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return s.replace("\n", "<br/>")
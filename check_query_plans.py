@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查高频查询的执行计划（EXPLAIN QUERY PLAN）
+- 每条查询与 app.py / warm_thumbnails.py 中的写法一致，并注明应当命中的索引
+- 出现整表扫描（SCAN 表名，且未走索引）或没用上预期索引时记为失败，退出码 1
+- 需要额外排序（USE TEMP B-TREE）只提示，不算失败
+- 缺索引时先运行 python create_database.py（会执行 _migrate_add_hot_query_indexes）
+
+用法：
+    python check_query_plans.py                  # 检查 create_database.py 中配置的数据库
+    python check_query_plans.py --db D:\\data.db  # 检查指定的数据库文件
+"""
+import sys
+
+from sqlalchemy import create_engine, text
+
+# (名称, SQL, 参数, 预期索引)
+HOT_QUERIES = [
+    (
+        "批次物品（导出 / 批次编辑 / 清理空行）",
+        "SELECT i.item_code, i.item_name, i.starting_price, i.reserve_price, i.item_notes, i.item_image "
+        "FROM items i WHERE i.stockin_date = :d AND i.seller_code = :s ORDER BY i.item_code",
+        {"d": "2024-01-01", "s": "A"},
+        "idx_items_batch",
+    ),
+    (
+        "批次件数（批次总览）",
+        "SELECT COUNT(*) FROM items WHERE stockin_date = :d AND seller_code = :s",
+        {"d": "2024-01-01", "s": "A"},
+        "idx_items_batch",
+    ),
+    (
+        "按箱号查物品",
+        "SELECT item_code FROM items WHERE item_box_code = :b",
+        {"b": "BOX1"},
+        "idx_items_box",
+    ),
+    (
+        "物品所在拍卖会（在库列表“拍卖会回数”）",
+        "SELECT ai.item_code, a.auction_order FROM auction_items ai "
+        "JOIN auctions a ON ai.auction_id = a.auction_id WHERE ai.item_code IN (:c1, :c2, :c3)",
+        {"c1": "x1", "c2": "x2", "c3": "x3"},
+        "idx_auction_items_item",
+    ),
+    (
+        "加入拍卖会时的冲突检查",
+        "SELECT ai.lot_number FROM auction_items ai JOIN auctions a ON ai.auction_id = a.auction_id "
+        "WHERE ai.item_code = :c AND a.auction_id != :a "
+        "AND a.auction_start_date IS NOT NULL AND a.auction_end_date IS NOT NULL",
+        {"c": "x1", "a": "AU1"},
+        "idx_auction_items_item",
+    ),
+    (
+        "单个对象的操作记录",
+        "SELECT action, created_at FROM operation_logs WHERE entity_type = :t AND entity_id = :e",
+        {"t": "item", "e": "x1"},
+        "idx_oplog_entity",
+    ),
+    (
+        "最近修改过的物品（预热缩略图）",
+        "SELECT DISTINCT entity_id FROM operation_logs WHERE entity_type = :t AND created_at >= :since",
+        {"t": "item", "since": "2024-01-01 00:00:00"},
+        "idx_oplog_type_time",
+    ),
+]
+
+
+def explain(conn, sql, params):
+    """返回查询计划各步骤的 detail 文本"""
+    return [r[-1] for r in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()]
+
+
+def check_plan(details, expected_index):
+    """返回 (问题列表, 提示列表)"""
+    problems, notes = [], []
+    for d in details:
+        if d.startswith("SCAN ") and " USING " not in d:
+            problems.append(f"整表扫描：{d}")
+        elif "TEMP B-TREE" in d:
+            notes.append(f"需要额外排序：{d}")
+    if not any(expected_index in d for d in details):
+        problems.append(f"未使用索引 {expected_index}")
+    return problems, notes
+
+
+def main(argv):
+    if "--db" in argv:
+        path = argv[argv.index("--db") + 1]
+        engine = create_engine(f"sqlite:///{path}")
+    else:
+        from create_database import engine
+
+    failed = 0
+    with engine.connect() as conn:
+        for name, sql, params, expected in HOT_QUERIES:
+            try:
+                details = explain(conn, sql, params)
+            except Exception as e:
+                print(f"[错误] {name}: {e}")
+                failed += 1
+                continue
+            problems, notes = check_plan(details, expected)
+            print(f"[{'失败' if problems else '通过'}] {name}")
+            for d in details:
+                print(f"    {d}")
+            for p in problems + notes:
+                print(f"    -> {p}")
+            failed += bool(problems)
+
+    if failed:
+        print(f"\n{failed} 条查询未通过；缺索引请先运行 python create_database.py")
+        return 1
+    print(f"\n全部 {len(HOT_QUERIES)} 条查询都走了索引")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -13,3 +13,96 @@ LOGO_PATH = os.path.join(BASE_DIR, "static", "basic_files", "LOGO.jpg")
 # === System 图片存储根路径（UNC 路径） ===
 # 例如：\\landisk-edb8f6\disk1\waseidou_files\③古物事业部\吉祥美术\拍卖会相关\入库照\system
 SYSTEM_IMAGE_ROOT = r"\\landisk-edb8f6\disk1\waseidou_files\③古物事业部\吉祥美术\拍卖会相关\入库照\system"
+
+# === NAS 原图本地镜像缓存（read-through，可选） ===
+# 开启后：首次读取 /files/system/... 时复制到本地目录，之后比对 mtime 直接读本地盘
+# 超过容量上限时按最近访问时间（LRU）淘汰
+LOCAL_MIRROR_ENABLED = False
+LOCAL_MIRROR_DIR = os.path.join(BASE_DIR, "cache", "mirror")
+LOCAL_MIRROR_MAX_BYTES = 20 * 1024 * 1024 * 1024  # 20GB
+
+# === 派生图缓存目录（缩略图 / 悬停预览中图），可随时清空，会按需重新生成 ===
+DERIVATIVE_CACHE_DIR = os.path.join(BASE_DIR, "cache", "derivatives")
+DERIVATIVE_CACHE_MAX_BYTES = 5 * 1024 * 1024 * 1024  # 5GB，超出按最近访问时间（LRU）淘汰
+# 允许的尺寸档位：请求尺寸向上取档，避免任意 size 参数把缓存撑爆（需包含前端 / 预热 / 导出实际用到的 120、200、1280）
+THUMB_SIZES = (80, 120, 200, 400)
+PREVIEW_SIZES = (1000, 1280, 1600)
+
+# === 缩略图/预览图生成服务：并发上限与排队上限 ===
+# 超过排队上限时不再解码，直接回退原图，避免整页缩略图请求把 CPU 打满
+THUMB_WORKERS = 2
+THUMB_MAX_PENDING = 48
+THUMB_WAIT_SECONDS = 30
+
+# === 缩略图预热：打开批次时后台生成整批缩略图（尺寸与前端 AU.thumbUrl 默认值一致） ===
+THUMB_WARM_SIZE = 200
+THUMB_WARM_MAX_QUEUE = 2000
+
+# === 导出图片并行准备的进程数（0 = CPU 核数；-1 = 禁用进程池，串行处理） ===
+EXPORT_IMAGE_PROCESSES = 0
+
+# === 批次导出文件缓存目录（xlsx / pdf；内容未变化时直接复用） ===
+EXPORT_CACHE_DIR = os.path.join(BASE_DIR, "exports", "cache")
+
+# === 批次清单 PDF 渲染方式 ===
+# "reportlab"：纯 Python 直出（默认，快，可在 Linux 运行）；"excel"：经 Excel COM 转换（需 Windows + Excel）
+PDF_RENDERER = "reportlab"
+PDF_FONT_PATH = r"C:\Windows\Fonts\msyh.ttc"  # 微软雅黑；找不到时回退内置 STSong-Light
+
+# === 后台导出任务（/api/exports）：并发数 / 结果文件目录 / 保留时长 ===
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_DIR = os.path.join(BASE_DIR, "exports", "jobs")
+EXPORT_JOB_KEEP_HOURS = 24
+# “执行中”超过这么多分钟的任务视为执行它的进程已退出，启动时重新排队（未超时的可能正由本机其它进程执行）
+EXPORT_JOB_STALE_MINUTES = 60
+
+# === 多批次打包下载：同时生成的批次数 ===
+EXPORT_ZIP_WORKERS = 4
+
+# === 在库 Excel 导出：带缩略图时的最大行数（图片字节需在内存中保留到保存为止） ===
+INVENTORY_EXPORT_MAX_IMAGES = 5000
+
+# === 标签打印（print_spooler）：打印命令模板，{pdf} 替换为 PDF 路径；测试时可换成本地桩命令 ===
+SUMATRA_PATH = r"D:\SumatraPDF\SumatraPDF.exe"
+PRINTER_NAME = "Kyocera 标签纸打印机"
+PRINT_COMMAND = [SUMATRA_PATH, "-print-to", PRINTER_NAME, "-print-settings", "noscale", "{pdf}"]
+PRINT_TIMEOUT = 120        # 单次打印命令超时（秒）
+PRINT_MAX_ATTEMPTS = 3     # 失败重试上限（含首次）
+PRINT_RETRY_DELAY = 5      # 重试间隔（秒）
+PRINT_SPOOL_DIR = os.path.join(BASE_DIR, "exports", "_print_tmp")
+
+# === 标签打印上下文（token → 编号列表） ===
+# "sqlite"：存数据库，多进程/重启后仍可用；"memory"：仅当前进程内存
+LABEL_CONTEXT_BACKEND = "sqlite"
+LABEL_CONTEXT_TTL = 24 * 3600   # 秒
+LABEL_CONTEXT_MAX = 1000        # 最多保留条数（超出淘汰最早的）
+
+# === 标签 PDF 缓存（按编号/起点/跳过格/版式的哈希；预览后打印、补打直接复用） ===
+LABEL_PDF_CACHE_DIR = os.path.join(BASE_DIR, "cache", "labels")
+LABEL_PDF_CACHE_MAX = 200
+
+# === 标签预览图（/api/label_preview/<token>/page/<n>.png，按页渲染并缓存在 LABEL_PDF_CACHE_DIR） ===
+LABEL_PREVIEW_DPI = 200
+LABEL_PREVIEW_CACHE_MAX = 1000
+# 预览默认用 pypdfium2 栅格化打印 PDF；未安装时才用下面的字体近似重绘（须与 Helvetica 字宽相同）
+LABEL_PREVIEW_FONT_PATH = r"C:\Windows\Fonts\arial.ttf"
+
+# === SQLite 连接参数（db_profile.py，每个新连接建立时设置） ===
+# 数据库在 NAS（SMB）上：journal_mode 必须用 DELETE 等回滚日志模式，不要用 WAL（SMB 上没有可靠的共享内存）
+SQLITE_BUSY_TIMEOUT_MS = 15000   # 遇到锁最多等待 15 秒
+SQLITE_CACHE_SIZE_KB = 20000     # 每个连接的页缓存（KiB）
+SQLITE_MMAP_SIZE = 0             # 网络盘上不要开内存映射
+SQLITE_TEMP_STORE = "MEMORY"     # DEFAULT / FILE / MEMORY
+SQLITE_SYNCHRONOUS = "FULL"      # OFF / NORMAL / FULL / EXTRA
+SQLITE_JOURNAL_MODE = "DELETE"   # DELETE / TRUNCATE / PERSIST（本地盘才可考虑 WAL）
+SQLITE_BEGIN_MODE = "DEFERRED"   # 读写事务：DEFERRED（首次写入时才加写锁）/ IMMEDIATE（开始即加写锁）
+
+# === 本地只读副本（db_replica.py）：只读接口查本机 SSD 上的副本，写入仍走 NAS 主库 ===
+REPLICA_ENABLED = False
+REPLICA_PATH = os.path.join(BASE_DIR, "cache", "replica", "data.db")
+REPLICA_REFRESH_SECONDS = 60       # 定时刷新间隔
+REPLICA_REFRESH_AFTER_COMMIT = True  # 本进程提交后也刷新
+REPLICA_COMMIT_DEBOUNCE = 2        # 提交后等几秒再刷新（合并连续提交）
+REPLICA_MAX_STALENESS = 300        # 超过此秒数未刷新成功 → 只读查询改回主库
+REPLICA_READ_YOUR_WRITES = True    # 本进程有未同步的提交时，只读查询先查主库
+REPLICA_BACKUP_PAGES = 4096        # 在线备份每段复制的页数（段间让出主库读锁）
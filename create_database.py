@@ -9,26 +9,37 @@
 - outbound_logs（出库日志，含关联单据）
 - operation_logs（通用操作日志，用于在库修改留痕等）
 - material_options（来自 temper.py 的一次性脚本，现纳入模型，含枚举：colors/materials/shapes）
+- image_placeholders（图片 LQIP 占位图，列表先画占位再懒加载缩略图）
+- export_jobs（后台导出任务：排队/进行中/完成/失败，重启后自动续跑）
+- print_jobs（标签打印队列：排队/打印中/完成/失败，失败自动重试）
+- label_contexts（标签打印页 token → 编号列表，多进程共享，按 TTL/条数淘汰）
 
 并在 init_basic_data() 中补充更多 item_statuses 选项：
 - 上拍锁定、未成交、返品待出库、已出库
 并初始化 material_options（仅补缺）。
 """
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Text, Boolean, Date, DateTime, DECIMAL,
+    Column, Integer, String, Text, Boolean, Date, DateTime, DECIMAL,
     ForeignKey, ForeignKeyConstraint, CheckConstraint, UniqueConstraint, Index
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from datetime import datetime
 import os
 
+from db_profile import make_sqlite_engine
+
 # ==================== 数据库配置 ====================
 # 若需调整路径，请仅修改 DATABASE_PATH 常量
 DATABASE_PATH = r"\\landisk-edb8f6\disk1\waseidou_files\③古物事业部\吉祥美术\拍卖会相关\Database\data.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+# 连接参数（busy_timeout / 缓存 / 日志模式等）见 db_profile.py 与 config.py 的 SQLITE_*
+# - engine：读写
+# - readonly_engine：只读（query_only + 自动提交），只查询的地方用它，不占写锁
+engine = make_sqlite_engine(DATABASE_URL)
+readonly_engine = make_sqlite_engine(DATABASE_URL, readonly=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadOnlySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=readonly_engine)
 Base = declarative_base()
 
 
@@ -125,6 +136,8 @@ class Item(Base):
     item_status = Column(String(50), ForeignKey('item_statuses.item_status'), comment='物品状态')
     item_notes = Column(Text, comment='备注')
     item_accessories = Column(Text, comment='附属品（逗号分隔，如 共箱,底座）')
+    # 乐观锁：每次修改 +1；编辑接口按 UPDATE ... WHERE row_version = :v 条件更新，不一致时返回 409
+    row_version = Column(Integer, nullable=False, default=1, server_default='1', comment='行版本（乐观锁）')
 
     __table_args__ = (
         ForeignKeyConstraint(
@@ -134,7 +147,12 @@ class Item(Base):
         Index('idx_items_seller_code', 'seller_code'),
         Index('idx_items_category', 'item_category'),
         Index('idx_items_status', 'item_status'),
+        # 按批次取物品（导出/批次编辑/清理空行），带 item_code 免去排序
+        Index('idx_items_batch', 'stockin_date', 'seller_code', 'item_code'),
+        Index('idx_items_box', 'item_box_code'),
     )
+    # ORM 方式修改物品（出库、拍卖等）同样校验并递增 row_version
+    __mapper_args__ = {"version_id_col": row_version}
 
     seller = relationship("Seller", back_populates="items", overlaps="stock_batch")
     box = relationship("Box", back_populates="items")
@@ -228,6 +246,11 @@ class AuctionItem(Base):
     is_penalty_paid_out = Column(Boolean, default=False, comment='是否已付违约金')
     auction_items_notes = Column(Text, comment='备注')
 
+    __table_args__ = (
+        # 按 item_code 查所在拍卖会（列表“拍卖会回数”、加入拍卖会时的冲突检查）
+        Index('idx_auction_items_item', 'item_code', 'auction_id'),
+    )
+
     auction = relationship("Auction", back_populates="auction_items")
     item = relationship("Item", back_populates="auction_items")
     buyer = relationship("Buyer", back_populates="auction_items")
@@ -394,6 +417,86 @@ class OperationLog(Base):
     __table_args__ = (
         Index('idx_oplog_entity', 'entity_type', 'entity_id'),
         Index('idx_oplog_time', 'created_at'),
+        Index('idx_oplog_type_time', 'entity_type', 'created_at', 'entity_id'),  # 最近修改过的 item（预热缩略图）
+    )
+
+
+class ImagePlaceholder(Base):
+    """
+    图片占位图（LQIP）：按 web 路径登记 16px 小图的 base64，
+    列表/批次表格先画占位图，再懒加载真实缩略图。
+    - 上传时生成；历史图片由 backfill_placeholders.py 补齐
+    - src_mtime 与源文件不一致时视为过期，会被重新生成
+    """
+    __tablename__ = 'image_placeholders'
+    file_path = Column(String(500), primary_key=True, comment='web 路径（如 /files/system/...）')
+    src_mtime = Column(Integer, comment='源文件 mtime（秒）')
+    width = Column(Integer, comment='原图宽（EXIF 转正后）')
+    height = Column(Integer, comment='原图高（EXIF 转正后）')
+    lqip = Column(Text, nullable=False, comment='data:image/jpeg;base64,...')
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ExportJob(Base):
+    """
+    后台导出任务（批次 xlsx/pdf、多批次 zip、在库 CSV）：
+    - status: queued / running / done / failed
+    - host: 执行任务的机器名；结果文件存在该机器本地，重启后只续跑本机未完成的任务
+    - params: JSON 文本（任务参数）
+    """
+    __tablename__ = 'export_jobs'
+    job_id = Column(String(32), primary_key=True)
+    kind = Column(String(32), nullable=False)
+    params = Column(Text)
+    status = Column(String(16), nullable=False, default='queued')
+    host = Column(String(100))
+    result_path = Column(String(500))
+    download_name = Column(String(200))
+    mimetype = Column(String(100))
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_export_jobs_status', 'status'),
+    )
+
+
+class PrintJob(Base):
+    """
+    标签打印任务（print_spooler 单线程依次送打印机）：
+    - status: queued / printing / done / failed
+    - attempts: 已尝试次数；失败后按 PRINT_RETRY_DELAY 重试，最多 max_attempts 次
+    - host: 提交任务的机器名（PDF 临时文件在该机器本地）
+    """
+    __tablename__ = 'print_jobs'
+    job_id = Column(String(32), primary_key=True)
+    title = Column(String(200))
+    status = Column(String(16), nullable=False, default='queued')
+    pdf_path = Column(String(500))
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    host = Column(String(100))
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_print_jobs_status', 'status'),
+    )
+
+
+class LabelContext(Base):
+    """标签打印上下文：批次页生成 token，标签打印页凭 token 取编号列表（codes 为 JSON 文本）"""
+    __tablename__ = 'label_contexts'
+    token = Column(String(32), primary_key=True)
+    codes = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_label_contexts_time', 'created_at'),
     )
 
 
@@ -481,6 +584,19 @@ def drop_database():
 def get_session():
     return SessionLocal()
 
+
+def get_readonly_session(primary=False):
+    """
+    只读会话：写入会报错（query_only），查询自动提交、不持有长事务。
+    开启本地只读副本（config.REPLICA_ENABLED）且副本未过期时查副本，否则查主库。
+    primary=True：一律查主库（写入前的读取、冲突检查等需要最新数据的场合）
+    """
+    if primary:
+        return ReadOnlySessionLocal()
+    from db_replica import replica  # 延迟导入，避免循环引用
+    bind = replica.read_engine()
+    return ReadOnlySessionLocal(bind=bind) if bind is not None else ReadOnlySessionLocal()
+
 def _column_exists(table_name: str, column_name: str) -> bool:
     """检查指定表是否存在某列（SQLite）"""
     from sqlalchemy import text
@@ -542,6 +658,53 @@ def _migrate_add_auction_items_unique_index():
             print("唯一索引 ux_auction_items_auction_item 已存在，跳过")
 
 
+def _migrate_add_items_row_version():
+    """
+    结构补丁（幂等）：为 items 增加 row_version 列（乐观锁，旧数据一律为 1）
+    - 仅在列不存在时才执行 ALTER TABLE；模型里已声明该列，旧库不补列会导致查询 items 报错，
+      所以 app 启动时也会调用一次
+    """
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        if not _column_exists("items", "row_version"):
+            conn.execute(text("ALTER TABLE items ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1"))
+            print("已添加列: items.row_version")
+
+
+# 高频查询用的组合/覆盖索引：(索引名, 表, 列)；新库由模型的 __table_args__ 直接建出，
+# 旧库由 _migrate_add_hot_query_indexes() 补建。检查查询计划：python check_query_plans.py
+HOT_QUERY_INDEXES = [
+    ("idx_items_batch", "items", ("stockin_date", "seller_code", "item_code")),
+    ("idx_items_box", "items", ("item_box_code",)),
+    ("idx_auction_items_item", "auction_items", ("item_code", "auction_id")),
+    ("idx_oplog_type_time", "operation_logs", ("entity_type", "created_at", "entity_id")),
+]
+
+
+def _migrate_add_hot_query_indexes():
+    """
+    为高频查询补建组合索引（见 HOT_QUERY_INDEXES）：
+    - items 按批次 (stockin_date, seller_code) 取物品、按箱号查物品
+    - auction_items 按 item_code 查所在拍卖会
+    - operation_logs 按类型 + 时间取最近修改
+    幂等：索引已存在时不会重复创建；有新建时顺带 PRAGMA optimize 更新统计信息。
+    """
+    from sqlalchemy import text
+    created = []
+    with engine.begin() as conn:
+        for name, table, cols in HOT_QUERY_INDEXES:
+            rows = conn.execute(text(f"PRAGMA index_list('{table}')")).fetchall()
+            index_names = {r[1] for r in rows}  # r[1] = index name
+            if name in index_names:
+                print(f"索引 {name} 已存在，跳过")
+                continue
+            conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(cols)})"))
+            created.append(name)
+            print(f"已创建索引: {name}")
+        if created:
+            conn.execute(text("PRAGMA optimize"))
+
+
 
 
 
@@ -647,6 +810,8 @@ if __name__ == '__main__':
     create_database()
     _migrate_add_sort_and_group()
     _migrate_add_auction_items_unique_index()  # 新增：防止同一拍卖会重复加入同一物品
+    _migrate_add_hot_query_indexes()  # 批次/箱号/拍卖会/操作日志的高频查询索引
+    _migrate_add_items_row_version()  # 物品编辑的乐观锁版本号
     init_basic_data()
     show_tables()
 
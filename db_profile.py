@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 连接参数（connection profile）
+数据库文件放在 NAS（SMB 共享）上，多个录入人员同时使用；默认连接不设等待、不调缓存，
+并发写入时很容易直接报 "database is locked"。这里在每个新连接建立时（connect 事件）统一设置：
+- busy_timeout：遇到锁时最多等待的毫秒数，而不是立刻失败
+- cache_size / temp_store：页缓存与临时表放内存，减少走网络的读
+- mmap_size：内存映射读；网络盘上多个客户端同时映射同一文件不安全，默认 0（关闭）
+- synchronous：写入落盘级别；网络盘上建议 FULL
+- journal_mode：DELETE（回滚日志）。WAL 依赖共享内存（-shm 文件），SMB 上不可用，会损坏数据库
+参数见 config.py 的 SQLITE_*。
+
+提供两种引擎：
+- 读写引擎：事务开始时显式发出 BEGIN（SQLITE_BEGIN_MODE：DEFERRED / IMMEDIATE）
+- 只读引擎：query_only=ON + 自动提交，每条查询各自短暂持有共享锁，不会长时间挡住写入
+
+用法：
+    from db_profile import make_sqlite_engine
+    engine = make_sqlite_engine(DATABASE_URL)
+    readonly_engine = make_sqlite_engine(DATABASE_URL, readonly=True)
+"""
+from sqlalchemy import create_engine, event
+
+try:
+    from config import (SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE, SQLITE_TEMP_STORE,
+                        SQLITE_SYNCHRONOUS, SQLITE_JOURNAL_MODE, SQLITE_BEGIN_MODE)
+except Exception:
+    SQLITE_BUSY_TIMEOUT_MS = 15000
+    SQLITE_CACHE_SIZE_KB = 20000
+    SQLITE_MMAP_SIZE = 0
+    SQLITE_TEMP_STORE = "MEMORY"
+    SQLITE_SYNCHRONOUS = "FULL"
+    SQLITE_JOURNAL_MODE = "DELETE"
+    SQLITE_BEGIN_MODE = "DEFERRED"
+
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_BEGIN_MODES = {"DEFERRED", "IMMEDIATE", "EXCLUSIVE"}
+
+
+def _choice(value, allowed, name):
+    v = str(value or "").strip().upper()
+    if v not in allowed:
+        raise ValueError(f"{name} 取值无效: {value!r}（可选 {sorted(allowed)}）")
+    return v
+
+
+def sqlite_profile(readonly: bool = False) -> dict:
+    """当前配置下的连接参数（/api/health 等处展示用）"""
+    return {
+        "readonly": readonly,
+        "busy_timeout_ms": int(SQLITE_BUSY_TIMEOUT_MS),
+        "cache_size_kb": int(SQLITE_CACHE_SIZE_KB),
+        "mmap_size": int(SQLITE_MMAP_SIZE),
+        "temp_store": _choice(SQLITE_TEMP_STORE, _TEMP_STORE, "SQLITE_TEMP_STORE"),
+        "synchronous": _choice(SQLITE_SYNCHRONOUS, _SYNCHRONOUS, "SQLITE_SYNCHRONOUS"),
+        "journal_mode": _choice(SQLITE_JOURNAL_MODE, _JOURNAL_MODES, "SQLITE_JOURNAL_MODE"),
+        "begin_mode": None if readonly else _choice(SQLITE_BEGIN_MODE, _BEGIN_MODES, "SQLITE_BEGIN_MODE"),
+    }
+
+
+def make_sqlite_engine(url: str, readonly: bool = False, **kwargs):
+    """创建按 profile 设置好 PRAGMA 的引擎；readonly=True 时为只读 + 自动提交"""
+    profile = sqlite_profile(readonly)
+    connect_args = dict(kwargs.pop("connect_args", None) or {})
+    # 驱动层的等待（秒）与 busy_timeout 保持一致
+    connect_args.setdefault("timeout", profile["busy_timeout_ms"] / 1000.0)
+    connect_args.setdefault("check_same_thread", False)  # 连接由连接池在线程间复用
+    if readonly:
+        kwargs.setdefault("isolation_level", "AUTOCOMMIT")
+    engine = create_engine(url, echo=False, future=True, connect_args=connect_args, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        # 关闭 pysqlite 自带的隐式 BEGIN，事务边界由下面的 begin 事件决定
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute(f"PRAGMA busy_timeout = {profile['busy_timeout_ms']}")
+            cur.execute(f"PRAGMA cache_size = {-abs(profile['cache_size_kb'])}")  # 负数表示 KiB
+            cur.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+            cur.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+            cur.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+            if readonly:
+                cur.execute("PRAGMA query_only = ON")
+            else:
+                # journal_mode 是数据库文件级的设置，只由读写连接负责；切换失败（被别人占用）时沿用现状
+                try:
+                    cur.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+                except Exception as e:
+                    print("设置 journal_mode 失败:", e)
+        finally:
+            cur.close()
+
+    if not readonly:
+        @event.listens_for(engine, "begin")
+        def _on_begin(conn):
+            conn.exec_driver_sql(f"BEGIN {profile['begin_mode']}")
+
+    return engine
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+本地只读副本（可选，config.REPLICA_ENABLED）
+- 主库在 NAS（SMB）上，每次查询都要走网络；开启后在本机 SSD 保留一份副本（REPLICA_PATH），
+  只读接口（get_readonly_session）查副本，写入照旧走主库
+- 副本用 SQLite 在线备份 API（sqlite3.Connection.backup）从主库整库复制：
+    定时：每 REPLICA_REFRESH_SECONDS 秒一次
+    提交后：本进程在主库提交后，等 REPLICA_COMMIT_DEBOUNCE 秒（合并连续提交）再刷新一次
+- 过期兜底：副本距上次成功刷新超过 REPLICA_MAX_STALENESS 秒（例如 NAS 暂时连不上导致刷新失败），
+  只读查询自动改回主库；REPLICA_READ_YOUR_WRITES=True 时，本进程有尚未同步到副本的提交也先查主库，
+  避免“刚保存完刷新列表却看不到”
+- 服务启动时不信任旧副本：第一次刷新完成前一律查主库
+- 状态（最后刷新时间、已过期多久、当前查哪边、最近错误）见 replica.status()，/api/health 会一并返回
+
+用法：
+    from db_replica import replica
+    replica.start()                 # app 启动时调用；未开启时什么也不做
+    engine = replica.read_engine()  # 副本可用时返回副本引擎，否则 None（调用方改用主库）
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+try:
+    from config import (REPLICA_ENABLED, REPLICA_PATH, REPLICA_REFRESH_SECONDS, REPLICA_MAX_STALENESS,
+                        REPLICA_REFRESH_AFTER_COMMIT, REPLICA_COMMIT_DEBOUNCE, REPLICA_READ_YOUR_WRITES,
+                        REPLICA_BACKUP_PAGES)
+except Exception:
+    REPLICA_ENABLED = False
+    REPLICA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "replica", "data.db")
+    REPLICA_REFRESH_SECONDS = 60
+    REPLICA_MAX_STALENESS = 300
+    REPLICA_REFRESH_AFTER_COMMIT = True
+    REPLICA_COMMIT_DEBOUNCE = 2
+    REPLICA_READ_YOUR_WRITES = True
+    REPLICA_BACKUP_PAGES = 4096
+
+try:
+    from config import SQLITE_BUSY_TIMEOUT_MS
+except Exception:
+    SQLITE_BUSY_TIMEOUT_MS = 15000
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+
+
+class SQLiteReplica:
+    def __init__(self, replica_path: str, refresh_seconds: float, max_staleness: float,
+                 refresh_after_commit: bool = True, commit_debounce: float = 2,
+                 read_your_writes: bool = True, backup_pages: int = 4096, enabled: bool = True):
+        self.enabled = enabled
+        self.replica_path = replica_path
+        self.refresh_seconds = max(1.0, float(refresh_seconds))
+        self.max_staleness = float(max_staleness)
+        self.refresh_after_commit = refresh_after_commit
+        self.commit_debounce = max(0.0, float(commit_debounce))
+        self.read_your_writes = read_your_writes
+        self.backup_pages = int(backup_pages) or -1
+
+        self.primary_path = None
+        self._engine = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()          # start()
+        self._refresh_lock = threading.Lock()  # 同一时间只跑一次备份
+
+        self.synced_at = None        # 最近一次成功刷新的开始时间（副本数据不早于此刻）
+        self.last_duration = None
+        self.last_error = None
+        self.last_error_at = None
+        self.refresh_count = 0
+        self._last_commit_at = None  # 本进程最近一次向主库提交的时间
+
+    # ---------- 启动 ----------
+    def start(self):
+        """开启时：登记提交钩子并启动刷新线程（第一次刷新在后台进行）；重复调用无副作用"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            import create_database
+            from db_profile import make_sqlite_engine
+
+            primary = create_database.engine
+            self.primary_path = primary.url.database
+            if not self.primary_path or self.primary_path == ":memory:":
+                raise RuntimeError("只读副本只支持文件型 SQLite 主库")
+            os.makedirs(os.path.dirname(os.path.abspath(self.replica_path)), exist_ok=True)
+            if self._engine is None:
+                self._engine = make_sqlite_engine(f"sqlite:///{self.replica_path}", readonly=True)
+            event.listen(primary, "commit", self._on_commit)
+
+            self._thread = threading.Thread(target=self._loop, name="db-replica", daemon=True)
+            self._thread.start()
+            self._wake.set()  # 立即做第一次刷新
+
+    def _on_commit(self, _conn):
+        self._last_commit_at = time.time()
+        if self.refresh_after_commit:
+            self._wake.set()
+
+    # ---------- 刷新 ----------
+    def _loop(self):
+        while True:
+            woke = self._wake.wait(self.refresh_seconds)
+            if woke and self.synced_at is not None:
+                time.sleep(self.commit_debounce)  # 合并短时间内的连续提交
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print("只读副本刷新失败:", e)
+
+    def refresh(self):
+        """从主库整库备份到副本（在线备份，期间主库照常读写）；失败抛异常并记录到 last_error"""
+        with self._refresh_lock:
+            started = time.time()
+            src = dst = None
+            try:
+                src = sqlite3.connect(self.primary_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0)
+                dst = sqlite3.connect(self.replica_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0)
+                # 分段复制：每段之间释放主库读锁，让写入插进来（期间主库被改动时 SQLite 会自动重来）
+                src.backup(dst, pages=self.backup_pages, sleep=0.005)
+            except Exception as e:
+                self.last_error = str(e)
+                self.last_error_at = time.time()
+                raise
+            finally:
+                for c in (dst, src):
+                    if c is not None:
+                        c.close()
+            self.synced_at = started
+            self.last_duration = time.time() - started
+            self.last_error = None
+            self.refresh_count += 1
+
+    # ---------- 读取 ----------
+    def age_seconds(self):
+        return None if self.synced_at is None else max(0.0, time.time() - self.synced_at)
+
+    def _serving_replica(self) -> bool:
+        if not self.enabled or self._engine is None or self.synced_at is None:
+            return False
+        if time.time() - self.synced_at > self.max_staleness:
+            return False
+        if self.read_your_writes and self._last_commit_at and self._last_commit_at >= self.synced_at:
+            return False
+        return True
+
+    def read_engine(self):
+        """副本可用（已开启、已刷新过、未过期、无未同步的本进程提交）时返回副本引擎，否则 None"""
+        return self._engine if self._serving_replica() else None
+
+    def status(self) -> dict:
+        age = self.age_seconds()
+        return {
+            "enabled": self.enabled,
+            "serving": "replica" if self._serving_replica() else "primary",
+            "path": self.replica_path if self.enabled else None,
+            "synced_at": _iso(self.synced_at),
+            "age_seconds": round(age, 1) if age is not None else None,
+            "max_staleness_seconds": self.max_staleness,
+            "stale": self.enabled and (age is None or age > self.max_staleness),
+            "pending_commits": bool(self._last_commit_at and (self.synced_at is None
+                                                              or self._last_commit_at >= self.synced_at)),
+            "refresh_seconds": self.refresh_seconds,
+            "refresh_count": self.refresh_count,
+            "last_duration_seconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "last_error_at": _iso(self.last_error_at),
+        }
+
+
+replica = SQLiteReplica(
+    REPLICA_PATH, REPLICA_REFRESH_SECONDS, REPLICA_MAX_STALENESS,
+    refresh_after_commit=REPLICA_REFRESH_AFTER_COMMIT, commit_debounce=REPLICA_COMMIT_DEBOUNCE,
+    read_your_writes=REPLICA_READ_YOUR_WRITES, backup_pages=REPLICA_BACKUP_PAGES, enabled=REPLICA_ENABLED,
+)
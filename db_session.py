@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+请求级数据库会话
+- db_session / readonly_db_session：scoped_session，作用域为 Flask 应用上下文（每个请求一个），
+  同一请求里的视图与辅助函数拿到的是同一个会话；请求结束（teardown_appcontext）统一 remove()，
+  未提交的事务回滚、连接归还连接池
+- @readonly：标记只查询的视图，request_session() 返回只读会话
+  （只读连接 + 自动提交，每条查询各自短暂持有共享锁，不占写锁；开启本地副本时查副本）
+- 视图里照旧写 session.close() 也没关系（提前归还连接），请求结束时还会再 remove()
+- 后台线程（导出任务、打印队列、线程池）没有请求上下文，继续用 create_database.get_session()
+
+用法：
+    @app.route("/api/xxx")
+    @readonly
+    def api_xxx():
+        session = request_session()
+        ...
+"""
+from functools import wraps
+
+from flask import g
+from flask.globals import app_ctx
+from sqlalchemy.orm import scoped_session
+
+from create_database import SessionLocal, get_readonly_session
+
+
+def _app_ctx_id():
+    return id(app_ctx._get_current_object())
+
+
+db_session = scoped_session(SessionLocal, scopefunc=_app_ctx_id)
+readonly_db_session = scoped_session(get_readonly_session, scopefunc=_app_ctx_id)
+
+
+def request_session():
+    """当前请求的会话：@readonly 视图里是只读会话，其余是读写会话"""
+    if g.get("db_readonly"):
+        return readonly_db_session()
+    return db_session()
+
+
+def readonly(view):
+    """只读视图：request_session() 改用只读连接（写入会报错）"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_readonly = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    @app.teardown_appcontext
+    def _remove_db_sessions(exc=None):
+        db_session.remove()
+        readonly_db_session.remove()
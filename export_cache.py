@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+批次导出文件（xlsx / pdf）磁盘缓存
+- 缓存键 = 导出内容的指纹：批次明细行 + 出品人名 + LOGO 与每张图片的 mtime/大小 + 版式版本号
+- 批次未变化时直接返回磁盘上的文件，不再重新拼表 / 驱动 Excel 转 PDF
+- 任何相关内容变化（改价、换图、改出品人名、换 LOGO）都会得到新键，自动重新生成
+- 每个批次每种格式只保留最新一份，旧文件在写入新文件时删除
+- 命中时在查找函数内直接打开文件、返回文件对象：之后即使并发的 store_export 删掉了旧文件，
+  已打开的句柄仍可读完（Windows 下打开中的文件删不掉，留到下次写入时再删）
+
+说明：页眉“生成时间”为首次生成的时间（内容未变化时沿用）
+
+用法：
+    from export_cache import export_key, cached_export, store_export
+    key = export_key("xlsx", batch_code, seller_name, items, files)
+    f = cached_export(batch_code, key, "xlsx")   # 命中：已打开的二进制文件对象，用完需关闭
+    if f is None:
+        store_export(batch_code, key, "xlsx", data)
+"""
+import glob
+import hashlib
+import json
+import os
+import uuid
+
+try:
+    from config import EXPORT_CACHE_DIR
+except Exception:
+    EXPORT_CACHE_DIR = None
+
+# 导出版式有改动（列宽、字体、图片尺寸等）时 +1，使旧缓存全部失效
+EXPORT_LAYOUT_VERSION = 1
+
+
+def _file_sig(path):
+    """文件签名：(mtime, size)；文件不存在返回 None"""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+        return [int(st.st_mtime), st.st_size]
+    except OSError:
+        return None
+
+
+def export_key(fmt: str, batch_code: str, seller_name: str, items, files) -> str:
+    """
+    计算导出内容指纹（sha256 十六进制）。
+    items: 批次明细行（dict 列表）；files: 影响导出结果的文件路径（LOGO、图片绝对路径）
+    """
+    rows = sorted(
+        (json.dumps(it, sort_keys=True, ensure_ascii=False, default=str) for it in items)
+    )
+    payload = {
+        "v": EXPORT_LAYOUT_VERSION,
+        "fmt": fmt,
+        "batch": batch_code,
+        "seller_name": seller_name or "",
+        "rows": rows,
+        "files": [[p, _file_sig(p)] for p in sorted(set(f for f in files if f))],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _cache_file(batch_code: str, key: str, ext: str):
+    if not EXPORT_CACHE_DIR:
+        return None
+    return os.path.join(EXPORT_CACHE_DIR, f"{batch_code}-{key[:16]}.{ext}")
+
+
+def cached_export(batch_code: str, key: str, ext: str):
+    """命中返回已打开的缓存文件（"rb"，由调用方关闭），否则 None"""
+    path = _cache_file(batch_code, key, ext)
+    if not path:
+        return None
+    try:
+        return open(path, "rb")
+    except OSError:
+        return None
+
+
+def store_export(batch_code: str, key: str, ext: str, data: bytes):
+    """
+    写入缓存并返回路径（临时文件 + os.replace，半成品不会被读到）；
+    同批次同格式的旧缓存一并删除。缓存目录不可用时返回 None。
+    """
+    path = _cache_file(batch_code, key, ext)
+    if not path:
+        return None
+    tmp = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return None
+
+    for old in glob.glob(os.path.join(glob.escape(EXPORT_CACHE_DIR), f"{glob.escape(batch_code)}-*.{ext}")):
+        if os.path.abspath(old) != os.path.abspath(path):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
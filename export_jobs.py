@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+后台导出任务队列
+- 提交即返回 job_id，导出在有界线程池（EXPORT_JOB_WORKERS）中执行，不占用 waitress 请求线程
+- 任务状态持久化在 export_jobs 表：queued → running → done / failed
+- 领取任务用条件 UPDATE（status='queued' 才改成 running），同一台机器上多个进程都在跑队列时
+  同一任务只会执行一次
+- 领取出错（如数据库忙 database is locked）时隔几秒重试，重试用尽则把任务标为失败，不会一直停在排队中
+- 服务重启后，本机排队中的任务重新排队执行；“执行中”的任务只有 started_at 超过
+  EXPORT_JOB_STALE_MINUTES（执行它的进程已退出）才改回排队重跑
+- 结果文件保存在 EXPORT_JOB_DIR/<job_id>/，超过 EXPORT_JOB_KEEP_HOURS 的任务连同文件一起清理
+
+任务处理函数由 app.py 注册：
+    export_jobs.register("batch", handler)
+    # handler(params: dict, job_dir: str) -> (结果文件路径, 下载文件名, mimetype)
+
+用法：
+    job_id = export_jobs.submit("batch", {"stockin_date": "...", "seller_code": "...", "format": "xlsx"})
+    info = export_jobs.get(job_id)
+"""
+import json
+import os
+import shutil
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from create_database import get_session, ExportJob
+
+try:
+    from config import EXPORT_JOB_DIR, EXPORT_JOB_WORKERS, EXPORT_JOB_KEEP_HOURS, EXPORT_JOB_STALE_MINUTES
+except Exception:
+    EXPORT_JOB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports", "jobs")
+    EXPORT_JOB_WORKERS = 2
+    EXPORT_JOB_KEEP_HOURS = 24
+    EXPORT_JOB_STALE_MINUTES = 60
+
+CLAIM_ATTEMPTS = 3        # 领取出错时最多尝试次数
+CLAIM_RETRY_SECONDS = 5   # 第 n 次重试前等待 n × 该秒数
+
+
+class ExportJobQueue:
+    def __init__(self, workers: int, job_dir: str, keep_hours: float, stale_minutes: float = 60):
+        self.job_dir = job_dir
+        self.keep_hours = keep_hours
+        self.stale_minutes = stale_minutes
+        self.host = socket.gethostname()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="export")
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def register(self, kind: str, handler):
+        self._handlers[kind] = handler
+
+    def kinds(self):
+        return sorted(self._handlers)
+
+    # ---------- 启动 ----------
+    def start(self):
+        """建表（如缺失）并续跑本机未完成的任务；重复调用无副作用"""
+        with self._lock:
+            if self._ready:
+                return
+            session = get_session()
+            try:
+                ExportJob.__table__.create(bind=session.get_bind(), checkfirst=True)
+            finally:
+                session.close()
+            self._ready = True
+
+        session = get_session()
+        try:
+            # 执行进程已退出的任务（started_at 过旧）改回排队；条件 UPDATE，多个进程同时启动也只改一次
+            t = ExportJob.__table__
+            stale_before = datetime.utcnow() - timedelta(minutes=self.stale_minutes)
+            session.execute(
+                update(t)
+                .where(t.c.host == self.host, t.c.status == "running",
+                       t.c.started_at.is_(None) | (t.c.started_at < stale_before))
+                .values(status="queued")
+            )
+            session.commit()
+            pending = (
+                session.query(ExportJob.job_id)
+                .filter(ExportJob.host == self.host, ExportJob.status == "queued")
+                .order_by(ExportJob.created_at)
+                .all()
+            )
+            job_ids = [jid for (jid,) in pending]
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        for jid in job_ids:
+            self._executor.submit(self._run, jid)
+        if job_ids:
+            print(f"导出任务：续跑 {len(job_ids)} 个未完成任务")
+
+    # ---------- 提交 / 查询 ----------
+    def submit(self, kind: str, params: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"不支持的导出类型: {kind}")
+        self.start()
+        self._cleanup()
+
+        job_id = uuid.uuid4().hex
+        session = get_session()
+        try:
+            session.add(ExportJob(
+                job_id=job_id, kind=kind, params=json.dumps(params, ensure_ascii=False),
+                status="queued", host=self.host, created_at=datetime.utcnow(),
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str):
+        """返回任务信息 dict；不存在返回 None"""
+        self.start()
+        session = get_session()
+        try:
+            job = session.get(ExportJob, job_id)
+            return _to_dict(job) if job else None
+        finally:
+            session.close()
+
+    # ---------- 执行 ----------
+    def _update(self, job_id: str, **fields):
+        session = get_session()
+        try:
+            job = session.get(ExportJob, job_id)
+            if job is None:
+                return None
+            for k, v in fields.items():
+                setattr(job, k, v)
+            session.commit()
+            return job
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _claim(self, job_id: str):
+        """
+        原子领取：UPDATE ... SET status='running' WHERE status='queued'
+        更新到 1 行才算领到（多进程同时取到同一任务时只有一个执行）；返回 (kind, params) 或 None
+        """
+        session = get_session()
+        try:
+            t = ExportJob.__table__
+            res = session.execute(
+                update(t)
+                .where(t.c.job_id == job_id, t.c.status == "queued")
+                .values(status="running", started_at=datetime.utcnow())
+            )
+            if res.rowcount != 1:
+                session.rollback()
+                return None
+            job = session.get(ExportJob, job_id)
+            claimed = (job.kind, json.loads(job.params or "{}"))
+            session.commit()
+            return claimed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _fail_unclaimed(self, job_id: str, error: str):
+        """领取一直出错：仍在排队的任务标为失败（已被别的进程领走的不动）"""
+        session = get_session()
+        try:
+            t = ExportJob.__table__
+            session.execute(
+                update(t)
+                .where(t.c.job_id == job_id, t.c.status == "queued")
+                .values(status="failed", error=error, finished_at=datetime.utcnow())
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            # 连失败状态也写不进去：任务留在排队中，服务重启时会重新排队
+            print(f"导出任务 {job_id} 无法标记为失败:", e)
+        finally:
+            session.close()
+
+    def _run(self, job_id: str, attempt: int = 1):
+        try:
+            claimed = self._claim(job_id)
+        except Exception as e:
+            print(f"导出任务 {job_id} 领取失败（第 {attempt} 次）:", e)
+            if attempt < CLAIM_ATTEMPTS:
+                # 与打印队列的重试相同：定时器到点后重新进线程池，不占着工作线程等待
+                timer = threading.Timer(CLAIM_RETRY_SECONDS * attempt, self._executor.submit,
+                                        args=(self._run, job_id, attempt + 1))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._fail_unclaimed(job_id, f"领取任务失败：{e}")
+            return
+        if claimed is None:
+            return
+        kind, params = claimed
+        job_dir = os.path.join(self.job_dir, job_id)
+        try:
+            handler = self._handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"不支持的导出类型: {kind}")
+            os.makedirs(job_dir, exist_ok=True)
+            path, download_name, mimetype = handler(params, job_dir)
+            self._update(job_id, status="done", result_path=path, download_name=download_name,
+                         mimetype=mimetype, finished_at=datetime.utcnow())
+        except Exception as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            try:
+                self._update(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+            except Exception:
+                pass
+
+    def _cleanup(self):
+        """删除过期任务（本机）及其结果文件"""
+        cutoff = datetime.utcnow() - timedelta(hours=self.keep_hours)
+        session = get_session()
+        try:
+            old = (
+                session.query(ExportJob)
+                .filter(ExportJob.host == self.host,
+                        ExportJob.status.in_(("done", "failed")),
+                        ExportJob.created_at < cutoff)
+                .all()
+            )
+            for job in old:
+                shutil.rmtree(os.path.join(self.job_dir, job.job_id), ignore_errors=True)
+                session.delete(job)
+            if old:
+                session.commit()
+        except Exception:
+            session.rollback()
+        finally:
+            session.close()
+
+
+def _to_dict(job: ExportJob) -> dict:
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "params": json.loads(job.params or "{}"),
+        "status": job.status,
+        "download_name": job.download_name,
+        "error": job.error,
+        "result_path": job.result_path,
+        "mimetype": job.mimetype,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+export_jobs = ExportJobQueue(EXPORT_JOB_WORKERS, EXPORT_JOB_DIR, EXPORT_JOB_KEEP_HOURS, EXPORT_JOB_STALE_MINUTES)
@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""
+NAS 原图 · 本地镜像缓存（read-through）
+- 首次读取：把 SYSTEM_IMAGE_ROOT（UNC 网络盘）下的原图复制到 LOCAL_MIRROR_DIR
+- 之后读取：只对源文件做一次 stat，mtime/size 一致则直接读本地盘
+- 容量上限：总大小超过 LOCAL_MIRROR_MAX_BYTES 时，按最近访问时间（LRU）淘汰
+- 未开启（LOCAL_MIRROR_ENABLED=False）时原样返回源路径，调用方无感知
+- 返回的镜像文件可能在打开前被其它线程淘汰：读文件用 open_source()（自动改读源文件），
+  直接拿路径的调用方（send_file 等）遇到 FileNotFoundError 时改用源路径
+- 导出进程池的子进程不维护镜像状态（不扫目录、不复制、不淘汰），只读已有的有效镜像
+
+另含“派生图”磁盘缓存（缩略图 / 中图预览）：
+- 按 种类/尺寸/源路径哈希 存放 JPEG，文件 mtime 与源文件一致即视为有效
+- 源文件更新后自动重新生成
+- 尺寸只取 THUMB_SIZES / PREVIEW_SIZES 中的档位（请求尺寸向上取档），总大小超过
+  DERIVATIVE_CACHE_MAX_BYTES 时与镜像一样按 LRU 淘汰
+
+以及 LQIP 占位图（make_lqip）：16px 小图的 base64 data URI，存入 image_placeholders 表
+以及导出用图片的并行准备（prepare_export_images）：进程池中解码/转正/缩放，主进程只负责拼表
+
+用法：
+    from image_cache import mirror_path, render_derivative
+    with open_source(full) as f: ...
+    path = render_derivative(full, "preview", 1280)
+"""
+import base64
+import hashlib
+import io
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from config import SYSTEM_IMAGE_ROOT
+
+try:
+    from PIL import Image, ImageOps
+except Exception:
+    Image = None
+    ImageOps = None
+
+try:
+    from config import LOCAL_MIRROR_ENABLED, LOCAL_MIRROR_DIR, LOCAL_MIRROR_MAX_BYTES
+except Exception:
+    LOCAL_MIRROR_ENABLED = False
+    LOCAL_MIRROR_DIR = None
+    LOCAL_MIRROR_MAX_BYTES = 0
+
+try:
+    from config import DERIVATIVE_CACHE_DIR
+except Exception:
+    DERIVATIVE_CACHE_DIR = None
+
+try:
+    from config import DERIVATIVE_CACHE_MAX_BYTES
+except Exception:
+    DERIVATIVE_CACHE_MAX_BYTES = 5 * 1024 * 1024 * 1024
+
+try:
+    from config import THUMB_SIZES, PREVIEW_SIZES
+except Exception:
+    THUMB_SIZES = (80, 120, 200, 400)
+    PREVIEW_SIZES = (1000, 1280, 1600)
+
+try:
+    from config import EXPORT_IMAGE_PROCESSES
+except Exception:
+    EXPORT_IMAGE_PROCESSES = 0
+
+
+class _LruDir:
+    """
+    按总大小封顶的缓存目录（本地镜像 / 派生图缓存共用）：
+      - LRU 索引只在内存中维护；进程启动后首次使用时按文件 atime 扫描重建
+      - 调用方负责写文件，写完 / 命中后 touch；超出容量时从最久未访问的开始删
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = int(max_bytes or 0)
+        self._lock = threading.Lock()
+        self._lru = None  # OrderedDict: local_path -> size（越靠后越新）
+        self._total = 0
+
+    # ---------- LRU 索引 ----------
+    def _ensure_index(self):
+        if self._lru is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for dirpath, _dirs, files in os.walk(self.cache_dir):
+                for fn in files:
+                    if fn.endswith(".part"):
+                        continue
+                    p = os.path.join(dirpath, fn)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    entries.append((st.st_atime, p, st.st_size))
+        entries.sort()
+        self._lru = OrderedDict((p, size) for _t, p, size in entries)
+        self._total = sum(size for _t, _p, size in entries)
+
+    def _touch(self, local: str, size: int):
+        old = self._lru.pop(local, None)
+        if old is not None:
+            self._total -= old
+        self._lru[local] = size
+        self._total += size
+
+    def _forget(self, local: str):
+        old = self._lru.pop(local, None)
+        if old is not None:
+            self._total -= old
+
+    def _evict(self, keep: str = None):
+        """超出容量时从最久未访问的开始删，刚写入的文件（keep）不删"""
+        if self.max_bytes <= 0:
+            return
+        for p in list(self._lru.keys()):
+            if self._total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            size = self._lru.pop(p)
+            self._total -= size
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # 正被读取（Windows 下打开中的文件删不掉）：放回索引末尾，下次再淘汰，避免变成不计容量的孤儿文件
+                self._lru[p] = size
+                self._total += size
+
+    def touch(self, path: str, size: int = None, evict: bool = False):
+        """登记一次访问（size 为 None 时自行 stat）；evict=True 时顺带淘汰，path 本身不删"""
+        if size is None:
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                return
+        with self._lock:
+            self._ensure_index()
+            self._touch(path, size)
+            if evict:
+                self._evict(keep=path)
+
+    def trim(self):
+        """按容量淘汰一轮（批量登记之后调用）"""
+        with self._lock:
+            self._ensure_index()
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_index()
+            return {"files": len(self._lru), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+class LocalMirror(_LruDir):
+    """
+    本地镜像目录：
+      - 目录结构与 SYSTEM_IMAGE_ROOT 下的相对路径保持一致，便于人工排查
+      - 容量上限与 LRU 淘汰见 _LruDir
+    """
+
+    def __init__(self, source_root: str, mirror_dir: str, max_bytes: int):
+        super().__init__(mirror_dir, max_bytes)
+        self.source_root = os.path.abspath(source_root)
+        self.mirror_dir = self.cache_dir
+
+    # ---------- 路径映射 ----------
+    def _local_path_for(self, full: str):
+        """源文件 → 镜像路径；不在 SYSTEM_IMAGE_ROOT 下的文件不做镜像（返回 None）"""
+        full_norm = os.path.abspath(full)
+        if not full_norm.startswith(self.source_root):
+            return None
+        rel = os.path.relpath(full_norm, self.source_root)
+        if rel.startswith(".."):
+            return None
+        return os.path.join(self.mirror_dir, rel)
+
+    # ---------- 对外 ----------
+    def _fresh_local(self, full: str, local: str):
+        """镜像有效时返回镜像 stat，否则 None（只 stat，不改任何状态）"""
+        try:
+            src = os.stat(full)
+            dst = os.stat(local)
+        except OSError:
+            return None
+        if int(dst.st_mtime) == int(src.st_mtime) and dst.st_size == src.st_size:
+            return dst
+        return None
+
+    def resolve(self, full: str, track: bool = True) -> str:
+        """
+        返回“实际应读取的路径”：
+          - 镜像有效 → 本地路径
+          - 源文件更新过 / 首次读取 → 先复制再返回本地路径
+          - 源文件不存在 → 删除镜像并返回源路径（调用方按原逻辑 404）
+          - 网络盘不可达但本地有镜像 → 返回本地镜像（尽量不影响看图）
+          - 复制失败 → 回退源路径
+        track=False（导出进程池子进程）：只在镜像有效时读镜像，否则读源文件；不复制、不碰 LRU 索引
+        """
+        local = self._local_path_for(full)
+        if not local:
+            return full
+        if not track:
+            return local if self._fresh_local(full, local) else full
+
+        try:
+            src = os.stat(full)
+        except FileNotFoundError:
+            with self._lock:
+                self._ensure_index()
+                self._forget(local)
+            try:
+                os.remove(local)
+            except OSError:
+                pass
+            return full
+        except OSError:
+            return local if os.path.isfile(local) else full
+
+        try:
+            dst = os.stat(local)
+            fresh = (int(dst.st_mtime) == int(src.st_mtime) and dst.st_size == src.st_size)
+        except OSError:
+            fresh = False
+
+        if fresh:
+            self.touch(local, dst.st_size)
+            return local
+
+        # 复制到临时文件再原子替换，避免并发读到半个文件
+        tmp = f"{local}.{uuid.uuid4().hex}.part"
+        try:
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            shutil.copy2(full, tmp)  # copy2 会保留 mtime，供下次比对
+            os.replace(tmp, local)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return full
+
+        self.touch(local, src.st_size, evict=True)
+        return local
+
+
+_MIRROR = None
+if LOCAL_MIRROR_ENABLED and LOCAL_MIRROR_DIR:
+    _MIRROR = LocalMirror(SYSTEM_IMAGE_ROOT, LOCAL_MIRROR_DIR, LOCAL_MIRROR_MAX_BYTES)
+
+# 导出进程池的子进程里为 True（见 _init_export_worker）：不维护镜像 / 派生图缓存的索引，
+# 各进程各扫一遍目录只会得到互相不一致的容量统计
+_IN_EXPORT_WORKER = False
+
+
+def mirror_path(full: str) -> str:
+    """统一入口：未开启镜像时原样返回"""
+    if _MIRROR is None or not full:
+        return full
+    return _MIRROR.resolve(full, track=not _IN_EXPORT_WORKER)
+
+
+def open_source(full: str):
+    """以二进制方式打开原图：优先本地镜像；镜像恰好在打开前被其它线程淘汰时改读源文件"""
+    path = mirror_path(full)
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        if path == full:
+            raise
+        return open(full, "rb")
+
+
+# =============================== 派生图缓存（缩略图 / 预览图） ===============================
+_DERIVATIVE_SIZES = {"thumb": THUMB_SIZES, "preview": PREVIEW_SIZES}
+
+_DERIVATIVES = None
+if DERIVATIVE_CACHE_DIR:
+    _DERIVATIVES = _LruDir(DERIVATIVE_CACHE_DIR, DERIVATIVE_CACHE_MAX_BYTES)
+
+
+def snap_size(kind: str, size: int) -> int:
+    """把请求尺寸向上取到该 kind 的档位（超过最大档取最大档），缓存里每张图每种 kind 最多几个文件"""
+    sizes = sorted(_DERIVATIVE_SIZES.get(kind) or ())
+    if not sizes:
+        return int(size)
+    for s in sizes:
+        if s >= size:
+            return s
+    return sizes[-1]
+
+
+def _touch_derivative(cache: str, evict: bool = False):
+    # 子进程不维护索引；主进程在 prepare_export_images 结束后统一登记
+    if _DERIVATIVES is not None and not _IN_EXPORT_WORKER:
+        _DERIVATIVES.touch(cache, evict=evict)
+
+
+def _derivative_file(full: str, kind: str, size: int) -> str:
+    digest = hashlib.sha1(os.path.abspath(full).encode("utf-8")).hexdigest()
+    return os.path.join(DERIVATIVE_CACHE_DIR, kind, str(int(size)), digest[:2], f"{digest}.jpg")
+
+
+def cached_derivative(full: str, kind: str, size: int):
+    """只查缓存：已生成且未过期则返回路径，否则返回 None（不解码、不写盘）"""
+    if Image is None or not DERIVATIVE_CACHE_DIR:
+        return None
+    try:
+        src_mtime = os.stat(full).st_mtime
+        cache = _derivative_file(full, kind, snap_size(kind, size))
+        if int(os.stat(cache).st_mtime) == int(src_mtime):
+            _touch_derivative(cache)
+            return cache
+    except OSError:
+        pass
+    return None
+
+
+def render_derivative(full: str, kind: str, size: int, *, quality: int = 85):
+    """
+    生成（或复用）等比缩放到“最长边 = size”的 JPEG，返回缓存文件路径：
+      - size 先按 snap_size 取档
+      - EXIF 方向自动转正
+      - 缓存文件的 mtime 被设为源文件 mtime，二者一致即命中
+      - 没装 PIL / 未配置缓存目录 → 返回 None，调用方回退原图
+    源文件不存在时抛 FileNotFoundError；解码失败按 PIL 原样抛出
+    """
+    if Image is None or not DERIVATIVE_CACHE_DIR:
+        return None
+
+    size = snap_size(kind, size)
+    src_mtime = os.stat(full).st_mtime
+    cache = _derivative_file(full, kind, size)
+    try:
+        if int(os.stat(cache).st_mtime) == int(src_mtime):
+            _touch_derivative(cache)
+            return cache
+    except OSError:
+        pass
+
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    tmp = f"{cache}.{uuid.uuid4().hex}.part"
+    try:
+        with open_source(full) as f, Image.open(f) as im:
+            # 大图 JPEG 先让解码器按 2 的幂缩小，省内存也省时间
+            im.draft("RGB", (size, size))
+            im = ImageOps.exif_transpose(im)
+            im = im.convert("RGB")
+            im.thumbnail((size, size), Image.LANCZOS)
+            im.save(tmp, format="JPEG", quality=quality, optimize=True, progressive=True)
+        os.utime(tmp, (src_mtime, src_mtime))
+        os.replace(tmp, cache)
+    finally:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    _touch_derivative(cache, evict=True)
+    return cache
+
+
+# =============================== LQIP 占位图 ===============================
+LQIP_SIZE = 16
+
+
+def make_lqip(full: str):
+    """
+    生成低清占位图：最长边 16px 的 JPEG → data URI（通常 < 1KB）
+    返回 (data_uri, width, height, src_mtime)；width/height 为 EXIF 转正后的原图尺寸，供前端预留宽高比
+    没装 PIL 时返回 None
+    """
+    if Image is None:
+        return None
+    src_mtime = int(os.stat(full).st_mtime)
+    with open_source(full) as f, Image.open(f) as im:
+        width, height = im.size
+        # EXIF 方向 5~8 表示旋转 90°/270°，宽高互换
+        try:
+            if im.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+        except Exception:
+            pass
+        im.draft("RGB", (LQIP_SIZE * 8, LQIP_SIZE * 8))
+        im = ImageOps.exif_transpose(im)
+        im = im.convert("RGB")
+        im.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="JPEG", quality=50)
+    data_uri = "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+    return data_uri, width, height, src_mtime
+
+
+# =============================== 导出图片并行准备 ===============================
+EXPORT_PARALLEL_MIN = 4  # 图片少于这个数时直接在当前进程里做，省去进程间传输
+
+_export_pool = None
+_export_pool_lock = threading.Lock()
+
+
+def prepare_export_image(full, px: int, quality: int = 80):
+    """
+    准备一张导出用图片，返回 (jpeg_bytes, width, height)；无图/缺图/坏图返回 None。
+    - 走派生图缓存（与列表缩略图同 kind/尺寸时直接复用；px 按 snap_size 取档）
+    - 没装 PIL 时返回原图字节，width/height 为 None（调用方自行读取尺寸）
+    必须是模块级函数：会被 ProcessPoolExecutor 在子进程中调用
+    """
+    if not full:
+        return None
+    try:
+        if not os.path.exists(full):
+            return None
+        small = render_derivative(full, "thumb", px, quality=quality)
+        if small:
+            try:
+                with open(small, "rb") as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                # 刚生成就被其它线程淘汰：重新生成一次
+                with open(render_derivative(full, "thumb", px, quality=quality), "rb") as f:
+                    raw = f.read()
+            with Image.open(io.BytesIO(raw)) as im:
+                w, h = im.size
+            return raw, w, h
+        with open_source(full) as f:
+            return f.read(), None, None
+    except Exception:
+        return None
+
+
+def _prepare_export_image_args(args):
+    return prepare_export_image(*args)
+
+
+def _init_export_worker():
+    """进程池子进程初始化：标记为子进程，镜像 / 缓存索引只由主进程维护"""
+    global _IN_EXPORT_WORKER
+    _IN_EXPORT_WORKER = True
+
+
+def _get_export_pool():
+    global _export_pool
+    with _export_pool_lock:
+        if _export_pool is None:
+            workers = EXPORT_IMAGE_PROCESSES or None  # None = CPU 核数
+            _export_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker)
+        return _export_pool
+
+
+def _reset_export_pool():
+    global _export_pool
+    with _export_pool_lock:
+        pool, _export_pool = _export_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def prepare_export_images(fulls, px: int, quality: int = 80):
+    """
+    批量准备导出图片，返回与 fulls 一一对应的列表（元素同 prepare_export_image）。
+    - 图片够多时在进程池里并行解码，导出耗时随 CPU 核数而不是件数增长
+    - EXPORT_IMAGE_PROCESSES < 0 表示禁用进程池；进程池异常时自动退回串行
+    """
+    jobs = [(f, px, quality) for f in fulls]
+    if EXPORT_IMAGE_PROCESSES < 0 or sum(1 for f in fulls if f) < EXPORT_PARALLEL_MIN:
+        return [prepare_export_image(*j) for j in jobs]
+    try:
+        pool = _get_export_pool()
+        results = list(pool.map(_prepare_export_image_args, jobs, chunksize=4))
+    except Exception:
+        # 子进程崩溃 / 无法创建进程等：重建进程池，本次串行完成
+        _reset_export_pool()
+        return [prepare_export_image(*j) for j in jobs]
+    # 子进程写出的派生图由主进程登记进 LRU 索引并按容量淘汰
+    if _DERIVATIVES is not None:
+        size = snap_size("thumb", px)
+        for f, r in zip(fulls, results):
+            if f and r is not None:
+                _DERIVATIVES.touch(_derivative_file(f, "thumb", size))
+        _DERIVATIVES.trim()
+    return results
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+标签打印上下文存储（token → 编号列表）
+- 批次页调用 /api/label_context_set 登记编号、拿到 token，标签打印页凭 token 取回编号
+- 过期（LABEL_CONTEXT_TTL 秒）与条数上限（LABEL_CONTEXT_MAX）双重淘汰，内存/表不会无限增长
+- 两种后端（config.LABEL_CONTEXT_BACKEND）：
+    sqlite：存 label_contexts 表，多个 worker 进程共享，服务重启后 token 仍有效（默认）
+    memory：进程内 OrderedDict，仅适合单进程开发调试
+
+用法：
+    from label_context import label_contexts
+    token = label_contexts.put(codes)
+    codes = label_contexts.get(token)   # 不存在或已过期返回 None
+"""
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import time
+
+from create_database import get_session, LabelContext
+
+try:
+    from config import LABEL_CONTEXT_BACKEND, LABEL_CONTEXT_TTL, LABEL_CONTEXT_MAX
+except Exception:
+    LABEL_CONTEXT_BACKEND = "sqlite"
+    LABEL_CONTEXT_TTL = 24 * 3600
+    LABEL_CONTEXT_MAX = 1000
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+class MemoryLabelContextStore:
+    """进程内存储：按插入顺序淘汰，读取时顺带检查过期"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()  # token -> (created_at, codes)
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._data:
+            token, (created, _) = next(iter(self._data.items()))
+            if len(self._data) > self.max_entries or now - created > self.ttl:
+                self._data.popitem(last=False)
+            else:
+                break
+
+    def put(self, codes) -> str:
+        token = _new_token()
+        now = time()
+        with self._lock:
+            self._data[token] = (now, list(codes))
+            self._evict(now)
+        return token
+
+    def get(self, token):
+        with self._lock:
+            hit = self._data.get(token)
+            if hit is None:
+                return None
+            created, codes = hit
+            if time() - created > self.ttl:
+                self._data.pop(token, None)
+                return None
+            return codes
+
+
+class SQLiteLabelContextStore:
+    """数据库存储：多进程共享；写入时顺带清理过期与超额的旧记录"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_table(self, session):
+        if self._ready:
+            return
+        with self._lock:
+            if not self._ready:
+                LabelContext.__table__.create(bind=session.get_bind(), checkfirst=True)
+                self._ready = True
+
+    def put(self, codes) -> str:
+        from sqlalchemy import text
+        token = _new_token()
+        now = datetime.utcnow()
+        session = get_session()
+        try:
+            self._ensure_table(session)
+            session.add(LabelContext(token=token, codes=json.dumps(list(codes), ensure_ascii=False),
+                                     created_at=now))
+            session.flush()
+            session.query(LabelContext).filter(
+                LabelContext.created_at < now - timedelta(seconds=self.ttl)
+            ).delete(synchronize_session=False)
+            session.execute(text(
+                "DELETE FROM label_contexts WHERE token IN ("
+                "  SELECT token FROM label_contexts ORDER BY created_at DESC LIMIT -1 OFFSET :keep)"
+            ), {"keep": self.max_entries})
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        return token
+
+    def get(self, token):
+        session = get_session()
+        try:
+            self._ensure_table(session)
+            row = session.get(LabelContext, token)
+            if row is None:
+                return None
+            if row.created_at and datetime.utcnow() - row.created_at > timedelta(seconds=self.ttl):
+                return None
+            return json.loads(row.codes)
+        finally:
+            session.close()
+
+
+def make_label_context_store(backend: str = LABEL_CONTEXT_BACKEND):
+    if (backend or "").lower() == "memory":
+        return MemoryLabelContextStore(LABEL_CONTEXT_TTL, LABEL_CONTEXT_MAX)
+    return SQLiteLabelContextStore(LABEL_CONTEXT_TTL, LABEL_CONTEXT_MAX)
+
+
+label_contexts = make_label_context_store()
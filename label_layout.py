@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+标签纸排版（预览 /api/preview 与打印 /api/print_label_pdf 共用）
+- 标签纸：A4，9 列 × 28 行，每格 20mm × 10mm
+- 从 startIndex 开始依次放入编号，skipIndices 中的格子跳过（已用过的标签）
+- 一次遍历完成放置并按页分桶：渲染时每页只处理本页的标签，1 万张标签也是线性时间
+- 生成的 PDF 按 (codes, startIndex, skipIndices, 版式参数) 的哈希缓存在磁盘（LABEL_PDF_CACHE_DIR），
+  预览后打印、重复补打都直接复用，多个 worker 进程共享
+- 预览图：把缓存的那份打印 PDF 的单页用 pypdfium2 栅格化成 PNG（与打印结果逐像素一致），
+  同样按页缓存；标签打印页只请求正在看的那一页。
+  未安装 pypdfium2 时退回 PIL 按同一套坐标/字号重绘——只是近似（字形与字宽取决于所用字体），
+  且只接受与 Helvetica 字宽相同的字体（Arial / Liberation Sans / Arimo / Nimbus Sans）
+
+用法：
+    layout = place_labels(codes, start_index, skip_indices)
+    layout.pages        # 总页数
+    layout.placed       # [(格子序号, 编号), ...]
+    layout.by_page[p]   # [(行, 列, 编号), ...]
+    pdf_bytes = render_labels_pdf(layout)
+    key, pdf_bytes = cached_labels_pdf(codes, start_index, skip_indices)
+    key, png_bytes = cached_label_page_png(codes, start_index, skip_indices, page)  # page 从 0 开始
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+import uuid
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except Exception:
+    Image = None
+    ImageDraw = None
+    ImageFont = None
+
+try:
+    import pypdfium2 as pdfium
+except Exception:
+    pdfium = None
+
+# ===== 标签纸规格 =====
+COLS = 9
+ROWS = 28
+PER_PAGE = COLS * ROWS
+
+MARGIN_L_MM = 7
+MARGIN_T_MM = 7
+LABEL_W_MM = 20
+LABEL_H_MM = 10
+GAP_X_MM = 2
+GAP_Y_MM = 0
+
+BASE_FONT = "Helvetica"
+
+try:
+    from config import LABEL_PDF_CACHE_DIR, LABEL_PDF_CACHE_MAX
+except Exception:
+    LABEL_PDF_CACHE_DIR = None
+    LABEL_PDF_CACHE_MAX = 200
+
+try:
+    from config import LABEL_PREVIEW_DPI, LABEL_PREVIEW_CACHE_MAX, LABEL_PREVIEW_FONT_PATH
+except Exception:
+    LABEL_PREVIEW_DPI = 200
+    LABEL_PREVIEW_CACHE_MAX = 1000
+    LABEL_PREVIEW_FONT_PATH = None
+
+# 版式参数（任一变化即生成新的缓存键）；改动字号规则等渲染逻辑时请 +1 version
+LAYOUT_PROFILE = {
+    "version": 1,
+    "paper": "A4", "cols": COLS, "rows": ROWS,
+    "margin_l": MARGIN_L_MM, "margin_t": MARGIN_T_MM,
+    "label_w": LABEL_W_MM, "label_h": LABEL_H_MM, "gap_x": GAP_X_MM, "gap_y": GAP_Y_MM,
+    "font": BASE_FONT,
+}
+
+
+class LabelLayout:
+    def __init__(self, placed, by_page):
+        self.placed = placed
+        self.by_page = by_page
+
+    @property
+    def pages(self) -> int:
+        return len(self.by_page)
+
+
+def parse_label_request(data: dict):
+    """
+    解析前端参数：codes / startIndex / skipIndices
+    返回 (codes, start_index, skip_indices)；codes 不合法时抛 ValueError
+    """
+    codes = data.get("codes")
+    if not isinstance(codes, list) or not all(isinstance(x, str) for x in codes) or len(codes) == 0:
+        raise ValueError("codes must be a non-empty list of strings")
+
+    try:
+        start_index = int(data.get("startIndex", 0))
+    except Exception:
+        start_index = 0
+    start_index = max(0, start_index)
+
+    skip_set = set()
+    skip_indices = data.get("skipIndices", [])
+    if isinstance(skip_indices, list):
+        for x in skip_indices:
+            try:
+                ix = int(x)
+                if ix >= 0:
+                    skip_set.add(ix)
+            except Exception:
+                pass
+    return codes, start_index, skip_set
+
+
+def place_labels(codes, start_index: int = 0, skip_indices=()) -> LabelLayout:
+    """依次放入编号（跳过 skip 格子），同时按页分桶"""
+    skip_set = skip_indices if isinstance(skip_indices, (set, frozenset)) else set(skip_indices)
+    placed = []
+    idx = start_index
+    for code in codes:
+        while idx in skip_set:
+            idx += 1
+        placed.append((idx, code))
+        idx += 1
+
+    max_idx = placed[-1][0] if placed else 0
+    by_page = [[] for _ in range(max_idx // PER_PAGE + 1)]
+    for cell_index, code in placed:
+        p, in_page = divmod(cell_index, PER_PAGE)
+        r, col = divmod(in_page, COLS)
+        by_page[p].append((r, col, code))
+    return LabelLayout(placed, by_page)
+
+
+def font_size_for(code) -> int:
+    """编号末段位数越多字号越小：≥4 位 6pt，3 位 7pt，其余 8pt"""
+    num_part = str(code).split("_")[-1]
+    if num_part.isdigit() and len(num_part) >= 4:
+        return 6
+    if num_part.isdigit() and len(num_part) >= 3:
+        return 7
+    return 8
+
+
+def label_box_mm(r: int, col: int):
+    """格子左上角坐标与尺寸（mm，原点在纸张左上角）"""
+    x = MARGIN_L_MM + col * (LABEL_W_MM + GAP_X_MM)
+    y = MARGIN_T_MM + r * (LABEL_H_MM + GAP_Y_MM)
+    return x, y, LABEL_W_MM, LABEL_H_MM
+
+
+def render_labels_pdf(layout: LabelLayout) -> bytes:
+    """按版式生成标签 PDF（A4，每页 PER_PAGE 格，编号居中）"""
+    page_w, page_h = A4  # points
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    c.setTitle("labels")
+
+    for labels in layout.by_page:
+        for r, col, code in labels:
+            x_mm, y_mm, w_mm, h_mm = label_box_mm(r, col)
+            x = x_mm * mm
+            y = page_h - (y_mm + h_mm) * mm  # ReportLab 原点在左下角
+            size = font_size_for(code)
+            c.setFont(BASE_FONT, size)
+            c.drawCentredString(x + w_mm * mm / 2, y + h_mm * mm / 2 - (size * 0.35), str(code))
+        c.showPage()
+
+    c.save()
+    return buf.getvalue()
+
+
+# =============================== 预览图（PNG） ===============================
+# PDFium 不是线程安全的：同一进程内的栅格化串行执行
+_PDFIUM_LOCK = threading.Lock()
+
+# 近似重绘（未装 pypdfium2）时依次尝试的字体：只收与 Helvetica 字宽相同的，找不到就报错而不是换成别的字体
+_PREVIEW_FONT_FALLBACKS = (
+    "arial.ttf", "Arial.ttf",
+    "LiberationSans-Regular.ttf", "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation2/LiberationSans-Regular.ttf",
+    "Arimo-Regular.ttf", "/usr/share/fonts/truetype/croscore/Arimo-Regular.ttf",
+    "NimbusSans-Regular.otf", "/usr/share/fonts/opentype/urw-base35/NimbusSans-Regular.otf",
+)
+
+
+@lru_cache(maxsize=8)
+def _preview_font(px: int):
+    for path in (LABEL_PREVIEW_FONT_PATH,) + _PREVIEW_FONT_FALLBACKS:
+        if not path:
+            continue
+        try:
+            return ImageFont.truetype(path, px)
+        except OSError:
+            continue
+    raise RuntimeError("无法生成标签预览：请安装 pypdfium2（pip install pypdfium2），"
+                       "或在 config.LABEL_PREVIEW_FONT_PATH 指定 Arial / Liberation Sans 字体")
+
+
+def rasterize_pdf_page(pdf_bytes: bytes, page: int, dpi: int = LABEL_PREVIEW_DPI):
+    """用 PDFium 把 PDF 第 page 页（从 0 开始）栅格化成灰度 PNG；页码超出范围返回 None"""
+    with _PDFIUM_LOCK:
+        doc = pdfium.PdfDocument(pdf_bytes)
+        try:
+            if not 0 <= page < len(doc):
+                return None
+            pg = doc[page]
+            try:
+                img = pg.render(scale=dpi / 72.0, grayscale=True).to_pil()
+            finally:
+                pg.close()
+        finally:
+            doc.close()
+    buf = BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def render_label_page_png(layout: LabelLayout, page: int, dpi: int = LABEL_PREVIEW_DPI) -> bytes:
+    """
+    近似预览（未安装 pypdfium2 时的退路）：用 PIL 按 render_labels_pdf 的坐标/字号重绘第 page 页（从 0 开始）。
+    位置与字号一致，但字形由 _preview_font 的字体决定，与 PDF 里的 Helvetica 只是字宽相同、并非同一字体。
+    （不画格子线，打印出来也没有；格子由前端叠加）
+    """
+    if Image is None:
+        raise RuntimeError("未安装 Pillow，无法生成预览图")
+    page_w, page_h = A4  # points
+    px_per_pt = dpi / 72.0
+    img = Image.new("L", (round(page_w * px_per_pt), round(page_h * px_per_pt)), 255)
+    draw = ImageDraw.Draw(img)
+
+    for r, col, code in layout.by_page[page]:
+        x_mm, y_mm, w_mm, h_mm = label_box_mm(r, col)
+        size = font_size_for(code)
+        # 与 PDF 相同的基线：格子垂直中线向下 0.35×字号
+        cx = (x_mm + w_mm / 2) * mm * px_per_pt
+        baseline = ((y_mm + h_mm / 2) * mm + size * 0.35) * px_per_pt
+        draw.text((cx, baseline), str(code), fill=0, font=_preview_font(round(size * px_per_pt)), anchor="ms")
+
+    buf = BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+# =============================== 标签 PDF 缓存 ===============================
+def labels_cache_key(codes, start_index: int, skip_indices) -> str:
+    payload = {
+        "codes": list(codes),
+        "start": int(start_index),
+        "skip": sorted(int(x) for x in skip_indices),
+        "layout": LAYOUT_PROFILE,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _cache_path(name: str):
+    if not LABEL_PDF_CACHE_DIR:
+        return None
+    return os.path.join(LABEL_PDF_CACHE_DIR, name)
+
+
+def _prune_cache(pattern: str, keep: int):
+    """同类缓存文件只保留最近使用的 keep 个"""
+    try:
+        files = sorted(glob.glob(os.path.join(glob.escape(LABEL_PDF_CACHE_DIR), pattern)),
+                       key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for old in files[keep:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def _read_cache(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # 刷新 mtime，淘汰时按最近使用
+        return data
+    except OSError:
+        return None
+
+
+def _write_cache(path, data: bytes, pattern: str, keep: int):
+    if not path:
+        return
+    tmp = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        os.makedirs(LABEL_PDF_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        _prune_cache(pattern, keep)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def cached_labels_pdf(codes, start_index: int = 0, skip_indices=()):
+    """
+    返回 (缓存键, PDF 字节)：命中磁盘缓存直接读取，否则排版渲染后写入缓存。
+    缓存目录不可用时照常渲染，只是不缓存。
+    """
+    key = labels_cache_key(codes, start_index, skip_indices)
+    path = _cache_path(f"{key}.pdf")
+    data = _read_cache(path)
+    if data is None:
+        data = render_labels_pdf(place_labels(codes, start_index, skip_indices))
+        _write_cache(path, data, "*.pdf", LABEL_PDF_CACHE_MAX)
+    return key, data
+
+
+def cached_label_page_png(codes, start_index: int, skip_indices, page: int, dpi: int = LABEL_PREVIEW_DPI):
+    """
+    返回 (缓存键, PNG 字节)；page 从 0 开始，超出总页数返回 None。
+    - 装了 pypdfium2：栅格化 cached_labels_pdf 的那份打印 PDF（预览即打印结果）
+    - 否则：render_label_page_png 近似重绘
+    缓存键 = 整份标签的键 + 页码 + DPI + 渲染方式，同一份标签的各页各自缓存、按需生成。
+    """
+    renderer = "pdf" if pdfium is not None else "pil"
+    key = f"{labels_cache_key(codes, start_index, skip_indices)}_p{int(page)}_{int(dpi)}_{renderer}"
+    path = _cache_path(f"{key}.png")
+    data = _read_cache(path)
+    if data is None:
+        layout = place_labels(codes, start_index, skip_indices)
+        if not 0 <= page < layout.pages:
+            return None
+        if pdfium is not None:
+            _pdf_key, pdf_bytes = cached_labels_pdf(codes, start_index, skip_indices)
+            data = rasterize_pdf_page(pdf_bytes, page, dpi)
+        else:
+            data = render_label_page_png(layout, page, dpi)
+        _write_cache(path, data, "*.png", LABEL_PREVIEW_CACHE_MAX)
+    return key, data
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+web 路径 ↔ 磁盘路径
+- /files/system/... 映射到 SYSTEM_IMAGE_ROOT（网络盘），带路径穿越校验
+- 其它历史路径（/static/uploads/...）按项目根目录拼接
+- 只依赖 config，脚本（backfill_placeholders / warm_thumbnails）可直接导入，不会连带构建 app
+
+用法：
+    from paths import abs_path_from_web, safe_join_system_root
+    full = abs_path_from_web("/files/system/2024/2408/240824_A/xxx.jpg?v=1")
+"""
+import os
+from urllib.parse import urlsplit
+
+from config import SYSTEM_IMAGE_ROOT
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def safe_join_system_root(subpath: str) -> str:
+    """
+    将 web 子路径安全拼接到 SYSTEM_IMAGE_ROOT，防止路径穿越。
+    例如 subpath = "2024/2408/240824_A/250824_A_1.jpg"
+    """
+    subpath = (subpath or "").replace("\\", "/").lstrip("/")
+    parts = [p for p in subpath.split("/") if p not in ("", ".", "..")]
+    full = os.path.join(SYSTEM_IMAGE_ROOT, *parts)
+    # 安全校验：确保仍在 SYSTEM_IMAGE_ROOT 内
+    root_norm = os.path.abspath(SYSTEM_IMAGE_ROOT)
+    full_norm = os.path.abspath(full)
+    if not full_norm.startswith(root_norm):
+        raise ValueError("非法路径")
+    return full
+
+
+def abs_path_from_web(rel: str) -> str:
+    """
+    将前端保存的“web 路径”转为真实磁盘路径。
+    支持两类：
+      1) /files/system/...   → 映射到 SYSTEM_IMAGE_ROOT（网络盘）
+      2) 其它（/static/...） → 仍按项目根目录拼接
+    """
+    r = (rel or "")
+    # 去掉 query/hash（例如 ?v=xxx 的防缓存参数）
+    parsed = urlsplit(r)
+    r = parsed.path or r
+
+    r = r.replace("\\", "/")
+
+    # 绝对 URL 或 data: 不处理为本地文件，原样返回，调用方自行跳过
+    if r.startswith("http://") or r.startswith("https://") or r.startswith("data:"):
+        return r
+
+    # /files/system/... → SYSTEM_IMAGE_ROOT 下的真实文件
+    if r.startswith("/files/system/") or r.startswith("files/system/"):
+        # 截出 /files/system/ 之后的相对部分
+        sub = r.split("/files/system/", 1)[-1] if "/files/system/" in r else r.split("files/system/", 1)[-1]
+        return safe_join_system_root(sub)
+
+    # 默认：按项目根目录拼接（兼容 /static/uploads/... 等历史路径）
+    rel2 = r.lstrip("/").replace("/", os.sep)
+    return os.path.join(BASE_DIR, rel2)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+标签打印队列（print spooler）
+- 请求线程只负责生成 PDF、登记任务，立即返回 job_id；专用工作线程依次把 PDF 送打印机
+- 任务状态记录在 print_jobs 表：queued → printing → done / failed
+- 打印命令失败时按 PRINT_RETRY_DELAY 秒后重试，最多 PRINT_MAX_ATTEMPTS 次
+- 打印方式可替换：默认执行 config.PRINT_COMMAND（SumatraPDF 静默打印），
+  测试时可改成本地桩命令，或直接 print_spooler.printer = 自定义函数(pdf_path)
+- 领取任务用条件 UPDATE（status='queued' 才改成 printing），同一台机器上多个进程都在跑队列时
+  同一任务只会被一个进程打印
+- 服务重启：本机排队中的任务继续打印；“打印中”且超过 stale_after 秒没有更新的任务状态未知，
+  标记为失败（避免重复出纸）；未超时的可能正由本机其它进程打印，不动它
+
+用法：
+    from print_spooler import print_spooler
+    job_id = print_spooler.submit(pdf_bytes, title="labels")
+    info = print_spooler.get(job_id)
+"""
+import os
+import queue
+import socket
+import subprocess
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from create_database import get_session, PrintJob
+
+try:
+    from config import PRINT_COMMAND, PRINT_TIMEOUT, PRINT_MAX_ATTEMPTS, PRINT_RETRY_DELAY, PRINT_SPOOL_DIR
+except Exception:
+    PRINT_COMMAND = None
+    PRINT_TIMEOUT = 120
+    PRINT_MAX_ATTEMPTS = 3
+    PRINT_RETRY_DELAY = 5
+    PRINT_SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports", "_print_tmp")
+
+
+class CommandPrinter:
+    """执行命令行打印：命令模板中的 {pdf} 替换为 PDF 路径；非 0 退出码视为失败"""
+
+    def __init__(self, command, timeout: float = 120):
+        self.command = list(command or [])
+        self.timeout = timeout
+
+    def __call__(self, pdf_path: str):
+        if not self.command:
+            raise RuntimeError("未配置打印命令（config.PRINT_COMMAND）")
+        cmd = [part.replace("{pdf}", pdf_path) for part in self.command]
+        subprocess.run(cmd, check=True, timeout=self.timeout)
+
+
+class PrintSpooler:
+    def __init__(self, printer, spool_dir: str, max_attempts: int = 3, retry_delay: float = 5,
+                 stale_after: float = 600):
+        self.printer = printer
+        self.spool_dir = spool_dir
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after  # “打印中”超过这么久没更新，视为进程已退出
+        self.host = socket.gethostname()
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = False
+
+    # ---------- 启动 ----------
+    def start(self):
+        """建表（如缺失）、恢复本机未完成任务并启动工作线程；重复调用无副作用"""
+        with self._lock:
+            if self._ready:
+                self._ensure_thread()
+                return
+            session = get_session()
+            try:
+                PrintJob.__table__.create(bind=session.get_bind(), checkfirst=True)
+                jobs = (
+                    session.query(PrintJob)
+                    .filter(PrintJob.host == self.host, PrintJob.status.in_(("queued", "printing")))
+                    .order_by(PrintJob.created_at)
+                    .all()
+                )
+                requeue = []
+                stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after)
+                for job in jobs:
+                    if job.status == "printing":
+                        if job.updated_at and job.updated_at > stale_before:
+                            continue  # 可能正由本机其它进程打印
+                        job.status = "failed"
+                        job.error = "服务重启时正在打印，结果未知；请确认出纸后再决定是否重新打印"
+                        job.finished_at = datetime.utcnow()
+                        _remove_quietly(job.pdf_path)
+                    else:
+                        requeue.append(job.job_id)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            for jid in requeue:
+                self._q.put(jid)
+            self._ready = True
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="print-spooler", daemon=True)
+            self._thread.start()
+
+    # ---------- 提交 / 查询 ----------
+    def submit(self, pdf_bytes: bytes, title: str = "labels") -> str:
+        """保存 PDF 并登记任务，返回 job_id（写盘失败抛 OSError）"""
+        self.start()
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.spool_dir, exist_ok=True)
+        pdf_path = os.path.join(self.spool_dir, f"labels_{job_id}.pdf")
+        # 必须 close 文件句柄后再交给打印程序，否则 Sumatra 在 Windows 下可能读不到
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_bytes)
+        if os.path.getsize(pdf_path) <= 0:
+            raise OSError(f"pdf write failed: {pdf_path}")
+
+        session = get_session()
+        try:
+            now = datetime.utcnow()
+            session.add(PrintJob(
+                job_id=job_id, title=title, status="queued", pdf_path=pdf_path, attempts=0,
+                max_attempts=self.max_attempts, host=self.host, created_at=now, updated_at=now,
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            _remove_quietly(pdf_path)
+            raise
+        finally:
+            session.close()
+
+        self._q.put(job_id)
+        return job_id
+
+    def get(self, job_id: str):
+        self.start()
+        session = get_session()
+        try:
+            job = session.get(PrintJob, job_id)
+            if job is None:
+                return None
+            return {
+                "job_id": job.job_id,
+                "title": job.title,
+                "status": job.status,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "error": job.error,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            }
+        finally:
+            session.close()
+
+    # ---------- 执行 ----------
+    def _update(self, job_id: str, **fields):
+        session = get_session()
+        try:
+            job = session.get(PrintJob, job_id)
+            if job is None:
+                return None
+            for k, v in fields.items():
+                setattr(job, k, v)
+            job.updated_at = datetime.utcnow()
+            session.commit()
+            return job.pdf_path, job.attempts, job.max_attempts
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _loop(self):
+        while True:
+            job_id = self._q.get()
+            try:
+                self._print_one(job_id)
+            except Exception as e:
+                print("打印队列异常:", e)
+
+    def _claim(self, job_id: str):
+        """
+        原子领取：UPDATE ... SET status='printing', attempts=attempts+1 WHERE status='queued'
+        更新到 1 行才算领到（多进程同时取到同一任务时只有一个成功）；返回 (pdf_path, attempts, max_attempts) 或 None
+        """
+        session = get_session()
+        try:
+            t = PrintJob.__table__
+            res = session.execute(
+                update(t)
+                .where(t.c.job_id == job_id, t.c.status == "queued")
+                .values(status="printing", attempts=t.c.attempts + 1, updated_at=datetime.utcnow())
+            )
+            if res.rowcount != 1:
+                session.rollback()
+                return None
+            job = session.get(PrintJob, job_id)
+            claimed = (job.pdf_path, job.attempts, job.max_attempts)
+            session.commit()
+            return claimed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _print_one(self, job_id: str):
+        # 首次与重试（失败后改回 queued 再入队）都从这里领取
+        claimed = self._claim(job_id)
+        if claimed is None:
+            return
+        pdf_path, attempts, max_attempts = claimed
+        try:
+            self.printer(pdf_path)
+        except Exception as e:
+            if attempts < max_attempts:
+                self._update(job_id, status="queued", error=f"第 {attempts} 次打印失败：{e}")
+                timer = threading.Timer(self.retry_delay, self._q.put, args=(job_id,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._update(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+                _remove_quietly(pdf_path)
+            return
+
+        self._update(job_id, status="done", error=None, finished_at=datetime.utcnow())
+        _remove_quietly(pdf_path)
+
+
+def _remove_quietly(path):
+    """打印后清理临时文件（如果被占用就留着，不影响下一次）"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+print_spooler = PrintSpooler(
+    CommandPrinter(PRINT_COMMAND, PRINT_TIMEOUT), PRINT_SPOOL_DIR, PRINT_MAX_ATTEMPTS, PRINT_RETRY_DELAY,
+    stale_after=max(600, PRINT_TIMEOUT * 2),
+)
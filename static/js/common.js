@@ -56,6 +56,19 @@
     return !!(cb && cb.checked);
   }
 
+  // —— 缩略图地址：/files/system/... → /thumb/system/<size>/...（其它地址原样返回） ——
+  function thumbUrl(src, size){
+    const m = String(src || '').match(/^(https?:\/\/[^/]+)?\/files\/system\/(.+)$/);
+    if (!m) return src;
+    return (m[1] || '') + '/thumb/system/' + (size || 200) + '/' + m[2];
+  }
+
+  // —— 占位图：先用 LQIP 作为背景画出来，真实缩略图懒加载后覆盖 ——
+  function lqipStyle(lqip){
+    if (!lqip) return '';
+    return `style="background:url('${lqip}') center / cover no-repeat"`;
+  }
+
   // —— 字典加载（带缓存） ——
   const Dict = {
     _cat: null, _acc: null, _boxes: null, _boxSet: new Set(),
@@ -298,8 +311,31 @@ const Material = (function(){
 })();
 
 
+  // —— 保存冲突（409，row_version 不一致）：比较两份同形状的扁平值，返回不同的字段；字段中文名 ——
+  const ITEM_FIELD_LABELS = {
+    item_name:'名称', item_size:'尺寸', item_location:'位置', item_box_code:'箱号', item_category:'种类',
+    item_image:'图片', item_material:'材质', starting_price:'起拍价', reserve_price:'底价', item_status:'状态',
+    item_notes:'备注', item_author:'作者', accessories:'附属品', __accessories:'附属品'
+  };
+  function conflictFields(base, current){
+    return Object.keys(base||{}).filter(k => String(base[k] ?? '') !== String((current||{})[k] ?? ''));
+  }
+  function fieldLabels(keys){
+    return (keys||[]).map(k => ITEM_FIELD_LABELS[k] || k).join('、');
+  }
+  // 409 返回的 current（物品最新值）→ 与表格 data-init 同样的文本；current 里没有的字段返回 null
+  function conflictFieldText(cur, field){
+    if (field === '__accessories') return (cur.accessories||[]).join(',');
+    if (!Object.prototype.hasOwnProperty.call(cur, field)) return null;
+    const v = cur[field];
+    if (v == null) return '';
+    if (field === 'starting_price' || field === 'reserve_price') return String(v).replace(/\.0+$/,'');
+    return String(v).trim();
+  }
+
   // 导出
-  global.AU = { showToast, getJSON, sendJSON, checkPricePair, renameFileKeepExt, isHoverEnabled, Dict, Material };
+  global.AU = { showToast, getJSON, sendJSON, checkPricePair, renameFileKeepExt, isHoverEnabled, thumbUrl, lqipStyle, Dict, Material,
+                conflictFields, fieldLabels, conflictFieldText };
 })(window);
 
 (function(){
@@ -415,6 +451,7 @@ const Material = (function(){
 
     if(!hasMulti){
       currentPage = 0;
+      renderCurrentPage();
       return;
     }
 
@@ -423,12 +460,8 @@ const Material = (function(){
     if(navPrev) navPrev.disabled = (currentPage <= 0);
     if(navNext) navNext.disabled = (currentPage >= state.pages - 1);
 
-    // 只显示当前页
-    const papers = elPages.querySelectorAll(".paper");
-    papers.forEach(p => {
-      const pno = parseInt(p.dataset.page || "0", 10);
-      p.style.display = (pno === currentPage) ? "block" : "none";
-    });
+    // 只构建当前页（预览图也只请求这一页）
+    renderCurrentPage();
 
     // 切页后重新适配（避免高度变化/滚动影响）
     applyPaperScale();
@@ -475,7 +508,6 @@ const Material = (function(){
   let state = {
     startIndex: null,
     skipIndices: new Set(),
-    placedMap: new Map(),
     pages: 1,
     lastClickedIndex: null,
   };
@@ -499,7 +531,8 @@ function getPayload(){
     const r = await fetch(`${apiBase}/preview`, {
       method:"POST",
       headers:{"Content-Type":"application/json"},
-      body:JSON.stringify(payload),
+      // 编号由服务端预览图显示，这里只要页数
+      body:JSON.stringify({ ...payload, withPlaced: false }),
       cache:"no-store"
     });
     if(!r.ok){ throw new Error("preview failed"); }
@@ -517,15 +550,23 @@ function getPayload(){
 
   function applyPreviewResult(res){
     state.pages = res.pages || 1;
-    state.placedMap.clear();
+  }
 
-    const placed = res.placed || [];
-    for(let i=0;i<placed.length;i++){
-      state.placedMap.set(placed[i].index, placed[i].code);
-    }
+  // 服务端按打印版式栅格化的单页预览图（页码从 1 开始；同样的参数命中服务端缓存/浏览器 304）
+  function previewImageUrl(p){
+    const qs = new URLSearchParams({
+      startIndex: String(state.startIndex == null ? 0 : state.startIndex),
+      skipIndices: Array.from(state.skipIndices).sort((a, b) => a - b).join(","),
+    });
+    return `${apiBase}/label_preview/${encodeURIComponent(cfg.token)}/page/${p + 1}.png?${qs}`;
+  }
+
+  function renderCurrentPage(){
+    buildPage(currentPage);
+    paintCells();
   }
 
-  function buildPages(){
+  function buildPage(p){
     elPages.innerHTML = "";
 
     const marginL = mmToPx(cfg.marginL);
@@ -539,73 +580,64 @@ function getPayload(){
     const colLabelY = Math.max(4, marginT * 0.35);
     const rowLabelX = Math.max(4, marginL * 0.25);
 
-    for(let p=0;p<state.pages;p++){
-      const paper = document.createElement("div");
-      paper.className = "paper";
-      paper.dataset.page = String(p);
+    const paper = document.createElement("div");
+    paper.className = "paper";
+    paper.dataset.page = String(p);
+
+    // 选好起点后，编号由预览图显示（与打印结果一致）；格子只负责点击与跳过/起点标记
+    if(state.startIndex != null){
+      paper.classList.add("rendered");
+      const img = document.createElement("img");
+      img.className = "paper-img";
+      img.alt = "";
+      img.draggable = false;
+      img.src = previewImageUrl(p);
+      paper.appendChild(img);
+    }
 
-      for(let c=0;c<COLS;c++){
-        const colTag = document.createElement("div");
-        colTag.className = "col-label";
-        const cx = marginL + c * (labelW + gapX) + labelW / 2;
-        colTag.style.left = `${cx}px`;
-        colTag.style.top = `${colLabelY}px`;
-        colTag.textContent = String(c + 1);
-        paper.appendChild(colTag);
-      }
+    for(let c=0;c<COLS;c++){
+      const colTag = document.createElement("div");
+      colTag.className = "col-label";
+      const cx = marginL + c * (labelW + gapX) + labelW / 2;
+      colTag.style.left = `${cx}px`;
+      colTag.style.top = `${colLabelY}px`;
+      colTag.textContent = String(c + 1);
+      paper.appendChild(colTag);
+    }
 
-      for(let r=0;r<ROWS;r++){
-        const rowTag = document.createElement("div");
-        rowTag.className = "row-label";
-        const cy = marginT + r * (labelH + gapY) + labelH / 2;
-        rowTag.style.left = `${rowLabelX}px`;
-        rowTag.style.top = `${cy}px`;
-        rowTag.textContent = String(r + 1);
-        paper.appendChild(rowTag);
-      }
+    for(let r=0;r<ROWS;r++){
+      const rowTag = document.createElement("div");
+      rowTag.className = "row-label";
+      const cy = marginT + r * (labelH + gapY) + labelH / 2;
+      rowTag.style.left = `${rowLabelX}px`;
+      rowTag.style.top = `${cy}px`;
+      rowTag.textContent = String(r + 1);
+      paper.appendChild(rowTag);
+    }
 
-      for(let r=0;r<ROWS;r++){
-        for(let c=0;c<COLS;c++){
-          const idx = rowMajorIndex(p, r, c);
+    for(let r=0;r<ROWS;r++){
+      for(let c=0;c<COLS;c++){
+        const idx = rowMajorIndex(p, r, c);
 
-          const cell = document.createElement("div");
-          cell.className = "cell";
-          cell.dataset.index = String(idx);
+        const cell = document.createElement("div");
+        cell.className = "cell";
+        cell.dataset.index = String(idx);
 
-          const left = marginL + c * (labelW + gapX);
-          const top = marginT + r * (labelH + gapY);
+        const left = marginL + c * (labelW + gapX);
+        const top = marginT + r * (labelH + gapY);
 
-          cell.style.left = `${left}px`;
-          cell.style.top = `${top}px`;
-          cell.style.width = `${labelW}px`;
-          cell.style.height = `${labelH}px`;
-          cell.style.borderRadius = `${radiusPx}px`;
+        cell.style.left = `${left}px`;
+        cell.style.top = `${top}px`;
+        cell.style.width = `${labelW}px`;
+        cell.style.height = `${labelH}px`;
+        cell.style.borderRadius = `${radiusPx}px`;
 
-          cell.addEventListener("click", (ev) => onCellClick(ev, idx));
-          paper.appendChild(cell);
-        }
+        cell.addEventListener("click", (ev) => onCellClick(ev, idx));
+        paper.appendChild(cell);
       }
-
-      elPages.appendChild(paper);
-    }
-  }
-
-  function addCodeToCell(cell, code){
-    const span = document.createElement("div");
-    span.className = "code";
-    span.textContent = code;
-
-    const numPart = String(code).split("_").slice(-1)[0];
-    const digits = /^\d+$/.test(numPart) ? numPart.length : 0;
-
-    cell.classList.remove("d3","d4");
-    if(digits >= 4){
-      cell.classList.add("d4");
-    }else if(digits >= 3){
-      cell.classList.add("d3");
     }
 
-    cell.appendChild(span);
+    elPages.appendChild(paper);
   }
 
   function paintCells(){
@@ -613,7 +645,7 @@ function getPayload(){
     cells.forEach(cell => {
       const idx = parseInt(cell.dataset.index, 10);
 
-      cell.classList.remove("occupied","skipped","start","d3","d4");
+      cell.classList.remove("skipped","start");
       cell.innerHTML = "";
 
       if(state.skipIndices.has(idx)){
@@ -624,12 +656,6 @@ function getPayload(){
         cell.appendChild(x);
       }
 
-      const code = state.placedMap.get(idx);
-      if(code){
-        cell.classList.add("occupied");
-        addCodeToCell(cell, code);
-      }
-
       if(state.startIndex === idx){
         cell.classList.add("start");
       }
@@ -682,11 +708,8 @@ function getPayload(){
 
   async function refreshPreview(){
     if(state.startIndex == null){
-      state.placedMap.clear();
       state.pages = 1;
       currentPage = 0;
-      buildPages();
-      paintCells();
       setStartHint();
       syncNavUI();
       return;
@@ -694,8 +717,6 @@ function getPayload(){
 
     const res = await apiPreview();
     applyPreviewResult(res);
-    buildPages();
-    paintCells();
     setStartHint();
 
     // 刷新后保持在“最后操作页”，避免在第2页打X后跳回第1页
@@ -709,14 +730,11 @@ function getPayload(){
     btnResetStart.addEventListener("click", () => {
       state.startIndex = null;
       state.lastClickedIndex = null;
-      state.placedMap.clear();
       state.pages = 1;
       currentPage = 0;
       lastActionPage = 0;
       userZoom = 1;
 
-      buildPages();
-      paintCells();
       setStartHint();
       syncNavUI();
     });
@@ -755,6 +773,20 @@ function getPayload(){
   }
 
 
+// 轮询打印任务（最多约 60 秒；超时按“仍在排队”处理）
+async function waitPrintJob(jobId){
+  if(!jobId) return { status: "done" };
+  for(let i = 0; i < 60; i++){
+    await new Promise(res => setTimeout(res, 1000));
+    try{
+      const r = await fetch(`${apiBase}/print_jobs/${encodeURIComponent(jobId)}`, { cache: "no-store" });
+      const job = await r.json();
+      if(job && (job.status === "done" || job.status === "failed")) return job;
+    }catch(e){ /* 网络抖动：继续轮询 */ }
+  }
+  return { status: "queued" };
+}
+
 if(btnPrintDirect){
   btnPrintDirect.addEventListener("click", async () => {
     if(state.startIndex == null){
@@ -782,7 +814,15 @@ if(btnPrintDirect){
         return;
       }
 
-      // 成功：弹窗提示放纸 + 只允许关闭页面，避免多次触发打印
+      // 已进入打印队列：轮询任务状态，直到打印完成或失败
+      const job = await waitPrintJob(data.job_id);
+      if(job.status === "failed"){
+        btnPrintDirect.disabled = false;
+        alert("打印失败：" + (job.error || "未知错误"));
+        return;
+      }
+
+      // 成功（或仍在排队，稍后自动打印）：弹窗提示放纸 + 只允许关闭页面，避免多次触发打印
       openAfterPrintModal();
 
     }catch(e){
@@ -902,8 +942,6 @@ loadCodesDemo().then((ok) => {
 
   // 初次仅1页
   applyPaperScale();
-  buildPages();
-  paintCells();
   setStartHint();
   syncNavUI();
   });
@@ -5,6 +5,7 @@
 // 功能：浮窗预览、拖动、滚轮缩放、抓手平移、位置记忆、开关记忆。
 // 依赖：页面中需要有 #img-preview 结构，同 batch_edit 中 DOM。
 // 用法：页面渲染完成后调用 bindPreview(); 悬停或逻辑中调用 showPreview(url)。
+// 悬停浮窗显示 /preview/system/... 中图（服务端缓存）；原图只在点击“打开图片”时加载。
 
 (function(global){
   const PREVIEW_POS_KEY = "imgPreviewPos";
@@ -27,11 +28,18 @@
 
   function resetTransform(){ previewZoom = 1; panX = 0; panY = 0; applyTransform(); }
 
+  // /files/system/... 原图地址 → /preview/system/... 中图地址（保留 ?t= 等防缓存参数）
+  function previewUrlFor(src){
+    const m = String(src || '').match(/^(https?:\/\/[^/]+)?\/files\/system\/(.+)$/);
+    if (!m) return src;
+    return (m[1] || '') + '/preview/system/' + m[2];
+  }
+
   function showPreview(src){
     if (!isHoverEnabled()) return;
     if (!panel) return;
     resetTransform();
-    imgEl.src = src;
+    imgEl.src = previewUrlFor(src);
     if (aOpen) aOpen.href = src;
     panel.style.display='block';
   }
@@ -146,4 +154,5 @@
   // 导出到全局供模板使用
   global.bindPreview = bindPreview;
   global.showPreview  = showPreview;
+  global.previewUrlFor = previewUrlFor;
 })(window);
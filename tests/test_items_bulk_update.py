@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+/api/items/bulk-update：同一 item_code 出现多行时按顺序逐字段合并
+
+运行：
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import create_database as cd  # noqa: E402
+from db_profile import make_sqlite_engine  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """临时 SQLite 库 + 一件物品（X_1），读写 / 只读会话都指向它"""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = make_sqlite_engine(url)
+    readonly_engine = make_sqlite_engine(url, readonly=True)
+    cd.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(cd, "engine", engine)
+    monkeypatch.setitem(cd.SessionLocal.kw, "bind", engine)
+    monkeypatch.setitem(cd.ReadOnlySessionLocal.kw, "bind", readonly_engine)
+
+    session = cd.SessionLocal()
+    session.add(cd.Item(item_code="X_1", item_name="旧名", item_location="旧位置"))
+    session.commit()
+    session.close()
+
+    import app as app_module
+    yield app_module.create_app().test_client()
+    engine.dispose()
+    readonly_engine.dispose()
+
+
+def _item(code):
+    session = cd.SessionLocal()
+    try:
+        return session.get(cd.Item, code)
+    finally:
+        session.close()
+
+
+def test_duplicate_rows_keep_fields_from_every_row(client):
+    r = client.post("/api/items/bulk-update", json={"items": [
+        {"item_code": "X_1", "starting_price": 10},
+        {"item_code": "X_1", "item_location": "A架"},
+    ]})
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["row_versions"] == {"X_1": 2}
+
+    it = _item("X_1")
+    assert int(it.starting_price) == 10
+    assert it.item_location == "A架"
+    assert it.item_name == "旧名"
+    assert it.row_version == 2
+
+
+def test_duplicate_rows_later_field_wins(client):
+    r = client.post("/api/items/bulk-update", json={"items": [
+        {"item_code": "X_1", "item_name": "第一次", "starting_price": 50},
+        {"item_code": "X_1", "item_name": "第二次", "reserve_price": 100},
+    ]})
+    assert r.status_code == 200, r.get_json()
+
+    it = _item("X_1")
+    assert it.item_name == "第二次"
+    assert (int(it.starting_price), int(it.reserve_price)) == (50, 100)
+
+
+def test_duplicate_rows_validate_merged_prices(client):
+    r = client.post("/api/items/bulk-update", json={"items": [
+        {"item_code": "X_1", "starting_price": 200},
+        {"item_code": "X_1", "reserve_price": 100},
+    ]})
+    assert r.status_code == 400
+    assert _item("X_1").starting_price is None
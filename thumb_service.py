@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+缩略图 / 预览图生成服务
+- 固定大小的工作线程池：同时解码的图片数不超过 THUMB_WORKERS
+- 同键合并（single-flight）：同一张图同一尺寸正在生成时，后来的请求等待同一个结果
+- 排队上限：进行中 + 排队中的任务数达到 THUMB_MAX_PENDING 时抛 ThumbBusy，
+  由调用方回退原图 / 占位图，而不是继续堆积解码任务
+- 已有缓存的请求不进线程池，直接返回
+- 后台预热（warm）：单独一个低优先级线程，前台有生成任务时主动让路；
+  打开批次时把整批缩略图排进来，首个用户看到的就是缓存。
+  预热同样经 submit 进线程池，与前台请求共用同键合并，不会重复解码同一张图
+
+用法：
+    from thumb_service import thumb_service, ThumbBusy
+    try:
+        path = thumb_service.get(full, "thumb", 120, quality=80)
+    except ThumbBusy:
+        ...
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from image_cache import cached_derivative, render_derivative, snap_size
+
+try:
+    from config import THUMB_WORKERS, THUMB_MAX_PENDING, THUMB_WAIT_SECONDS
+except Exception:
+    THUMB_WORKERS = 2
+    THUMB_MAX_PENDING = 48
+    THUMB_WAIT_SECONDS = 30
+
+try:
+    from config import THUMB_WARM_MAX_QUEUE
+except Exception:
+    THUMB_WARM_MAX_QUEUE = 2000
+
+WARM_YIELD_SECONDS = 5  # 前台繁忙时，预热任务最多等待这么久再继续
+
+
+class ThumbBusy(Exception):
+    """生成队列已满：调用方应回退原图或占位图"""
+
+
+class ThumbnailService:
+    def __init__(self, workers: int, max_pending: int, wait_seconds: float, warm_max_queue: int = 2000):
+        self.max_pending = max(1, int(max_pending))
+        self.wait_seconds = wait_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="thumb")
+        self._lock = threading.Lock()
+        self._inflight = {}  # (abs_path, kind, size) -> Future
+
+        # 低优先级预热队列（单线程，按需启动）
+        self._warm_q = queue.Queue(maxsize=max(1, int(warm_max_queue)))
+        self._warm_keys = set()
+        self._warm_thread = None
+
+    def _run(self, key, full, kind, size, quality):
+        try:
+            return render_derivative(full, kind, size, quality=quality)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def submit(self, full: str, kind: str, size: int, *, quality: int = 85):
+        """
+        提交生成任务并返回 Future；同键任务已在进行中则复用。
+        队列已满时抛 ThumbBusy。
+        """
+        size = snap_size(kind, size)
+        key = (os.path.abspath(full), kind, size)
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            if len(self._inflight) >= self.max_pending:
+                raise ThumbBusy()
+            fut = self._executor.submit(self._run, key, full, kind, size, quality)
+            self._inflight[key] = fut
+            return fut
+
+    def get(self, full: str, kind: str, size: int, *, quality: int = 85):
+        """
+        返回派生图缓存路径（None 表示 PIL/缓存目录不可用，调用方回退原图）。
+        - 缓存命中：直接返回
+        - 未命中：进入线程池生成，最多等待 wait_seconds 秒
+        """
+        hit = cached_derivative(full, kind, size)
+        if hit:
+            return hit
+        fut = self.submit(full, kind, size, quality=quality)
+        return fut.result(timeout=self.wait_seconds)
+
+    # ---------- 后台预热 ----------
+    def warm(self, fulls, kind: str, size: int, *, quality: int = 85) -> int:
+        """
+        把一批图片排进低优先级预热队列，返回新入队数量。
+        - 只入队、不做任何文件 IO，请求线程几乎无开销
+        - 已在队列中的同键任务跳过；队列满时丢弃剩余（下次打开再补）
+        """
+        added = 0
+        size = snap_size(kind, size)
+        with self._lock:
+            self._ensure_warm_thread()
+            for full in fulls:
+                if not full:
+                    continue
+                key = (os.path.abspath(full), kind, size)
+                if key in self._warm_keys:
+                    continue
+                try:
+                    self._warm_q.put_nowait((key, full, kind, size, quality))
+                except queue.Full:
+                    break
+                self._warm_keys.add(key)
+                added += 1
+        return added
+
+    def _inflight_count(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def _ensure_warm_thread(self):
+        if self._warm_thread is None or not self._warm_thread.is_alive():
+            self._warm_thread = threading.Thread(target=self._warm_loop, name="thumb-warm", daemon=True)
+            self._warm_thread.start()
+
+    def _warm_loop(self):
+        while True:
+            key, full, kind, size, quality = self._warm_q.get()
+            try:
+                # 让路：前台正在生成缩略图时先等一等，避免和用户请求抢 CPU
+                waited = 0.0
+                while self._inflight_count() and waited < WARM_YIELD_SECONDS:
+                    time.sleep(0.05)
+                    waited += 0.05
+                if not cached_derivative(full, kind, size):
+                    # 走 submit：同键已在生成时复用那个 Future；排队满时跳过（下次打开再补）
+                    self.submit(full, kind, size, quality=quality).result()
+            except Exception:
+                # 缺图 / 坏图：预热失败不影响任何请求
+                pass
+            finally:
+                with self._lock:
+                    self._warm_keys.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"inflight": len(self._inflight), "max_pending": self.max_pending,
+                    "warm_queued": len(self._warm_keys)}
+
+
+thumb_service = ThumbnailService(THUMB_WORKERS, THUMB_MAX_PENDING, THUMB_WAIT_SECONDS, THUMB_WARM_MAX_QUEUE)
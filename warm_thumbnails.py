@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+夜间预热缩略图（配合 Windows 任务计划程序每天运行一次）
+- 取最近 N 天内“有变化”的图片：
+    1) operation_logs 中有修改记录的 item（上传/替换图片后前端会 PUT item_image）
+    2) image_placeholders 中最近更新过的图片（上传时登记）
+- 为这些图片生成列表缩略图（THUMB_WARM_SIZE）与悬停预览中图，写入派生图缓存
+- 已是最新的缓存直接跳过，可重复运行
+
+用法：
+    python warm_thumbnails.py            # 默认最近 1 天
+    python warm_thumbnails.py --days 7
+"""
+import sys
+from datetime import datetime, timedelta
+
+from create_database import get_session, Item, OperationLog, ImagePlaceholder
+from image_cache import render_derivative
+from config import THUMB_WARM_SIZE
+from paths import abs_path_from_web
+
+PREVIEW_SIZE = 1280  # 与 /preview/system 的默认尺寸一致
+
+
+def _recent_image_paths(session, since):
+    codes = {
+        eid for (eid,) in session.query(OperationLog.entity_id)
+        .filter(OperationLog.entity_type == "item", OperationLog.created_at >= since)
+        .distinct()
+        .all()
+    }
+    paths = set()
+    codes = sorted(codes)
+    for i in range(0, len(codes), 500):
+        chunk = codes[i:i + 500]
+        for (p,) in session.query(Item.item_image).filter(Item.item_code.in_(chunk)).all():
+            if p:
+                paths.add(p.split("?", 1)[0])
+    try:
+        for (p,) in session.query(ImagePlaceholder.file_path).filter(ImagePlaceholder.updated_at >= since).all():
+            paths.add(p)
+    except Exception:
+        session.rollback()  # 未建 image_placeholders 表时忽略
+    return sorted(p for p in paths if p.startswith("/files/system/"))
+
+
+def warm(days=1):
+    since = datetime.utcnow() - timedelta(days=days)
+    session = get_session()
+    try:
+        paths = _recent_image_paths(session, since)
+    finally:
+        session.close()
+
+    print(f"最近 {days} 天有变化的图片：{len(paths)} 张")
+    ok = failed = 0
+    for rel in paths:
+        try:
+            full = abs_path_from_web(rel)
+            render_derivative(full, "thumb", THUMB_WARM_SIZE, quality=80)
+            render_derivative(full, "preview", PREVIEW_SIZE, quality=85)
+            ok += 1
+        except Exception as e:
+            print(f"预热失败: {rel} ({e})")
+            failed += 1
+    print(f"完成：成功 {ok}，失败 {failed}")
+
+
+if __name__ == "__main__":
+    days = 1
+    args = sys.argv[1:]
+    if "--days" in args:
+        try:
+            days = max(1, int(args[args.index("--days") + 1]))
+        except (IndexError, ValueError):
+            print("用法：python warm_thumbnails.py [--days N]")
+            sys.exit(2)
+    warm(days)